@@ -65,14 +65,6 @@
 # First version by: Pearu Peterson <pearu@cens.ioc.ee>
 # First created: Oct 2006
 
-try:
-    from importlib.metadata import PackageNotFoundError
-    from importlib import metadata
-except ImportError:
-    # Use backport package for python <3.8
-    from importlib_metadata import PackageNotFoundError
-    import importlib_metadata as metadata
-
 import logging
 import codecs
 
@@ -82,16 +74,41 @@ def _get_version():
     :returns: the version of this package.
     :rtype: str
     """
+    # Importing importlib.metadata takes about as long as importing all of
+    # the Fortran2003 classes, so it is only done when the version is needed.
+    try:
+        from importlib import metadata
+    except ImportError:
+        # Use backport package for python <3.8
+        import importlib_metadata as metadata
+
     try:
         return metadata.version(__name__)
-    except PackageNotFoundError:
+    except metadata.PackageNotFoundError:
         # Package is not installed.
         from setuptools_scm import get_version
 
         return get_version(root="../..", relative_to=__file__)
 
 
-__version__ = _get_version()
+def __getattr__(name):
+    """
+    Looks up the version of this package the first time that
+    `__version__` is accessed.
+
+    :param str name: the name of the attribute.
+
+    :returns: the value of the attribute.
+    :rtype: str
+
+    :raises AttributeError: if the attribute does not exist.
+
+    """
+    if name == "__version__":
+        version = globals()["__version__"] = _get_version()
+        return version
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
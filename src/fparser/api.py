@@ -165,6 +165,7 @@ def parse(
     ignore_comments=True,
     analyze=True,
     clear_cache=True,
+    disk_cache=None,
 ):
     """
     Parse input and return Statement tree. Raises an AnalyzeError if the
@@ -188,6 +189,10 @@ def parse(
                              to parsing. Necessary when a new tree object
                              is required, even if the Fortran to be parsed has
                              been seen before.
+    :param disk_cache: An on-disk cache in which to look up (and store)
+                       the parse tree. This is not affected by
+                       `clear_cache`.
+    :type disk_cache: :py:class:`fparser.common.parse_cache.ParseCache`
 
     :returns: Abstract Syntax Tree of Fortran source.
     :rtype: :py:class:`fparser.api.BeginSource`
@@ -206,7 +211,9 @@ def parse(
         source_only,
         ignore_comments=ignore_comments,
     )
-    parser = FortranParser(reader, ignore_comments=ignore_comments)
+    parser = FortranParser(
+        reader, ignore_comments=ignore_comments, disk_cache=disk_cache
+    )
     try:
         parser.parse()
     except AnalyzeError:
@@ -0,0 +1,470 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Reading of Fortran source files that are held in tar, zip or gzip
+archives, without extracting them to disk.
+
+A :py:class:`FortranArchive` gives the names of the files in an archive
+and creates a :py:class:`FortranArchiveReader` for any of them. The code
+of a file is read straight from the archive and any INCLUDE lines are
+resolved against the other files in the same archive::
+
+    >>> with FortranArchive("release-1.0.tar.gz") as archive:
+    ...     for name in archive.fortran_names():
+    ...         tree = parser(archive.reader(name))
+
+Files in archives may also be parsed by
+:py:func:`fparser.two.batch.parse_files` and
+:py:func:`fparser.two.parser.parse_many` by passing them an
+:py:class:`ArchiveMember` for each file (see `FortranArchive.members`).
+These create their readers with a :py:class:`ReaderFactory`, which
+opens each archive once.
+
+The members of a compressed tar archive are quickest to read in the
+order in which they are stored (which is the order of `names`), since
+the archive must otherwise be decompressed again from the start.
+
+"""
+
+import gzip
+import io
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from collections import namedtuple
+
+import fparser.common.sourceinfo
+from fparser.common.readfortran import (
+    FortranFileReader,
+    FortranReaderBase,
+    SourceBuffer,
+)
+
+__all__ = [
+    "FORTRAN_EXTENSIONS",
+    "ArchiveMember",
+    "FortranArchive",
+    "FortranArchiveReader",
+    "ReaderFactory",
+]
+
+#: The extensions (in lower case) of the files that `fortran_names`
+#: considers to be Fortran source files. Files that are only included by
+#: others (e.g. with a '.inc' or '.h' extension) are not.
+FORTRAN_EXTENSIONS = (
+    ".f",
+    ".for",
+    ".ftn",
+    ".f77",
+    ".f90",
+    ".f95",
+    ".f03",
+    ".f08",
+    ".pyf",
+)
+
+
+class ArchiveMember(namedtuple("ArchiveMember", "archive name")):
+    """
+    A file in an archive: `archive` is the path of the archive and `name`
+    the name of the file within it. This is given as the path of the file
+    within the archive, e.g. 'release-1.0.tar.gz/src/mod.f90'.
+
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return os.path.join(self.archive, self.name)
+
+
+class FortranArchive:
+    """
+    A tar (optionally compressed), zip or gzip archive of Fortran source
+    files. A gzip archive holds a single file, named after the archive
+    without its '.gz' extension. The archive is kept open until `close` is
+    called (or the archive is used as a context manager). The files may
+    be read by several threads at once.
+
+    :param str filename: the path of the archive.
+
+    :raises ValueError: if the file is not a tar, zip or gzip archive.
+
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._tar = None
+        self._zip = None
+        # The entry of each (regular) file in the archive, keyed on its
+        # normalised name. The entries are in the order of the archive.
+        self._entries = {}
+        if tarfile.is_tarfile(filename):
+            self._tar = tarfile.open(filename, "r:*")
+            for info in self._tar:
+                if info.isfile():
+                    self._entries.setdefault(_normalise(info.name), info)
+        elif zipfile.is_zipfile(filename):
+            self._zip = zipfile.ZipFile(filename)
+            for info in self._zip.infolist():
+                if not info.is_dir():
+                    self._entries.setdefault(_normalise(info.filename), info)
+        else:
+            with open(filename, "rb") as archive_file:
+                if archive_file.read(2) != b"\x1f\x8b":
+                    raise ValueError(f"'{filename}' is not a tar, zip or gzip archive")
+            name = os.path.basename(filename)
+            if name.lower().endswith(".gz"):
+                name = name[:-3]
+            self._entries[name] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __contains__(self, name):
+        return _normalise(name) in self._entries
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.filename!r})"
+
+    def close(self):
+        """
+        Closes the archive.
+
+        """
+        if self._tar is not None:
+            self._tar.close()
+        if self._zip is not None:
+            self._zip.close()
+
+    def names(self):
+        """
+        :returns: the names of all of the files in the archive, in the \
+            order in which they are stored.
+        :rtype: List[str]
+
+        """
+        return list(self._entries)
+
+    def fortran_names(self, extensions=FORTRAN_EXTENSIONS):
+        """
+        :param extensions: the extensions (in lower case) of the files to \
+            return.
+        :type extensions: Tuple[str, ...]
+
+        :returns: the names of the Fortran source files in the archive, in \
+            the order in which they are stored.
+        :rtype: List[str]
+
+        """
+        return [
+            name
+            for name in self._entries
+            if posixpath.splitext(name)[1].lower() in extensions
+        ]
+
+    def members(self, names=None):
+        """
+        :param names: the names of the files. Defaults to all of the \
+            Fortran source files (see `fortran_names`).
+        :type names: Optional[Iterable[str]]
+
+        :returns: the files, for use with \
+            :py:func:`fparser.two.batch.parse_files` or \
+            :py:func:`fparser.two.parser.parse_many`.
+        :rtype: List[:py:class:`fparser.common.archive.ArchiveMember`]
+
+        """
+        if names is None:
+            names = self.fortran_names()
+        return [ArchiveMember(self.filename, name) for name in names]
+
+    def read(self, name):
+        """
+        Reads the code in a file of the archive. As for a file on disk,
+        the code is decoded as UTF-8 (with any invalid characters being
+        logged and skipped) and line endings are converted to newlines.
+
+        :param str name: the name of the file.
+
+        :returns: the code in the file.
+        :rtype: str
+
+        :raises FileNotFoundError: if there is no such file in the archive.
+
+        """
+        try:
+            entry = self._entries[_normalise(name)]
+        except KeyError as err:
+            raise FileNotFoundError(
+                f"There is no file '{name}' in archive '{self.filename}'"
+            ) from err
+        with self._lock:
+            if self._tar is not None:
+                member_file = self._tar.extractfile(entry)
+            elif self._zip is not None:
+                member_file = self._zip.open(entry)
+            else:
+                member_file = gzip.open(self.filename)
+            # The 'fparser-logging' handler for errors ensures that any
+            # invalid characters in the input are skipped but logged.
+            with io.TextIOWrapper(
+                member_file, encoding="UTF-8", errors="fparser-logging"
+            ) as text_file:
+                return text_file.read()
+
+    def reader(self, name, **options):
+        """
+        :param str name: the name of a file in the archive.
+        :param options: the keyword arguments of the reader (see \
+            :py:class:`FortranArchiveReader`).
+
+        :returns: a reader of the code in the file.
+        :rtype: :py:class:`fparser.common.archive.FortranArchiveReader`
+
+        :raises FileNotFoundError: if there is no such file in the archive.
+
+        """
+        return FortranArchiveReader(self, name, **options)
+
+
+def _normalise(name):
+    """
+    :param str name: the name of a file in an archive.
+
+    :returns: the name without any leading '/' or './' and any '..' \
+        resolved.
+    :rtype: str
+
+    """
+    return posixpath.normpath(name).lstrip("/")
+
+
+class FortranArchiveReader(FortranReaderBase):
+    """
+    Reads the code in a file of an archive. The file is read once, when
+    the reader is created. The files that it includes are looked for in
+    the same archive, in the include directories (which are directories
+    within the archive). Their paths are given as the path of the file
+    within the archive (see :py:class:`ArchiveMember`).
+
+    :param archive: the archive.
+    :type archive: :py:class:`fparser.common.archive.FortranArchive`
+    :param str name: the name of the file in the archive.
+    :param list include_dirs: the directories within the archive in \
+        which to look for included files. Defaults to the directory of \
+        the file and the top of the archive.
+    :param list source_only: Fortran source files to search for modules \
+        required by "use" statements.
+    :param bool ignore_comments: whether or not to ignore comments.
+    :param Optional[bool] ignore_encoding: whether or not to ignore \
+        Python-style encoding information (e.g. "-*- fortran -*-") when \
+        attempting to determine the format of the file. Default is True.
+    :param Optional[bool] include_omp_conditional_lines: whether or not \
+        the content of a line with an OMP sentinel is parsed or not. \
+        Default is False (in which case it is treated as a Comment).
+    :param Optional[bool] lean: whether or not to release the caches of \
+        the items that have been matched and keep only the offsets of the \
+        source lines (see \
+        :py:class:`fparser.common.readfortran.FortranReaderBase`).
+
+    :raises FileNotFoundError: if there is no such file in the archive.
+
+    """
+
+    def __init__(
+        self,
+        archive,
+        name,
+        include_dirs=None,
+        source_only=None,
+        ignore_comments=True,
+        ignore_encoding=True,
+        include_omp_conditional_lines=False,
+        lean=False,
+    ):
+        self.archive = archive
+        self.member = _normalise(name)
+        self.id = str(ArchiveMember(archive.filename, self.member))
+        self.file = SourceBuffer(archive.read(name))
+        if posixpath.splitext(self.member)[1] == ".pyf":
+            mode = fparser.common.sourceinfo.FortranFormat(True, True)
+        else:
+            mode = fparser.common.sourceinfo.get_source_info_str(
+                self.file.text, ignore_encoding=ignore_encoding
+            )
+        super().__init__(
+            self.file,
+            mode,
+            ignore_comments,
+            include_omp_conditional_lines=include_omp_conditional_lines,
+            lean=lean,
+        )
+        if include_dirs is None:
+            self.include_dirs.insert(0, posixpath.dirname(self.member))
+        else:
+            self.include_dirs = include_dirs[:]
+        if source_only is not None:
+            self.source_only = source_only[:]
+
+    def __getstate__(self):
+        """
+        Archives cannot be pickled so the archive (and the code) are
+        dropped from the state of a pickled reader (e.g. as part of a parse
+        tree). An unpickled reader therefore cannot read any further.
+
+        :returns: the state of this reader without the archive.
+        :rtype: dict
+
+        """
+        state = self.__dict__.copy()
+        state["archive"] = None
+        state["file"] = None
+        state["source"] = None
+        return state
+
+    def close_source(self):
+        self.file.close()
+
+    def open_include(self, filename, ignore_comments):
+        """
+        Finds a file that is included by the code in the include
+        directories of this reader within the archive and creates a reader
+        for it.
+
+        :param str filename: the name of the file given by the INCLUDE line.
+        :param bool ignore_comments: whether or not the reader of the file \
+            ignores comments.
+
+        :returns: the path of the file and a reader for it or None if the \
+            file is not in the archive.
+        :rtype: Optional[Tuple[str, \
+            :py:class:`fparser.common.archive.FortranArchiveReader`]]
+
+        """
+        for incl_dir in self.include_dirs:
+            name = posixpath.join(incl_dir, filename)
+            if name in self.archive:
+                reader = FortranArchiveReader(
+                    self.archive,
+                    name,
+                    include_dirs=self.include_dirs,
+                    ignore_comments=ignore_comments,
+                    lean=self.lean,
+                )
+                return reader.id, reader
+        return None
+
+
+class ReaderFactory:
+    """
+    Creates the reader of each Fortran source file, which is either the
+    path of a file or a file in an archive (see
+    :py:class:`ArchiveMember`). Each archive is opened when a file in it
+    is first read and is kept open until `close` is called (or the
+    factory is used as a context manager). Readers may be created by
+    several threads at once.
+
+    >>> with ReaderFactory(ignore_comments=False) as readers:
+    ...     for source in sources:
+    ...         tree = parser(readers(source))
+
+    :param options: the keyword arguments with which to create each \
+        reader (see \
+        :py:class:`fparser.common.readfortran.FortranFileReader`).
+
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._archives = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, source):
+        """
+        :param source: the path of a Fortran source file or a file in an \
+            archive.
+        :type source: str | :py:class:`fparser.common.archive.ArchiveMember`
+
+        :returns: a reader of the code in the file.
+        :rtype: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        :raises OSError: if the file cannot be read.
+        :raises ValueError: if an archive is not a tar, zip or gzip archive.
+
+        """
+        if isinstance(source, ArchiveMember):
+            return self.archive(source.archive).reader(source.name, **self.options)
+        return FortranFileReader(source, **self.options)
+
+    def archive(self, filename):
+        """
+        :param str filename: the path of an archive.
+
+        :returns: the archive, which is opened if it is not already open.
+        :rtype: :py:class:`fparser.common.archive.FortranArchive`
+
+        :raises ValueError: if the file is not a tar, zip or gzip archive.
+
+        """
+        with self._lock:
+            archive = self._archives.get(filename)
+            if archive is None:
+                archive = FortranArchive(filename)
+                self._archives[filename] = archive
+            return archive
+
+    def close(self):
+        """
+        Closes all of the archives that have been opened.
+
+        """
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+            self._archives.clear()
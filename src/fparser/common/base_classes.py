@@ -103,6 +103,9 @@ class AttributeHolder:
                 self._readonly.append(k)
 
     def __getattr__(self, name):
+        if name == "_attributes":
+            # Not yet set, e.g. while the holder is being unpickled.
+            raise AttributeError(name)
         if name not in self._attributes:
             message = "%s instance has no attribute %r, " + "expected attributes: %s"
             attributes = ", ".join(list(self._attributes.keys()))
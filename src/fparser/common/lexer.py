@@ -0,0 +1,106 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+"""
+Single-pass scanner for the quotes and brackets of Fortran statements.
+
+`scan` finds the quoted strings and top-level bracketed groups that
+`splitquote` and `splitparen` (and therefore `string_replace_map`) need
+in one regular-expression driven pass, so that these no longer walk the
+line one character at a time. Quotes and brackets are treated exactly as
+those functions have always treated them: a backslash escapes the
+following character (both inside and outside quotes), brackets inside
+quoted strings are ignored and a closing bracket that does not match the
+innermost open bracket is skipped.
+
+The scanner does not tokenise statements: the match methods still split
+and restore strings through `string_replace_map`, only the scanning that
+function relies on is done here.
+
+"""
+
+import re
+from collections import namedtuple
+
+__all__ = ["LineStructure", "scan"]
+
+#: The quoted strings and top-level bracketed groups of a line. `strings`
+#: and `groups` hold (start, end) positions, with an end of None for a
+#: bracket that is never closed, and `stopchar` is the quote character of
+#: a string that is not closed by the end of the line (or None).
+LineStructure = namedtuple("LineStructure", "strings groups stopchar")
+
+_BRACKETS = {"(": ")", "[": "]"}
+
+# Only the characters that determine the structure of a line.
+_STRUCTURE_RE = re.compile(
+    r"""'(?:[^'\\]|\\.)*(?P<sq>'|\\?\Z)|"(?:[^"\\]|\\.)*(?P<dq>"|\\?\Z)"""
+    r"|\\.?|[(\[)\]]",
+    re.S,
+)
+
+
+def scan(line):
+    """
+    Finds the quoted strings and top-level bracketed groups in the
+    supplied text in a single pass.
+
+    :param str line: the text to scan.
+
+    :returns: the structure of the text.
+    :rtype: :py:class:`fparser.common.lexer.LineStructure`
+
+    """
+    strings = []
+    groups = []
+    stopchar = None
+    # Stack of the expected closing brackets.
+    stack = []
+    for match in _STRUCTURE_RE.finditer(line):
+        start = match.start()
+        char = line[start]
+        if char in _BRACKETS:
+            if not stack:
+                groups.append((start, None))
+            stack.append(_BRACKETS[char])
+        elif char in ")]":
+            if stack and stack[-1] == char:
+                stack.pop()
+                if not stack:
+                    groups[-1] = (groups[-1][0], match.end())
+        elif char != "\\":
+            strings.append((start, match.end()))
+            if match.group("sq" if char == "'" else "dq") != char:
+                stopchar = char
+    return LineStructure(strings, groups, stopchar)
@@ -0,0 +1,465 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Persistent, on-disk cache of parse results.
+
+Parsing a large Fortran code base is slow but, from one run to the next,
+most of its files do not change. A :py:class:`ParseCache` stores the
+result of parsing each file in a directory so that it can be loaded
+(rather than computed again) by a later run, by this or any other
+process. It is used by passing it to
+:py:class:`fparser.two.parser.Parser` (or to
+:py:class:`fparser.one.parsefortran.FortranParser`)::
+
+    >>> cache = ParseCache()
+    >>> parser = Parser("f2008", cache=cache)
+    >>> tree = parser(FortranFileReader("my_mod.f90"))
+
+Entries are keyed by a digest of the source code and of the code in the
+files that it includes, the options of the reader, the parser options
+(e.g. the Fortran standard) and the version of fparser, so an entry is
+never used for code that has changed. The key does not depend upon where
+the files are, so the same code in another location (e.g. another
+checkout of a project) uses the same entry. (The result then records
+the name of the file with which it was first parsed.) The files that
+were included when the entry was created are checked again when it is
+loaded. Each entry is written to a temporary file that is then renamed
+so that any number of processes may share a cache directory. Once the
+entries exceed the maximum size, those that have been least recently
+used are removed.
+
+As loading an entry may run arbitrary code (entries are pickled), a
+cache may only be used by a single user: the directory is created so
+that only its owner may access it and, where the platform has user IDs,
+a directory or an entry that is owned by another user is refused.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from io import StringIO
+
+import fparser
+from fparser.common.readfortran import _IS_INCLUDE_LINE, SourceBuffer
+
+#: Version of the layout of the cache entries.
+CACHE_FORMAT = 1
+
+#: Name of the environment variable that may be used to specify the
+#: location of the cache.
+CACHE_DIR_ENV_VAR = "FPARSER_PARSE_CACHE"
+
+#: The default maximum size (in bytes) of the entries in a cache.
+DEFAULT_MAX_SIZE = 1024**3
+
+#: The fraction of the maximum size to which a cache is reduced once it
+#: has grown beyond the maximum size, so that it is not searched for the
+#: entries to remove every time that an entry is added.
+EVICT_FRACTION = 0.9
+
+_SUFFIX = ".pickle"
+
+
+def user_cache_directory():
+    """
+    :returns: the 'fparser' directory within the user's cache directory \
+        (given by the XDG_CACHE_HOME environment variable if it is set \
+        and otherwise '~/.cache').
+    :rtype: str
+
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "fparser")
+
+
+def default_directory():
+    """
+    :returns: the location of the cache. This is given by the \
+        FPARSER_PARSE_CACHE environment variable if it is set and is \
+        otherwise the user's cache directory (see \
+        :py:func:`user_cache_directory`).
+    :rtype: str
+
+    """
+    return os.environ.get(CACHE_DIR_ENV_VAR) or user_cache_directory()
+
+
+def _check_owner(info, path):
+    """
+    Checks that a file (or directory) is owned by the current user, on
+    the platforms that have user IDs.
+
+    :param info: the status of the file.
+    :type info: :py:class:`os.stat_result`
+    :param str path: the file (for the error message).
+
+    :raises PermissionError: if the file is owned by another user.
+
+    """
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(
+            f"Parse cache '{path}' is owned by another user (uid {info.st_uid})"
+        )
+
+
+def _file_digest(path):
+    """
+    :param str path: the file to read.
+
+    :returns: a digest of the content of the file or None if it cannot \
+        be read.
+    :rtype: Optional[str]
+
+    """
+    try:
+        with open(path, "rb") as source:
+            return hashlib.sha256(source.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def source_digest(reader):
+    """
+    :param reader: the reader of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+    :returns: a digest of all of the code provided by the reader or None \
+        if the code cannot be obtained without reading it (e.g. if the \
+        reader is reading from a stream).
+    :rtype: Optional[str]
+
+    """
+    if isinstance(reader.source, (StringIO, SourceBuffer)):
+        # This includes a file that has already been read into memory.
+        return hashlib.sha256(
+            reader.source.getvalue().encode("utf-8", "surrogatepass")
+        ).hexdigest()
+    if os.path.isfile(reader.id):
+        return _file_digest(reader.id)
+    return None
+
+
+def _source_text(reader):
+    """
+    :param reader: the reader of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+    :returns: the code provided by the reader or None if it cannot be \
+        obtained without reading it.
+    :rtype: Optional[str]
+
+    """
+    if isinstance(reader.source, (StringIO, SourceBuffer)):
+        return reader.source.getvalue()
+    if os.path.isfile(reader.id):
+        try:
+            with open(reader.id, "r", encoding="utf-8", errors="replace") as source:
+                return source.read()
+        except OSError:
+            return None
+    return None
+
+
+def include_digests(reader, _seen=None):
+    """
+    Finds the files that are included by the code provided by the reader
+    (and, in turn, by those files) in the same way as the reader does.
+
+    :param reader: the reader of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+    :returns: the name given by each INCLUDE line and a digest of the \
+        code in the file that it refers to (or None if the file cannot be \
+        found), in the order in which they are included.
+    :rtype: List[List[Optional[str]]]
+
+    """
+    seen = set() if _seen is None else _seen
+    text = _source_text(reader)
+    if text is None:
+        return []
+    result = []
+    for line in text.splitlines():
+        if not _IS_INCLUDE_LINE(line):
+            continue
+        filename = line.strip()[7:].lstrip()[1:-1]
+        included = reader.open_include(filename, reader.ignore_comments)
+        if included is None:
+            result.append([filename, None])
+            continue
+        path, include_reader = included
+        result.append([filename, source_digest(include_reader)])
+        if path not in seen:
+            seen.add(path)
+            result.extend(include_digests(include_reader, seen))
+    return result
+
+
+class ParseCache:
+    """
+    A cache of parse results that is stored in a directory and may be
+    shared by several processes. Any picklable result may be stored.
+
+    :param Optional[str] directory: where to store the cache. It is \
+        created (accessible only by the current user) if it does not \
+        exist. Defaults to the directory given by \
+        :py:func:`default_directory`.
+    :param Optional[int] max_size: the maximum total size (in bytes) of \
+        the entries. If this is exceeded then the least recently used \
+        entries are removed until the size is no more than \
+        `EVICT_FRACTION` of it. None means that the size is not limited.
+
+    :raises PermissionError: if the directory is owned by another user.
+
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = os.path.abspath(directory or default_directory())
+        self.max_size = max_size
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        _check_owner(os.stat(self.directory), self.directory)
+        #: The number of successful lookups in this process.
+        self.hits = 0
+        #: The number of unsuccessful lookups in this process.
+        self.misses = 0
+        # The total size of the entries, which is found when the first
+        # entry is added and then kept up to date with the entries added
+        # and removed by this object (but not by other processes). None
+        # if it is not yet known.
+        self._size = None
+
+    def __repr__(self):
+        return f"ParseCache({self.directory!r}, max_size={self.max_size})"
+
+    def key(self, reader, *options):
+        """
+        Computes the key for the result of parsing the code provided by
+        the supplied reader. This must be called before any code is read.
+        It depends upon the code and the code in the files that it
+        includes but not upon where these files are.
+
+        :param reader: the reader of the Fortran code.
+        :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+        :param options: any other values that the result depends upon, \
+            e.g. the parser and the Fortran standard. These must be \
+            serialisable as JSON.
+
+        :returns: the key or None if the code cannot be obtained from the \
+            reader (in which case the result should not be cached).
+        :rtype: Optional[str]
+
+        """
+        digest = source_digest(reader)
+        if digest is None:
+            return None
+        parts = [
+            CACHE_FORMAT,
+            fparser.__version__,
+            type(reader).__name__,
+            digest,
+            include_digests(reader),
+            reader.format.mode,
+            reader.ignore_comments,
+            reader.include_omp_conditional_lines,
+            reader.source_only,
+            list(options),
+        ]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def _path(self, key):
+        """
+        :param str key: the key of an entry.
+
+        :returns: the file holding the entry.
+        :rtype: str
+
+        """
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """
+        Looks up an entry. An entry is only found if none of the files that
+        were included by the code have since changed.
+
+        :param str key: the key of the entry (see :py:meth:`key`).
+
+        :returns: the stored result or None if there is no (valid) entry.
+
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry_file:
+                _check_owner(os.fstat(entry_file.fileno()), path)
+                dependencies, value = pickle.load(entry_file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except PermissionError as err:
+            # Never load an entry that another user could have written.
+            logging.getLogger(__name__).warning("Ignoring parse cache entry: %s", err)
+            self.misses += 1
+            return None
+        except Exception as err:  # pylint: disable=broad-except
+            # The entry is corrupt (or was written by an incompatible
+            # version of Python or of the classes in the tree).
+            logging.getLogger(__name__).warning(
+                "Ignoring unreadable parse cache entry '%s': %s", path, err
+            )
+            self._remove(path)
+            self.misses += 1
+            return None
+        for dependency, digest in dependencies:
+            if _file_digest(dependency) != digest:
+                self.misses += 1
+                return None
+        try:
+            # Record the use of this entry for the eviction of the least
+            # recently used entries.
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value, dependencies=()):
+        """
+        Stores an entry, replacing any existing entry with the same key.
+        If this makes the cache too large then the least recently used
+        entries are removed (see `max_size`).
+
+        :param str key: the key of the entry (see :py:meth:`key`).
+        :param value: the result to store. This must be picklable.
+        :param dependencies: the files (other than the source file itself) \
+            upon which the result depends, e.g. included files.
+        :type dependencies: Iterable[str]
+
+        """
+        dependencies = [(path, _file_digest(path)) for path in dependencies]
+        path = self._path(key)
+        handle, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{key}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(handle, "wb") as entry_file:
+                pickle.dump((dependencies, value), entry_file, pickle.HIGHEST_PROTOCOL)
+                size = entry_file.tell()
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        if self.max_size is None:
+            return
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += size - replaced
+        if self._size > self.max_size:
+            self.evict(int(self.max_size * EVICT_FRACTION))
+
+    def entries(self):
+        """
+        :returns: the modification time, size and path of each entry.
+        :rtype: List[Tuple[float, int, str]]
+
+        """
+        result = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Removed by another process.
+                    continue
+                result.append((stat.st_mtime, stat.st_size, entry.path))
+        return result
+
+    def size(self):
+        """
+        :returns: the total size (in bytes) of the entries.
+        :rtype: int
+
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_size):
+        """
+        Removes the least recently used entries until the total size of
+        those remaining is no more than the supplied size.
+
+        :param int max_size: the maximum size (in bytes) to keep.
+
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_size:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """
+        Removes all of the entries.
+
+        """
+        self.evict(0)
+
+    @staticmethod
+    def _remove(path):
+        """
+        Removes a file, ignoring the case where another process has
+        already removed it.
+
+        :param str path: the file to remove.
+
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -141,7 +141,8 @@ import os
 import re
 import sys
 import traceback
-from io import StringIO
+from array import array
+from collections import deque
 import fparser.common.sourceinfo
 from fparser.common.splitline import String, string_replace_map, splitquote
 
@@ -395,6 +396,15 @@ class Line:
         self.strlinemap = str_map
         return line
 
+    def release_caches(self):
+        """
+        Releases the objects that were cached while this line was parsed
+        (see `parse_cache`). They are created again if the line is parsed
+        again.
+
+        """
+        self.parse_cache.clear()
+
     def parse_line(self, cls, parent_cls):
         if cls not in self.parse_cache:
             self.parse_cache[cls] = None
@@ -534,6 +544,285 @@ class CppDirective(Line):
         super(CppDirective, self).__init__(line, linenospan, None, None, reader)
 
 
+class SourceLines:
+    """
+    The cache of the source lines that have been read by a reader. This
+    behaves like a list of the lines, indexed from zero by line number
+    minus one, except that the lines before a given line may be discarded
+    (see `discard`) so that the memory used while reading a large file
+    does not grow without limit. A line that has been discarded is given
+    as an empty string.
+
+    If the source code is held in a single string (see
+    :py:class:`SourceBuffer`) then a line that is unchanged by the reader
+    is held as its start and end offsets in that string (see `append_span`)
+    and is only created as a string when it is requested. This avoids
+    holding a second copy of the code in the reader's record of the
+    source lines. It does not apply to the items read from the code:
+    each :py:class:`Line` still holds its own copy of its text (as do
+    the lines joined from continuation lines and the strings created by
+    `strline`, `copy` and `clone`).
+
+    :param Optional[str] text: the source code that the lines are read \
+        from (if it is held in a single string).
+
+    """
+
+    __slots__ = ("_lines", "_offset", "_text", "_starts", "_ends")
+
+    def __init__(self, text=None):
+        # The lines (when they are not held as offsets).
+        self._lines = []
+        # The number of lines that have been discarded.
+        self._offset = 0
+        self._text = text
+        # The start and end offsets of each line in `_text`. A line that
+        # is held in `_lines` instead has a start offset of -1.
+        self._starts = array("q")
+        self._ends = array("q")
+
+    def __len__(self):
+        if self._text is None:
+            return self._offset + len(self._lines)
+        return self._offset + len(self._starts)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("source line index out of range")
+        if index < self._offset:
+            return ""
+        index -= self._offset
+        if self._text is None:
+            return self._lines[index]
+        start = self._starts[index]
+        if start < 0:
+            return self._lines[self._ends[index]]
+        return self._text[start : self._ends[index]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    @property
+    def discarded(self):
+        """
+        :returns: the number of lines that have been discarded.
+        :rtype: int
+
+        """
+        return self._offset
+
+    def append(self, line):
+        """
+        :param str line: the next source line.
+
+        """
+        if self._text is not None:
+            # The end offset gives the position of the line in `_lines`.
+            self._starts.append(-1)
+            self._ends.append(len(self._lines))
+        self._lines.append(line)
+
+    def append_span(self, start, end):
+        """
+        Adds the next source line, which is the part of the source code
+        between the supplied offsets.
+
+        :param int start: the offset of the start of the line.
+        :param int end: the offset of the end of the line.
+
+        """
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def discard(self, count):
+        """
+        Discards the first `count` lines (or all of them if there are
+        fewer). Lines that have already been discarded are unaffected.
+
+        :param int count: the number of lines from the start of the \
+            source to discard.
+
+        """
+        count = min(count, len(self)) - self._offset
+        if count <= 0:
+            return
+        if self._text is None:
+            del self._lines[:count]
+        else:
+            del self._starts[:count]
+            del self._ends[:count]
+            if self._lines:
+                # Renumber the lines that are not held as offsets.
+                lines = []
+                for index, start in enumerate(self._starts):
+                    if start < 0:
+                        lines.append(self._lines[self._ends[index]])
+                        self._ends[index] = len(lines) - 1
+                self._lines = lines
+        self._offset += count
+
+
+class SourceLineIndex:
+    """
+    The source lines read by a lean reader (see
+    :py:class:`FortranReaderBase`) from code that is held in a single
+    string. Only the offset of the start of each line in that string is
+    kept. A line is created again, in the same way as the reader created
+    it, when it is requested so that the same messages can be produced
+    without holding the lines. This has the same interface as
+    :py:class:`SourceLines`.
+
+    :param str text: the source code that the lines are read from.
+    :param normalise: the function with which the reader creates a line \
+        from the text of the source line.
+    :type normalise: Callable[[str], str]
+
+    """
+
+    __slots__ = ("_text", "_normalise", "_starts", "_offset")
+
+    def __init__(self, text, normalise):
+        self._text = text
+        self._normalise = normalise
+        # The offset of the start of each line in `_text`.
+        self._starts = array("q")
+        # The number of lines that have been discarded.
+        self._offset = 0
+
+    def __len__(self):
+        return self._offset + len(self._starts)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("source line index out of range")
+        if index < self._offset:
+            return ""
+        text = self._text
+        start = self._starts[index - self._offset]
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        return self._normalise(text[start:end])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    @property
+    def discarded(self):
+        """
+        :returns: the number of lines that have been discarded.
+        :rtype: int
+
+        """
+        return self._offset
+
+    def append_start(self, start):
+        """
+        :param int start: the offset of the start of the next source line.
+
+        """
+        self._starts.append(start)
+
+    def discard(self, count):
+        """
+        Discards the first `count` lines (or all of them if there are
+        fewer). Lines that have already been discarded are unaffected.
+
+        :param int count: the number of lines from the start of the \
+            source to discard.
+
+        """
+        count = min(count, len(self)) - self._offset
+        if count <= 0:
+            return
+        del self._starts[:count]
+        self._offset += count
+
+
+class SourceBuffer:
+    """
+    Fortran source code held in a single string. This is iterated over
+    line by line, in the same way as a file or StringIO except that the
+    lines do not include the newline character. Unlike a StringIO, the
+    code is not copied: it is split into lines a chunk at a time.
+
+    :param str text: the source code.
+
+    """
+
+    __slots__ = ("text", "offset", "line_start", "closed", "_lines", "_next_start")
+
+    # The (approximate) number of characters that are split into lines at
+    # a time.
+    CHUNK_SIZE = 32768
+
+    def __init__(self, text):
+        self.text = text
+        # The offset of the start of the next chunk.
+        self.offset = 0
+        # The offset of the start of the line returned most recently and,
+        # until it is returned, of the next one.
+        self.line_start = 0
+        self._next_start = 0
+        self.closed = False
+        # The remaining lines of the current chunk, in reverse order.
+        self._lines = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        lines = self._lines
+        if not lines:
+            text = self.text
+            start = self.offset
+            if start >= len(text):
+                raise StopIteration
+            # Each chunk ends at the end of a line.
+            end = text.find("\n", start + self.CHUNK_SIZE) + 1 or len(text)
+            self.offset = end
+            lines = text[start:end].split("\n")
+            if not lines[-1]:
+                lines.pop()
+            lines.reverse()
+            self._lines = lines
+        line = lines.pop()
+        self.line_start = self._next_start
+        self._next_start += len(line) + 1
+        return line
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} of {len(self.text)} characters>"
+
+    def getvalue(self):
+        """
+        :returns: all of the source code.
+        :rtype: str
+
+        """
+        return self.text
+
+    def close(self):
+        """
+        Marks the source as closed (the code itself is kept since the
+        source lines of a reader may refer to it).
+
+        """
+        self.closed = True
+
+
 ##############################################################################
 
 
@@ -548,7 +837,8 @@ class FortranReaderBase:
 
     :param source: a file-like object with .next() method used to \
                    retrive a line.
-    :type source: :py:class:`StringIO` or a file handle
+    :type source: :py:class:`SourceBuffer` or :py:class:`StringIO` or a \
+                  file handle
     :param mode: a FortranFormat object as returned by \
                  `sourceinfo.get_source_info()`
     :type mode: :py:class:`fparser.common.sourceinfo.Format`
@@ -557,17 +847,41 @@ class FortranReaderBase:
     :param Optional[bool] include_omp_conditional_lines: whether or not the
         content of a line with an OMP sentinel is parsed or not. Default is
         False (in which case it is treated as a Comment).
+    :param Optional[bool] lean: whether or not to release the caches of
+        each item once a node has been matched from it that can no longer
+        be undone (see `commit`) and, if the code is held in a
+        :py:class:`SourceBuffer`, to keep only the offset of each source
+        line (see :py:class:`SourceLineIndex`). Default is False.
 
     The Fortran source is iterated by `get_single_line`,
     `get_next_line`, `put_single_line` methods.
 
+    Items may be returned to the reader one at a time with `put_item`.
+    A speculative match of many items (e.g. of a block) should instead
+    take a `checkpoint` first so that, if it fails, the reader can be
+    returned to that point with `rollback` in constant time:
+
+    >>> mark = reader.checkpoint()
+    >>> try:
+    ...     matched = match_block(reader)
+    ...     if not matched:
+    ...         reader.rollback(mark)
+    ... finally:
+    ...     reader.release(mark)
+
     """
 
     def __init__(
-        self, source, mode, ignore_comments, include_omp_conditional_lines=False
+        self,
+        source,
+        mode,
+        ignore_comments,
+        include_omp_conditional_lines=False,
+        lean=False,
     ):
         self.source = source
         self._include_omp_conditional_lines = include_omp_conditional_lines
+        self._lean = lean
         self.set_format(mode)
         self.linecount = 0  # the current number of consumed lines
         self.isclosed = False
@@ -576,13 +890,30 @@ class FortranReaderBase:
         self._ignore_comments = ignore_comments
 
         self.filo_line = []  # used for un-consuming lines.
-        self.fifo_item = []
-        self.source_lines = []  # source lines cache
+        self.fifo_item = deque()
+        # The items returned by `next` while there are checkpoints (and any
+        # that have been returned to the reader since). Those before
+        # `_position` have been consumed and the rest are still to be read.
+        self._history = []
+        self._position = 0
+        # The number of checkpoints that have not been released.
+        self._checkpoints = 0
+        # Source lines cache. If the code is held in a SourceBuffer then
+        # the lines refer to it rather than being copied and, if this
+        # reader is lean, only the start of each line is kept.
+        self._source_spans = isinstance(source, SourceBuffer)
+        self._line_index = lean and self._source_spans
+        if self._line_index:
+            self.source_lines = SourceLineIndex(source.text, self._normalise_line)
+        else:
+            self.source_lines = SourceLines(source.text if self._source_spans else None)
 
         self.f2py_comment_lines = []  # line numbers of f2py directives
 
         self.reader = None
         self.include_dirs = ["."]
+        # The files that have been included (at any depth) by this reader.
+        self.included_files = []
 
         self.source_only = None
 
@@ -672,6 +1003,33 @@ class FortranReaderBase:
         """
         return self._format
 
+    @property
+    def ignore_comments(self):
+        """
+        :returns: whether or not comments are ignored by default.
+        :rtype: bool
+        """
+        return self._ignore_comments
+
+    @property
+    def include_omp_conditional_lines(self):
+        """
+        :returns: whether or not the content of lines with an OMP \
+            sentinel is read (rather than treated as a comment).
+        :rtype: bool
+        """
+        return self._include_omp_conditional_lines
+
+    @property
+    def lean(self):
+        """
+        :returns: whether or not this reader releases the caches of the \
+            items that have been matched and keeps only the offsets of the \
+            source lines.
+        :rtype: bool
+        """
+        return self._lean
+
     @property
     def name(self):
         """
@@ -698,6 +1056,25 @@ class FortranReaderBase:
         self.filo_line.append(line)
         self.linecount -= 1
 
+    def _normalise_line(self, raw_line):
+        """
+        :param str raw_line: a line of the source code.
+
+        :returns: the line with tabs expanded, special symbols replaced \
+            and trailing white space (including newline characters) removed.
+        :rtype: str
+
+        """
+        line = raw_line.expandtabs().replace("\xa0", " ").rstrip()
+        if self._include_omp_conditional_lines and self._format.is_fixed:
+            # Fixed-format line sentinels can be handled here, since a
+            # continuation line does not depend on the previous line. The
+            # regular expression checks for both an initial or a continuation
+            # line, and if it is found, the sentinel is replaced with two
+            # spaces:
+            line, _ = self.replace_omp_sentinels(line, self._re_omp_sentinel)
+        return line
+
     def get_single_line(self, ignore_empty=False, ignore_comments=None):
         """ Return line from FILO line buffer or from source.
 
@@ -730,24 +1107,23 @@ class FortranReaderBase:
         if self.isclosed:
             return None
         try:
-            line = next(self.source)
+            raw_line = next(self.source)
         except StopIteration:
             self.isclosed = True
             self.close_source()
             return None
         self.linecount += 1
 
-        # expand tabs, replace special symbols, get rid of nl characters
-        line = line.expandtabs().replace("\xa0", " ").rstrip()
-        if self._include_omp_conditional_lines and self._format.is_fixed:
-            # Fixed-format line sentinels can be handled here, since a
-            # continuation line does not depend on the previous line. The
-            # regular expression checks for both an initial or a continuation
-            # line, and if it is found, the sentinel is replaced with two
-            # spaces:
-            line, _ = self.replace_omp_sentinels(line, self._re_omp_sentinel)
-
-        self.source_lines.append(line)
+        line = self._normalise_line(raw_line)
+        if self._line_index:
+            self.source_lines.append_start(self.source.line_start)
+        elif self._source_spans and raw_line.startswith(line):
+            # The line is unchanged (apart from trailing white space) so
+            # it is held as its position in the source code.
+            start = self.source.line_start
+            self.source_lines.append_span(start, start + len(line))
+        else:
+            self.source_lines.append(line)
 
         if ignore_comments and (self._format.is_fixed or self._format.is_f77):
             # Check for a fixed-format comment. If the current line *is*
@@ -802,12 +1178,90 @@ class FortranReaderBase:
                     :py:class:`fparser.common.readfortran.MultiLine` | \
                     :py:class:`fparser.common.readfortran.Comment`
         """
-        if self.reader:
+        history = self._history
+        position = self._position
+        if position and history[position - 1] is item:
+            # This is the last item that was read.
+            self._position = position - 1
+            return
+        for idx in range(position - 2, -1, -1):
+            if history[idx] is item:
+                # An earlier item that was read. Move it so that it is the
+                # next to be read (rather than recording it twice when it
+                # is read again).
+                del history[idx]
+                self._position = position - 1
+                history.insert(position - 1, item)
+                return
+        if position < len(history):
+            # The item must be read before those that have been returned.
+            self._history.insert(position, item)
+        elif self.reader:
             # We are reading an INCLUDE file so put this item in the FIFO
             # of the corresponding reader.
             self.reader.put_item(item)
         else:
-            self.fifo_item.insert(0, item)
+            self.fifo_item.appendleft(item)
+
+    def checkpoint(self):
+        """
+        Marks the current position of the reader so that it can be
+        returned there by `rollback`. Each checkpoint must be released
+        (see `release`) once it is no longer needed. Checkpoints may be
+        nested.
+
+        :returns: the mark of the current position.
+        :rtype: int
+
+        """
+        self._checkpoints += 1
+        return self._position
+
+    def rollback(self, mark):
+        """
+        Returns the reader to the position of a checkpoint so that the
+        items read since then (that have not been put back) are read again.
+        The checkpoint is not released.
+
+        :param int mark: the mark returned by `checkpoint`.
+
+        """
+        self._position = mark
+
+    def release(self, mark):
+        """
+        Releases a checkpoint. Once there are no checkpoints, the items
+        that have been read are no longer kept.
+
+        :param int mark: the mark returned by `checkpoint`.
+
+        """
+        # pylint: disable=unused-argument
+        self._checkpoints -= 1
+        if not self._checkpoints and self._position:
+            if self._lean:
+                # The matches of these items can no longer be undone.
+                for item in self._history[: self._position]:
+                    if isinstance(item, Line):
+                        item.release_caches()
+            del self._history[: self._position]
+            self._position = 0
+
+    def commit(self, item):
+        """
+        Notes that a node has been matched from an item. If this reader is
+        lean and there are no checkpoints (so that the match cannot be
+        undone by `rollback`) then the caches of the item are released
+        since they are no longer needed. Otherwise they are released when
+        the last checkpoint is.
+
+        :param item: the item that has been matched.
+        :type item: :py:class:`fparser.common.readfortran.Line` | \
+                    :py:class:`fparser.common.readfortran.MultiLine`
+
+        """
+        if self._lean and not self._checkpoints and isinstance(item, Line):
+            item.release_caches()
 
     # Iterator methods:
 
@@ -837,6 +1291,66 @@ class FortranReaderBase:
         """
         if ignore_comments is None:
             ignore_comments = self._ignore_comments
+        history = self._history
+        if history:
+            # First read any items that have been returned to the reader.
+            while self._position < len(history):
+                item = history[self._position]
+                self._position += 1
+                if not item.isempty(ignore_comments):
+                    return item
+            if not self._checkpoints:
+                history.clear()
+                self._position = 0
+        item = self._next_item(ignore_comments)
+        if self._checkpoints:
+            history.append(item)
+            self._position += 1
+        return item
+
+    def open_include(self, filename, ignore_comments):
+        """
+        Finds a file that is included by the code in the include
+        directories of this reader and creates a reader for it.
+
+        :param str filename: the name of the file given by the INCLUDE line.
+        :param bool ignore_comments: whether or not the reader of the file \
+            ignores comments.
+
+        :returns: the path of the file and a reader for it or None if the \
+            file cannot be found.
+        :rtype: Optional[Tuple[str, \
+            :py:class:`fparser.common.readfortran.FortranReaderBase`]]
+
+        """
+        include_dirs = self.include_dirs[:]
+        path = filename
+        for incl_dir in include_dirs:
+            path = os.path.join(incl_dir, filename)
+            if os.path.exists(path):
+                break
+        if not os.path.isfile(path):
+            return None
+        reader = FortranFileReader(
+            path,
+            include_dirs=include_dirs,
+            ignore_comments=ignore_comments,
+            lean=self._lean,
+        )
+        return path, reader
+
+    def _next_item(self, ignore_comments):
+        """
+        :param bool ignore_comments: whether or not to skip comments and \
+            blank lines.
+
+        :returns: the next item from an included file, the FIFO buffer or \
+            the source. See `next`.
+        :rtype: py:class:`fparser.common.readfortran.Line`
+
+        :raises StopIteration: if no more lines are found.
+
+        """
         try:
             if self.reader is not None:
                 # inside INCLUDE statement
@@ -853,13 +1367,8 @@ class FortranReaderBase:
                 # to enter to included file.
                 reader = item.reader
                 filename = item.line.strip()[7:].lstrip()[1:-1]
-                include_dirs = self.include_dirs[:]
-                path = filename
-                for incl_dir in include_dirs:
-                    path = os.path.join(incl_dir, filename)
-                    if os.path.exists(path):
-                        break
-                if not os.path.isfile(path):
+                included = self.open_include(filename, ignore_comments)
+                if included is None:
                     # The include file does not exist in the specified
                     # locations.
                     #
@@ -870,10 +1379,11 @@ class FortranReaderBase:
                     # return it and let the parser deal with it.
                     #
                     return item
+                path, self.reader = included
                 reader.info("including file %r" % (path), item)
-                self.reader = FortranFileReader(
-                    path, include_dirs=include_dirs, ignore_comments=ignore_comments
-                )
+                self.included_files.append(path)
+                # Share the list so that nested inclusions are recorded too.
+                self.reader.included_files = self.included_files
                 result = self.reader.next(ignore_comments=ignore_comments)
                 return result
             return item
@@ -912,11 +1422,11 @@ class FortranReaderBase:
         """
         if ignore_comments is None:
             ignore_comments = self._ignore_comments
-        fifo_item_pop = self.fifo_item.pop
+        fifo_item_pop = self.fifo_item.popleft
         while 1:
             try:
                 # first empty the FIFO item buffer:
-                item = fifo_item_pop(0)
+                item = fifo_item_pop()
             except IndexError:
                 # construct a new item from source
                 item = self.get_source_item()
@@ -967,9 +1477,8 @@ class FortranReaderBase:
                         )
                         items.append(new_line)
                 items.reverse()
-                for newitem in items:
-                    self.fifo_item.insert(0, newitem)
-                return fifo_item_pop(0)
+                self.fifo_item.extendleft(items)
+                return fifo_item_pop()
         return item
 
     # Interface to returned items:
@@ -1619,7 +2128,7 @@ class FortranReaderBase:
         # blank. If it is a comment, it has been pushed onto the
         # fifo_item list.
         try:
-            return self.fifo_item.pop(0)
+            return self.fifo_item.popleft()
         except IndexError:
             # A blank line is represented as an empty comment
             return Comment("", (startlineno, endlineno), self)
@@ -1640,6 +2149,9 @@ class FortranFileReader(FortranReaderBase):
     :param Optional[bool] include_omp_conditional_lines: whether or not the
         content of a line with an OMP sentinel is parsed or not. Default is
         False (in which case it is treated as a Comment).
+    :param Optional[bool] lean: whether or not to release the caches of the
+        items that have been matched and keep only the offsets of the source
+        lines (see :py:class:`FortranReaderBase`). Default is False.
 
     For example::
 
@@ -1657,6 +2169,7 @@ class FortranFileReader(FortranReaderBase):
         ignore_comments=True,
         ignore_encoding=True,
         include_omp_conditional_lines=False,
+        lean=False,
     ):
         # The filename is used as a unique ID. This is then used to cache the
         # contents of the file. Obviously if the file changes content but not
@@ -1665,30 +2178,39 @@ class FortranFileReader(FortranReaderBase):
         self._close_on_destruction = False
         if isinstance(file_candidate, str):
             self.id = file_candidate
-            # The 'fparser-logging' handler for errors ensures that any invalid
+            # The file is read once (rather than once to determine its format
+            # and then again line by line) and closed straight away. The
+            # 'fparser-logging' handler for errors ensures that any invalid
             # characters in the input are skipped but logged.
-            self.file = open(
+            with open(
                 file_candidate, "r", encoding="UTF-8", errors="fparser-logging"
-            )
-            self._close_on_destruction = True
+            ) as source_file:
+                self.file = SourceBuffer(source_file.read())
+            if os.path.splitext(file_candidate)[1] == ".pyf":
+                mode = fparser.common.sourceinfo.FortranFormat(True, True)
+            else:
+                mode = fparser.common.sourceinfo.get_source_info_str(
+                    self.file.text, ignore_encoding=ignore_encoding
+                )
         elif hasattr(file_candidate, "read") and hasattr(
             file_candidate, "name"
         ):  # Is likely a file
             self.id = file_candidate.name
             self.file = file_candidate
+            mode = fparser.common.sourceinfo.get_source_info(
+                file_candidate, ignore_encoding
+            )
         else:  # Probably not something we can deal with
             message = "FortranFileReader is used with a filename"
             message += " or file-like object."
             raise ValueError(message)
-        mode = fparser.common.sourceinfo.get_source_info(
-            file_candidate, ignore_encoding
-        )
 
         super().__init__(
             self.file,
             mode,
             ignore_comments,
             include_omp_conditional_lines=include_omp_conditional_lines,
+            lean=lean,
         )
 
         if include_dirs is None:
@@ -1702,6 +2224,22 @@ class FortranFileReader(FortranReaderBase):
         if self._close_on_destruction:
             self.file.close()
 
+    def __getstate__(self):
+        """
+        Open files cannot be pickled so the file is dropped from the state
+        of a pickled reader (e.g. as part of a parse tree). An unpickled
+        reader therefore cannot read any further.
+
+        :returns: the state of this reader without the file.
+        :rtype: dict
+
+        """
+        state = self.__dict__.copy()
+        state["file"] = None
+        state["source"] = None
+        state["_close_on_destruction"] = False
+        return state
+
     def close_source(self):
         self.file.close()
 
@@ -1721,6 +2259,9 @@ class FortranStringReader(FortranReaderBase):
     :param Optional[bool] include_omp_conditional_lines: whether or not
         the content of a line with an OMP sentinel is parsed or not. Default
         is False (in which case it is treated as a Comment).
+    :param Optional[bool] lean: whether or not to release the caches of
+        the items that have been matched and keep only the offsets of the
+        source lines (see :py:class:`FortranReaderBase`). Default is False.
 
     For example:
 
@@ -1743,6 +2284,7 @@ class FortranStringReader(FortranReaderBase):
         ignore_comments=True,
         ignore_encoding=True,
         include_omp_conditional_lines=False,
+        lean=False,
     ):
         # The Python ID of the string was used to uniquely identify it for
         # caching purposes. Unfortunately this ID is only unique for the
@@ -1754,7 +2296,7 @@ class FortranStringReader(FortranReaderBase):
         # anyway.
         #
         self.id = "string-" + str(hash(string))
-        source = StringIO(string)
+        source = SourceBuffer(string)
         mode = fparser.common.sourceinfo.get_source_info_str(
             string, ignore_encoding=ignore_encoding
         )
@@ -1763,6 +2305,7 @@ class FortranStringReader(FortranReaderBase):
             mode,
             ignore_comments,
             include_omp_conditional_lines=include_omp_conditional_lines,
+            lean=lean,
         )
         if include_dirs is not None:
             self.include_dirs = include_dirs[:]
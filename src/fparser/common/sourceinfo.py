@@ -227,6 +227,28 @@ _HAS_PYF_HEADER = re.compile(r"-[*]-\s*pyf\s*-[*]-", re.I).search
 _FREE_FORMAT_START = re.compile(r"[^c*!]\s*[^\s\d\t]", re.I).match
 
 
+def _iter_lines(source, chunk_size=32768):
+    """
+    Generates the lines of a string in the same way as `str.splitlines`
+    but without splitting all of it up front.
+
+    :param str source: the string to split.
+    :param int chunk_size: the (approximate) number of characters to \
+        split at a time.
+
+    :returns: each line in turn (without its line boundary).
+    :rtype: Generator[str]
+
+    """
+    start = 0
+    while start < len(source):
+        # Each chunk ends with a newline (or the end of the string) and so
+        # is split in the same way as it would be as part of the whole.
+        end = source.find("\n", start + chunk_size) + 1 or len(source)
+        yield from source[start:end].splitlines()
+        start = end
+
+
 def get_source_info_str(source, ignore_encoding=True):
     """
     Determines the format of Fortran source held in a string.
@@ -238,15 +260,14 @@ def get_source_info_str(source, ignore_encoding=True):
     :rtype: :py:class:`fparser.common.sourceinfo.FortranFormat`
 
     """
-    lines = source.splitlines()
-    if not lines:
+    if not source:
         return FortranFormat(False, False)
 
     if not ignore_encoding:
         # We check to see whether the file contains a comment describing its
         # encoding. This has nothing to do with the Fortran standard (see e.g.
         # https://peps.python.org/pep-0263/) and hence is not done by default.
-        firstline = lines[0].lstrip()
+        firstline = next(_iter_lines(source)).lstrip()
         if _HAS_F_HEADER(firstline):
             # -*- fortran -*- implies Fortran77 so fixed format.
             return FortranFormat(False, True)
@@ -259,13 +280,17 @@ def get_source_info_str(source, ignore_encoding=True):
 
     line_tally = 10000  # Check up to this number of non-comment lines
     is_free = False
-    while line_tally > 0 and lines:
-        line = lines.pop(0).rstrip()
+    # The lines are scanned one at a time since the format can usually be
+    # determined from the first few.
+    for line in _iter_lines(source):
+        line = line.rstrip()
         if line and line[0] != "!":
             line_tally -= 1
             if line[0] != "\t" and _FREE_FORMAT_START(line[:5]) or line[-1:] == "&":
                 is_free = True
                 break
+            if line_tally == 0:
+                break
 
     return FortranFormat(is_free, False)
 
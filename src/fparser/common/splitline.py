@@ -76,7 +76,12 @@ First version created: May 2006
 """
 
 
+import functools
 import re
+import threading
+from contextlib import contextmanager
+
+from fparser.common.lexer import scan
 
 
 class String(str):
@@ -125,31 +130,168 @@ class StringReplaceDict(dict):
         return line
 
 
+class _SharedStringReplaceDict(StringReplaceDict):
+    """
+    A StringReplaceDict that cannot be modified. This is the type of the
+    map returned by :py:func:`string_replace_map` since the same map is
+    returned to every caller that supplies the same line. A modifiable
+    copy can be made with `StringReplaceDict(repmap)`.
+
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(
+            "The map returned by string_replace_map() is shared and cannot be "
+            "modified. Use StringReplaceDict(repmap) to make a copy."
+        )
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+# The map returned by string_replace_map when nothing is replaced.
+_EMPTY_MAP = _SharedStringReplaceDict()
+
+
+class MemoCache:
+    """
+    Bounded cache of the results of a function (see :py:func:`memoize`).
+    When the cache is full, the least-recently-used result is discarded.
+    Lines have temporal locality (the same substrings of a statement are
+    processed many times while it is being parsed) so a modest bound
+    loses few hits while stopping the cache growing without limit in a
+    process that parses many files. The cache is implemented with
+    `functools.lru_cache` and so is thread-safe.
+
+    If `scoped` is True then the cache is also cleared at the end of
+    each (outermost) `scope`. fparser2 opens a scope for each parse
+    of a program (or of a program unit when parsing one unit at a time).
+
+    :param function: the function whose results are to be cached.
+    :type function: Callable
+    :param maxsize: the maximum number of results to keep (None for no \
+        limit and 0 to disable the cache).
+    :type maxsize: Optional[int]
+    :param bool scoped: whether to clear the cache at the end of a scope.
+
+    """
+
+    def __init__(self, function, maxsize=1024, scoped=False):
+        self.scoped = scoped
+        self._function = function
+        # The hits and misses of the caches replaced by `resize`.
+        self._hits = 0
+        self._misses = 0
+        # The depth of nested scopes (in all threads) and the lock that
+        # guards it.
+        self._depth = 0
+        self._depth_lock = threading.Lock()
+        self.call = None
+        self.resize(maxsize)
+
+    def __len__(self):
+        return self.call.cache_info().currsize
+
+    @property
+    def hits(self):
+        """
+        :returns: the number of calls whose result was found in the cache.
+        :rtype: int
+
+        """
+        return self._hits + self.call.cache_info().hits
+
+    @property
+    def misses(self):
+        """
+        :returns: the number of calls whose result was not in the cache.
+        :rtype: int
+
+        """
+        return self._misses + self.call.cache_info().misses
+
+    @property
+    def size(self):
+        """
+        :returns: the number of results in the cache.
+        :rtype: int
+
+        """
+        return self.call.cache_info().currsize
+
+    @property
+    def maxsize(self):
+        """
+        :returns: the maximum number of results in the cache (None if \
+            there is no limit).
+        :rtype: Optional[int]
+
+        """
+        return self.call.cache_info().maxsize
+
+    def resize(self, maxsize):
+        """
+        Change the maximum number of results in the cache. The cache is
+        cleared.
+
+        :param maxsize: the maximum number of results to keep (None for \
+            no limit and 0 to disable the cache).
+        :type maxsize: Optional[int]
+
+        """
+        if self.call is not None:
+            info = self.call.cache_info()
+            self._hits += info.hits
+            self._misses += info.misses
+        # The cached version of the function.
+        self.call = functools.lru_cache(maxsize=maxsize)(self._function)
+
+    def clear(self):
+        """
+        Remove all cached results (but leave the hit/miss counts intact).
+
+        """
+        self.resize(self.maxsize)
+
+    @contextmanager
+    def scope(self):
+        """
+        Context manager marking the extent of a parse. If the cache is
+        `scoped` then it is cleared when the outermost scope ends. Scopes
+        in different threads are nested in the same way, so the cache is
+        only cleared once no parse is in progress.
+
+        """
+        with self._depth_lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._depth_lock:
+                self._depth -= 1
+                if self._depth == 0 and self.scoped:
+                    self.clear()
+
+
 def memoize(function):
-    """Simple memoization decorator.
+    """Memoization decorator that keeps the results of the function in a
+    bounded :py:class:`MemoCache`, available as the `cache` attribute of
+    the decorated function.
 
     :param function: The function to memoize.
     :type function: Callable
 
-    Note: Python 3.9 comes with a thread-safe and more efficient cache as it
-    can be bounded and we are interested in lines that have temporal locality.
-    It's the: @functools.lru_cache(maxsize=8)
-
     """
-    memo = {}
+    cache = MemoCache(function)
 
+    @functools.wraps(function)
     def wrapper(*args, **kwargs):
-        key = args
-        if kwargs:
-            for item in kwargs.items():
-                key += item
-        result = memo.get(key, None)
-        if result is not None:
-            return result
-        result = function(*args, **kwargs)
-        memo[key] = result
-        return result
+        return cache.call(*args, **kwargs)
 
+    wrapper.cache = cache
     return wrapper
 
 
@@ -165,7 +307,8 @@ def string_replace_map(line, lower=False):
     :param bool lower: whether or not the call to splitquote() should return \
         items as lowercase (default is to leave the case unchanged).
 
-    :returns: a new line and the replacement map.
+    :returns: a new line and the replacement map. The results are cached \
+        (see :py:func:`memoize`) so the map is shared and cannot be modified.
     :rtype: 2-tuple of str and \
             :py:class:`fparser.common.splitline.StringReplaceDict`
 
@@ -176,7 +319,7 @@ def string_replace_map(line, lower=False):
     parens_idx = 0
 
     items = []
-    string_map = StringReplaceDict()
+    string_map = {}
     rev_string_map = {}
     for item in splitquote(line, lower=lower)[0]:
         if isinstance(item, String) and not _is_simple_str(item[1:-1]):
@@ -236,7 +379,14 @@ def string_replace_map(line, lower=False):
                 entry = entry.replace(inc_key, string_map[inc_key], 1)
             string_map[key] = entry
 
-    return "".join(items), string_map
+    newline = "".join(items)
+    if not string_map:
+        # Nothing was replaced so avoid holding another copy of the line
+        # (and another empty map).
+        if newline == line:
+            newline = line
+        return newline, _EMPTY_MAP
+    return newline, _SharedStringReplaceDict(string_map)
 
 
 def splitquote(line, stopchar=None, lower=False, quotechars="\"'"):
@@ -263,6 +413,9 @@ def splitquote(line, stopchar=None, lower=False, quotechars="\"'"):
     :rtype: Tuple[List[str], str]
 
     """
+    if stopchar is None and quotechars == "\"'":
+        # Let the scanner find the quoted strings.
+        return _splitquote_lexed(line, lower)
     # Will hold the various parts that `line` is split into.
     items = []
     # The current position in the line being processed.
@@ -339,6 +492,34 @@ def splitquote(line, stopchar=None, lower=False, quotechars="\"'"):
     return items, stopchar
 
 
+def _splitquote_lexed(line, lower):
+    """
+    Implements `splitquote` for a line that does not continue a quoted
+    string from a previous line, using the strings found by the scanner.
+
+    :param str line: the line to split.
+    :param bool lower: whether or not to convert the parts of the line \
+                       that are not quoted strings to lowercase.
+
+    :returns: the same as `splitquote`.
+    :rtype: Tuple[List[str], str]
+
+    """
+    structure = scan(line)
+    items = []
+    pos = 0
+    for start, end in structure.strings:
+        if start > pos:
+            item = line[pos:start]
+            items.append(item.lower() if lower else item)
+        items.append(String(line[start:end]))
+        pos = end
+    if pos < len(line):
+        item = line[pos:]
+        items.append(item.lower() if lower else item)
+    return items, structure.stopchar
+
+
 def splitparen(line, paren_open="([", paren_close=")]"):
     """
     Splits a line into top-level parenthesis and not-parenthesised
@@ -355,6 +536,10 @@ def splitparen(line, paren_open="([", paren_close=")]"):
 
     assert len(paren_open) == len(paren_close)
 
+    if paren_open == "([" and paren_close == ")]":
+        # Let the scanner find the bracketed groups.
+        return _splitparen_lexed(line)
+
     items = []  # Result list
     num_backslashes = 0  # Counts consecutive "\" characters
     # Empty if outside quotes, or set to the starting (and therefore
@@ -407,3 +592,30 @@ def splitparen(line, paren_open="([", paren_close=")]"):
     if start != len(line):
         items.append(line[start:])
     return items
+
+
+def _splitparen_lexed(line):
+    """
+    Implements `splitparen` for the default brackets using the
+    top-level groups found by the scanner.
+
+    :param str line: the string to split.
+
+    :returns: the same as `splitparen`.
+    :rtype: list of str
+
+    """
+    items = []
+    pos = 0
+    for start, end in scan(line).groups:
+        items.append(line[pos:start])
+        if end is None:
+            # The bracket is never closed so the rest of the line is
+            # not a ParenString.
+            pos = start
+            break
+        items.append(ParenString(line[start:end]))
+        pos = end
+    if pos != len(line):
+        items.append(line[pos:])
+    return items
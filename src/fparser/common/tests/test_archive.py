@@ -0,0 +1,186 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+"""Module containing tests for the fparser.common.archive module."""
+
+import gzip
+import io
+import pickle
+import tarfile
+import zipfile
+
+import pytest
+
+from fparser.common.archive import (
+    ArchiveMember,
+    FortranArchive,
+    FortranArchiveReader,
+    ReaderFactory,
+)
+from fparser.common.readfortran import FortranFileReader
+from fparser.two import Fortran2003
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.utils import walk
+
+# The files in the archives. The program includes a file in its own
+# directory which in turn includes one at the top of the archive.
+SOURCES = {
+    "src/prog.f90": "program prog\n  include 'decls.h'\n  x = y\nend program prog\n",
+    "src/decls.h": "  include 'common.inc'\n  real :: x\n",
+    "common.inc": "  real :: y\n",
+    "src/old.f": "      subroutine old(a)\n      a = 1\n      end\n",
+    "src/missing.F90": "subroutine s\n  include 'missing.h'\nend subroutine s\n",
+}
+
+EXPECTED_PROG = "PROGRAM prog\n  REAL :: y\n  REAL :: x\n  x = y\nEND PROGRAM prog"
+
+
+@pytest.fixture(name="archive_path", params=["tar.gz", "tar", "zip"])
+def fixture_archive_path(tmp_path, request):
+    """
+    :returns: the path of an archive of SOURCES.
+    :rtype: str
+
+    """
+    path = tmp_path / f"release.{request.param}"
+    if request.param == "zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("src/", "")
+            for name, source in SOURCES.items():
+                archive.writestr(name, source)
+    else:
+        mode = "w:gz" if request.param == "tar.gz" else "w"
+        with tarfile.open(path, mode) as archive:
+            info = tarfile.TarInfo("./src")
+            info.type = tarfile.DIRTYPE
+            archive.addfile(info)
+            for name, source in SOURCES.items():
+                data = source.encode()
+                info = tarfile.TarInfo("./" + name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    return str(path)
+
+
+def test_archive_names(archive_path):
+    """Test that the files in an archive are listed in order (without any
+    directories) and that they can be read."""
+    with FortranArchive(archive_path) as archive:
+        assert archive.names() == list(SOURCES)
+        assert archive.fortran_names() == [
+            "src/prog.f90",
+            "src/old.f",
+            "src/missing.F90",
+        ]
+        assert archive.fortran_names(extensions=(".h",)) == ["src/decls.h"]
+        assert "./src/decls.h" in archive
+        assert "src" not in archive
+        assert archive.read("src/old.f") == SOURCES["src/old.f"]
+        with pytest.raises(FileNotFoundError) as err:
+            archive.read("src/none.f90")
+        assert f"There is no file 'src/none.f90' in archive '{archive_path}'" in str(
+            err.value
+        )
+        members = archive.members()
+        assert members[0] == ArchiveMember(archive_path, "src/prog.f90")
+        assert str(members[0]) == archive_path + "/src/prog.f90"
+        assert archive.members(["common.inc"]) == [
+            ArchiveMember(archive_path, "common.inc")
+        ]
+
+
+def test_archive_reader(archive_path):
+    """Test that the code in an archive is parsed in the same way as that in
+    a file, with INCLUDE lines resolved against the other files in the
+    archive."""
+    parser = Parser()
+    with FortranArchive(archive_path) as archive:
+        reader = archive.reader("src/prog.f90")
+        assert isinstance(reader, FortranArchiveReader)
+        assert reader.id == archive_path + "/src/prog.f90"
+        assert reader.include_dirs == ["src", "."]
+        tree = ParseContext(parser).parse(reader)
+        assert str(tree) == EXPECTED_PROG
+        assert reader.included_files == [
+            archive_path + "/src/decls.h",
+            archive_path + "/common.inc",
+        ]
+        # The format is determined from the code.
+        reader = archive.reader("src/old.f", lean=True)
+        assert reader.format.mode == "fix"
+        assert reader.lean
+        tree = ParseContext(parser).parse(reader)
+        assert "SUBROUTINE old(a)" in str(tree)
+        # An include file that is not in the archive is left as an INCLUDE.
+        tree = ParseContext(parser).parse(archive.reader("src/missing.F90"))
+        assert walk(tree, Fortran2003.Include_Stmt)
+        # A tree may be pickled (without the archive).
+        tree = ParseContext(parser).parse(archive.reader("src/prog.f90"))
+    assert str(pickle.loads(pickle.dumps(tree))) == EXPECTED_PROG
+
+
+def test_gzip_archive(tmp_path):
+    """Test that a gzip archive holds a single file named after it."""
+    path = tmp_path / "prog.f90.gz"
+    with gzip.open(path, "wt") as gzip_file:
+        gzip_file.write("program p\r\n  x = 1\r\nend program p\r\n")
+    with FortranArchive(str(path)) as archive:
+        assert archive.names() == ["prog.f90"]
+        # Line endings are converted as they are for a file on disk.
+        assert archive.read("prog.f90") == "program p\n  x = 1\nend program p\n"
+        tree = ParseContext(Parser()).parse(archive.reader("prog.f90"))
+        assert str(tree) == "PROGRAM p\n  x = 1\nEND PROGRAM p"
+    path = tmp_path / "prog.f90"
+    path.write_text("program p\nend program p\n")
+    with pytest.raises(ValueError) as err:
+        FortranArchive(str(path))
+    assert "is not a tar, zip or gzip archive" in str(err.value)
+
+
+def test_reader_factory(archive_path, tmp_path):
+    """Test that a ReaderFactory creates readers of files and of files in
+    archives, opening each archive once."""
+    path = tmp_path / "prog.f90"
+    path.write_text("program p\nend program p\n")
+    with ReaderFactory(ignore_comments=False) as readers:
+        reader = readers(str(path))
+        assert isinstance(reader, FortranFileReader)
+        assert not reader.ignore_comments
+        member = ArchiveMember(archive_path, "src/prog.f90")
+        reader = readers(member)
+        assert isinstance(reader, FortranArchiveReader)
+        assert not reader.ignore_comments
+        assert readers(member).archive is reader.archive
+        assert readers.archive(archive_path) is reader.archive
+    assert not readers._archives
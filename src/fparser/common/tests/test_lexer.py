@@ -0,0 +1,62 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Tests for the single-pass quote and bracket scanner.
+
+"""
+
+import pytest
+
+from fparser.common.lexer import scan
+
+
+@pytest.mark.parametrize(
+    "line, strings, groups, stopchar",
+    [
+        ("", [], [], None),
+        ("a(b)(c) d", [], [(1, 4), (4, 7)], None),
+        ("x = '(' // \"'\"", [(4, 7), (11, 14)], [], None),
+        ("f(a, (b)) = 'it''s", [(12, 16), (16, 18)], [(1, 9)], "'"),
+        ("(a]", [], [(0, None)], None),
+        (r"a\(b) '\'' ", [(6, 10)], [], None),
+    ],
+)
+def test_scan(line, strings, groups, stopchar):
+    """Test that scan finds the strings and top-level bracketed groups."""
+    structure = scan(line)
+    assert structure.strings == strings
+    assert structure.groups == groups
+    assert structure.stopchar == stopchar
@@ -0,0 +1,332 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""Module containing tests for the fparser.common.parse_cache module."""
+
+import io
+import os
+import pickle
+
+import pytest
+
+from fparser import api
+from fparser.common import parse_cache
+from fparser.common.parse_cache import ParseCache
+from fparser.common.readfortran import FortranFileReader, FortranStringReader
+from fparser.two.batch import parse_files
+from fparser.two.parser import ParseContext, Parser
+
+MODULE = """\
+module my_mod
+  include 'my_inc.h'
+  integer :: a
+contains
+  subroutine my_sub(x)
+    real :: x
+    x = 1.0
+  end subroutine my_sub
+end module my_mod
+"""
+
+
+def _stream(code):
+    """
+    :param str code: Fortran code.
+
+    :returns: a stream (that is not a file) from which to read the code.
+    :rtype: :py:class:`io.TextIOWrapper`
+    """
+    buffer = io.BytesIO(code.encode())
+    buffer.name = "not-a-file"
+    return io.TextIOWrapper(buffer)
+
+
+@pytest.fixture(name="source_file")
+def fixture_source_file(tmp_path):
+    """
+    :returns: the name of a Fortran file that includes another file.
+    :rtype: str
+    """
+    (tmp_path / "my_inc.h").write_text("integer :: b\n")
+    source = tmp_path / "my_mod.f90"
+    source.write_text(MODULE)
+    return str(source)
+
+
+def test_default_directory(monkeypatch, tmp_path):
+    """Test that the location of the cache may be set by the environment."""
+    monkeypatch.setenv(parse_cache.CACHE_DIR_ENV_VAR, str(tmp_path))
+    assert parse_cache.default_directory() == str(tmp_path)
+    monkeypatch.delenv(parse_cache.CACHE_DIR_ENV_VAR)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert parse_cache.default_directory() == os.path.join(str(tmp_path), "fparser")
+    cache = ParseCache(max_size=None)
+    assert cache.directory == os.path.join(str(tmp_path), "fparser")
+    assert os.path.isdir(cache.directory)
+
+
+def test_key(tmp_path, source_file):
+    """Test that the key depends upon the code, the options of the reader
+    and the supplied options."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    key = cache.key(FortranFileReader(source_file), "f2003")
+    assert key == cache.key(FortranFileReader(source_file), "f2003")
+    assert key != cache.key(FortranFileReader(source_file), "f2008")
+    assert key != cache.key(
+        FortranFileReader(source_file, ignore_comments=False), "f2003"
+    )
+    with open(source_file, "a", encoding="utf-8") as source:
+        source.write("! A comment\n")
+    assert key != cache.key(FortranFileReader(source_file), "f2003")
+    # The same code in a string.
+    key = cache.key(FortranStringReader(MODULE), "f2003")
+    assert key == cache.key(FortranStringReader(MODULE), "f2003")
+    assert key != cache.key(FortranStringReader(MODULE + "\n"), "f2003")
+    # Code that cannot be obtained without reading it.
+    assert cache.key(FortranFileReader(_stream(MODULE))) is None
+
+
+def test_key_location(tmp_path, source_file):
+    """Test that the key depends upon the code in the included files but
+    not upon the location of the source and included files."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    key = cache.key(FortranFileReader(source_file), "f2003")
+    # A copy of the files in another directory (with the include file
+    # found in an include directory) has the same key.
+    other = tmp_path / "other"
+    (other / "inc").mkdir(parents=True)
+    (other / "inc" / "my_inc.h").write_text("integer :: b\n")
+    copy = other / "my_mod.f90"
+    copy.write_text(MODULE)
+    reader = FortranFileReader(str(copy), include_dirs=[str(other / "inc")])
+    assert cache.key(reader, "f2003") == key
+    # But not if the included code differs (or cannot be found).
+    (other / "inc" / "my_inc.h").write_text("integer :: c\n")
+    reader = FortranFileReader(str(copy), include_dirs=[str(other / "inc")])
+    assert cache.key(reader, "f2003") != key
+    assert cache.key(FortranFileReader(str(copy)), "f2003") != key
+
+
+def test_include_digests(tmp_path):
+    """Test that the files included by the code (and by those files) are
+    found and that a file that includes itself is only followed once."""
+    (tmp_path / "a.h").write_text("include 'b.h'\n")
+    (tmp_path / "b.h").write_text("integer :: b\ninclude 'b.h'\n")
+    reader = FortranStringReader(
+        "include 'a.h'\n  INCLUDE \"missing.h\"\n! include 'b.h'\n",
+        include_dirs=[str(tmp_path)],
+    )
+    digests = parse_cache.include_digests(reader)
+    assert [name for name, _ in digests] == ["a.h", "b.h", "b.h", "missing.h"]
+    assert digests[1][1] == digests[2][1] is not None
+    assert digests[3][1] is None
+
+
+def test_get_put(tmp_path):
+    """Test that entries are stored and retrieved and that hits and misses
+    are counted."""
+    cache = ParseCache(str(tmp_path))
+    assert cache.get("a") is None
+    cache.put("a", [1, 2])
+    assert cache.get("a") == [1, 2]
+    cache.put("a", [3])
+    assert cache.get("a") == [3]
+    assert (cache.hits, cache.misses) == (2, 1)
+    # No temporary files are left behind.
+    assert os.listdir(str(tmp_path)) == ["a.pickle"]
+    # Another cache using the same directory sees the entry.
+    assert ParseCache(str(tmp_path)).get("a") == [3]
+
+
+def test_get_dependencies(tmp_path):
+    """Test that an entry is not used if a file on which it depends has
+    changed (or been removed)."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    dependency = tmp_path / "my_inc.h"
+    dependency.write_text("integer :: b\n")
+    cache.put("a", "tree", [str(dependency)])
+    assert cache.get("a") == "tree"
+    dependency.write_text("integer :: c\n")
+    assert cache.get("a") is None
+    cache.put("a", "tree", [str(dependency)])
+    dependency.unlink()
+    assert cache.get("a") is None
+
+
+def test_get_corrupt(tmp_path, caplog):
+    """Test that an entry that cannot be read is removed."""
+    cache = ParseCache(str(tmp_path))
+    (tmp_path / "a.pickle").write_bytes(b"not a pickle")
+    assert cache.get("a") is None
+    assert "Ignoring unreadable parse cache entry" in caplog.text
+    assert not os.listdir(str(tmp_path))
+    assert cache.misses == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="requires user IDs")
+def test_owner(tmp_path, monkeypatch, caplog):
+    """Test that the cache directory is only accessible by its owner and
+    that a directory or entry owned by another user is refused."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    assert os.stat(cache.directory).st_mode & 0o777 == 0o700
+    cache.put("a", [1])
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    with pytest.raises(PermissionError) as err:
+        ParseCache(cache.directory)
+    assert f"'{cache.directory}' is owned by another user (uid {uid})" in str(
+        err.value
+    )
+    assert cache.get("a") is None
+    assert "Ignoring parse cache entry" in caplog.text
+    assert "a.pickle' is owned by another user" in caplog.text
+    assert cache.misses == 1
+    # The entry is not removed.
+    assert os.listdir(cache.directory) == ["a.pickle"]
+
+
+def test_put_failure(tmp_path, monkeypatch):
+    """Test that no files are left behind if an entry cannot be written."""
+    cache = ParseCache(str(tmp_path))
+    with pytest.raises((AttributeError, pickle.PicklingError, TypeError)):
+        cache.put("a", lambda: None)
+    assert not os.listdir(str(tmp_path))
+
+
+def test_evict(tmp_path):
+    """Test that the least recently used entries are removed when the cache
+    becomes too large."""
+    cache = ParseCache(str(tmp_path), max_size=None)
+    for idx, key in enumerate("abc"):
+        cache.put(key, "x" * 1000)
+        os.utime(str(tmp_path / f"{key}.pickle"), (idx, idx))
+    size = cache.size()
+    assert size > 3000
+    # Using an entry makes it the most recently used.
+    assert cache.get("a") is not None
+    cache.evict(size - 1)
+    assert sorted(os.listdir(str(tmp_path))) == ["a.pickle", "c.pickle"]
+    cache.max_size = 1500
+    cache.put("d", "x")
+    assert sorted(os.listdir(str(tmp_path))) == ["a.pickle", "d.pickle"]
+    cache.clear()
+    assert not os.listdir(str(tmp_path))
+    assert cache.size() == 0
+
+
+def test_evict_threshold(tmp_path, monkeypatch):
+    """Test that adding entries only searches the cache for those to remove
+    once it has grown beyond its maximum size, and that it is then reduced
+    to a fraction of that size."""
+    cache = ParseCache(str(tmp_path), max_size=10000)
+    calls = []
+    entries = cache.entries
+    monkeypatch.setattr(cache, "entries", lambda: calls.append(1) or entries())
+    cache.put("a", "x" * 1000)
+    # The size of the cache is found when the first entry is added.
+    assert len(calls) == 1
+    for key in "bcdefgh":
+        cache.put(key, "x" * 1000)
+    # Replacing an entry does not count its size twice.
+    cache.put("a", "x" * 1000)
+    assert len(calls) == 1
+    assert cache._size == cache.size()
+    # Entries are removed once the maximum size is exceeded.
+    calls.clear()
+    for key in "ijk":
+        cache.put(key, "x" * 1000)
+        if calls:
+            break
+    assert key == "j"
+    assert len(calls) == 1
+    assert cache.size() <= 10000 * parse_cache.EVICT_FRACTION
+    assert cache._size == cache.size()
+    # The next entry does not exceed the maximum size.
+    calls.clear()
+    cache.put("k", "x" * 1000)
+    assert not calls
+
+
+def test_fparser2(tmp_path, source_file):
+    """Test that an fparser2 parser uses the cache and that the symbol
+    tables are restored when the tree is loaded."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    parser = Parser(cache=cache)
+    context = ParseContext(parser)
+    expected = str(context.parse(FortranFileReader(source_file)))
+    assert (cache.hits, cache.misses) == (0, 1)
+    context = ParseContext(parser)
+    tree = context.parse(FortranFileReader(source_file))
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert str(tree) == expected
+    table = context.symbol_tables.lookup("my_mod")
+    assert table.node is tree.children[0].children[0]
+    assert table.lookup("b").primitive_type == "integer"
+    assert table.children[0].lookup("x").primitive_type == "real"
+    # A change to the included file means that the code is parsed again.
+    (tmp_path / "my_inc.h").write_text("real :: b\n")
+    context = ParseContext(parser)
+    tree = context.parse(FortranFileReader(source_file))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert "REAL :: b" in str(tree)
+    # Code that cannot be cached is simply parsed.
+    code = MODULE.replace("include 'my_inc.h'", "")
+    assert "MODULE my_mod" in str(parser(FortranFileReader(_stream(code))))
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_fparser1(tmp_path, source_file):
+    """Test that the fparser1 API uses the cache."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    expected = str(api.parse(source_file, disk_cache=cache))
+    assert (cache.hits, cache.misses) == (0, 1)
+    tree = api.parse(source_file, disk_cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert str(tree) == expected
+    assert "my_sub" in tree.a.module["my_mod"].a.module_subprogram
+
+
+def test_parse_files(tmp_path, source_file):
+    """Test that the cache may be shared by the worker processes of
+    parse_files."""
+    cache = ParseCache(str(tmp_path / "cache"))
+    results = list(parse_files([source_file], jobs=1, reduce=str, cache=cache))
+    assert len(os.listdir(cache.directory)) == 1
+    assert list(parse_files([source_file] * 2, jobs=2, reduce=str)) == results * 2
+    assert (
+        list(parse_files([source_file] * 2, jobs=2, reduce=str, cache=cache))
+        == results * 2
+    )
+    assert len(os.listdir(cache.directory)) == 1
@@ -44,6 +44,7 @@ Test battery associated with fparser.common.readfortran package.
 
 import io
 import os.path
+import pickle
 import pytest
 
 from fparser.common.readfortran import (
@@ -56,6 +57,9 @@ from fparser.common.readfortran import (
     extract_construct_name,
     CppDirective,
     Comment,
+    SourceBuffer,
+    SourceLineIndex,
+    SourceLines,
 )
 from fparser.common.sourceinfo import FortranFormat
 
@@ -752,6 +756,127 @@ def test_multi_put_item(ignore_comments):
     assert not orig_lines
 
 
+def test_checkpoint_rollback(ignore_comments):
+    """Check that rolling back to a checkpoint returns the reader to that
+    point, including when checkpoints are nested. Test with and without
+    ignoring comments.
+
+    """
+    code = FORTRAN_CODE.replace(
+        "  print", "  a = 1\n  ! comment\n  b = 2\n  c = 3\n  print"
+    )
+    reader = FortranStringReader(code, ignore_comments=ignore_comments)
+    first = reader.get_item()
+    outer = reader.checkpoint()
+    outer_lines = [reader.get_item() for _ in range(3)]
+    inner = reader.checkpoint()
+    inner_lines = [reader.get_item() for _ in range(2)]
+    reader.rollback(inner)
+    assert [reader.get_item() for _ in range(2)] == inner_lines
+    reader.release(inner)
+    # Releasing the inner checkpoint must not affect the outer one.
+    reader.rollback(outer)
+    assert reader.get_item() == outer_lines[0]
+    reader.release(outer)
+    # The items that were rolled back are still pending but nothing
+    # before the current position is kept.
+    assert reader._position == 0
+    assert reader._history == outer_lines[1:] + inner_lines
+    assert reader.get_item() == outer_lines[1]
+    assert first not in outer_lines
+
+
+def test_checkpoint_put_item(ignore_comments):
+    """Check that `put_item` works correctly while a checkpoint is active,
+    both for the item that was just read and for a new item.
+
+    """
+    code = FORTRAN_CODE.replace("  print", "  a = 1\n  b = 2\n  print")
+    reader = FortranStringReader(code, ignore_comments=ignore_comments)
+    first = reader.get_item()
+    mark = reader.checkpoint()
+    lines = [reader.get_item() for _ in range(3)]
+    # Returning the last item read just steps back through the history.
+    reader.put_item(lines[-1])
+    assert len(reader._history) == 3
+    assert reader.get_item() == lines[-1]
+    # An item that was read before the checkpoint is inserted at the
+    # current position.
+    reader.put_item(first)
+    assert reader.get_item() == first
+    reader.rollback(mark)
+    assert [reader.get_item() for _ in range(4)] == lines + [first]
+    reader.release(mark)
+    assert not reader._history
+
+
+def test_checkpoint_put_item_earlier(ignore_comments):
+    """Check that an item read since a checkpoint that is put back when it
+    was not the last item read is only returned once after a rollback.
+
+    """
+    reader = FortranStringReader(FORTRAN_CODE, ignore_comments=ignore_comments)
+    mark = reader.checkpoint()
+    lines = [reader.get_item() for _ in range(3)]
+    reader.put_item(lines[0])
+    assert len(reader._history) == 3
+    assert reader.get_item() is lines[0]
+    reader.rollback(mark)
+    replayed = [reader.get_item() for _ in range(3)]
+    assert replayed == lines[1:] + [lines[0]]
+    # Next comes the item that followed the last one read.
+    following = reader.get_item()
+    assert following not in lines
+    reader.release(mark)
+    assert not reader._history
+
+
+def test_checkpoint_release_pending():
+    """Check that items that have been rolled back are still returned by
+    the reader once the checkpoint has been released.
+
+    """
+    reader = FortranStringReader(FORTRAN_CODE)
+    mark = reader.checkpoint()
+    expected = [reader.get_item() for _ in range(4)]
+    reader.rollback(mark)
+    reader.release(mark)
+    assert [reader.get_item() for _ in range(4)] == expected
+    assert not reader._history
+    assert reader.get_item() is None
+
+
+def test_lean_release_caches():
+    """Check that a lean reader releases the caches of an item that has been
+    matched once the match can no longer be undone, and that other readers
+    do not."""
+    for lean in [False, True]:
+        reader = FortranStringReader(FORTRAN_CODE, lean=lean)
+        assert reader.lean is lean
+        item = reader.get_item()
+        item.parse_cache[str] = "cached"
+        reader.commit(item)
+        assert bool(item.parse_cache) is not lean
+        # Within a checkpoint, the caches are kept until it is released.
+        mark = reader.checkpoint()
+        inner = reader.checkpoint()
+        item = reader.get_item()
+        item.parse_cache[str] = "cached"
+        reader.commit(item)
+        reader.release(inner)
+        assert item.parse_cache
+        reader.release(mark)
+        assert bool(item.parse_cache) is not lean
+        # Items that have been rolled back are not released.
+        mark = reader.checkpoint()
+        item = reader.get_item()
+        item.parse_cache[str] = "cached"
+        reader.rollback(mark)
+        reader.release(mark)
+        assert item.parse_cache
+        assert reader.get_item() is item
+
+
 # Issue 177: get_item(ignore_comments) - how does ignore_comments affect
 # processing?
 
@@ -830,6 +955,53 @@ def test_file_reader(tmpdir):
         raise
 
 
+def test_filename_reader_single_read(tmpdir, monkeypatch):
+    """
+    Tests that a Fortran source file that is given by its filename is
+    opened (and read) only once and that it is closed straight away.
+    """
+    filename = f"{tmpdir}/out.f90"
+    with io.open(filename, mode="w", encoding="UTF-8") as source_file:
+        source_file.write(FULL_FREE_SOURCE)
+    opened = []
+    real_open = open
+
+    def counting_open(*args, **kwargs):
+        opened.append(real_open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    reader = FortranFileReader(filename)
+    assert len(opened) == 1
+    assert opened[0].closed
+    assert isinstance(reader.source, SourceBuffer)
+    assert reader.format == FortranFormat(True, False)
+    for expected in FULL_FREE_EXPECTED:
+        assert reader.get_single_line(ignore_empty=True) == expected
+    assert reader.get_single_line() is None
+    assert len(opened) == 1
+
+
+@pytest.mark.parametrize(
+    "text", ["", "\n", "a\n\nb", "a\r\nb\n", "a\fb\rc\n\n", "a = 1\nb = 2\n"]
+)
+@pytest.mark.parametrize("chunk_size", [1, 3, 32768])
+def test_source_buffer(text, chunk_size, monkeypatch):
+    """
+    Tests that a SourceBuffer generates the same lines (without the
+    newlines) as a StringIO of the same text, however it is split into
+    chunks.
+    """
+    monkeypatch.setattr(SourceBuffer, "CHUNK_SIZE", chunk_size)
+    buffer = SourceBuffer(text)
+    assert list(buffer) == [line.rstrip("\n") for line in io.StringIO(text)]
+    assert buffer.getvalue() is text
+    assert list(buffer) == []
+    assert repr(buffer) == f"<SourceBuffer of {len(text)} characters>"
+    buffer.close()
+    assert buffer.closed
+
+
 def test_none_in_fifo(tmpdir, log):
     """Check that a None entry in the reader FIFO buffer is handled
     correctly."""
@@ -867,6 +1039,24 @@ def test_bad_file_reader():
     assert expected in str(ex.value)
 
 
+def test_file_reader_pickle(tmpdir):
+    """
+    Tests that a file reader (and therefore the lines that it has read)
+    can be pickled without the file.
+    """
+    filename = str(tmpdir.join("out.f90"))
+    with open(filename, "w") as source_file:
+        source_file.write("program hello\nend program hello\n")
+    reader = FortranFileReader(filename)
+    line = reader.next()
+    copied = pickle.loads(pickle.dumps(line))
+    assert copied.line == "program hello"
+    assert copied.reader.id == filename
+    assert copied.reader.file is None
+    # The original reader is unaffected.
+    assert reader.next().line == "end program hello"
+
+
 ##############################################################################
 
 
@@ -1694,3 +1884,94 @@ def test_conditional_include_omp_conditional_liness_free_format_multiple():
     line = reader.next()
     # 8 spaces in input_text, plus two for replacing the !$
     assert line.line == "bla          bla"
+
+
+def test_source_lines():
+    """Test that the cache of source lines of a reader behaves like a list
+    of the lines and that lines may be discarded from the start of it."""
+    reader = FortranStringReader("a = 1\n\nb = 2\nc = 3\n")
+    while reader.get_single_line() is not None:
+        pass
+    lines = reader.source_lines
+    assert isinstance(lines, SourceLines)
+    assert len(lines) == 4
+    assert list(lines) == ["a = 1", "", "b = 2", "c = 3"]
+    assert lines[-1] == "c = 3"
+    assert lines.discarded == 0
+    lines.discard(2)
+    assert lines.discarded == 2
+    # Discarded lines are empty but the line numbers are unchanged.
+    assert len(lines) == 4
+    assert list(lines) == ["", "", "b = 2", "c = 3"]
+    assert lines[0] == ""
+    assert lines[2] == "b = 2"
+    assert lines[-2] == "b = 2"
+    # Lines that have already been discarded are not affected.
+    lines.discard(1)
+    assert lines.discarded == 2
+    lines.discard(10)
+    assert lines.discarded == 4
+    assert list(lines) == ["", "", "", ""]
+    lines.append("d = 4")
+    assert lines[4] == "d = 4"
+    assert repr(lines) == "SourceLines(['', '', '', '', 'd = 4'])"
+    with pytest.raises(IndexError):
+        _ = lines[5]
+    with pytest.raises(IndexError):
+        _ = lines[-6]
+
+
+def test_source_lines_spans():
+    """Test that the source lines of a reader whose code is held in a single
+    string refer to that string unless they have been changed by the
+    reader, and that both kinds of line may be discarded."""
+    text = "a = 1  \n\tb = 2\nc = 3\r\nd\xa0= 4\ne = 5"
+    reader = FortranStringReader(text)
+    while reader.get_single_line() is not None:
+        pass
+    lines = reader.source_lines
+    expected = ["a = 1", "        b = 2", "c = 3", "d = 4", "e = 5"]
+    assert list(lines) == expected
+    # Only the lines with a tab and a non-breaking space are copied.
+    assert lines._lines == expected[1:2] + expected[3:4]
+    lines.discard(2)
+    assert list(lines) == ["", ""] + expected[2:]
+    assert lines._lines == expected[3:4]
+    lines.append("f = 6")
+    assert lines[-1] == "f = 6"
+    lines.discard(4)
+    assert list(lines) == ["", "", "", "", "e = 5", "f = 6"]
+    assert lines._lines == ["f = 6"]
+    # Without the text, every line is held as a string.
+    lines = SourceLines()
+    lines.append("a = 1")
+    assert list(lines) == ["a = 1"]
+
+
+def test_source_line_index():
+    """Test that a lean reader only keeps the offset of each source line and
+    that it gives the same lines as any other reader."""
+    text = "a = 1  \n\tb = 2\nc = 3\r\nd\xa0= 4\n\ne = 5"
+    reader = FortranStringReader(text)
+    lean_reader = FortranStringReader(text, lean=True)
+    for current in [reader, lean_reader]:
+        while current.get_single_line() is not None:
+            pass
+    lines = lean_reader.source_lines
+    assert isinstance(lines, SourceLineIndex)
+    assert list(lines._starts) == [0, 8, 15, 22, 28, 29]
+    assert list(lines) == list(reader.source_lines)
+    assert len(lines) == 6
+    assert lines[-1] == "e = 5"
+    with pytest.raises(IndexError):
+        _ = lines[-7]
+    lines.discard(2)
+    assert lines.discarded == 2
+    assert list(lines) == ["", "", "c = 3", "d = 4", "", "e = 5"]
+    assert list(lines._starts) == [15, 22, 28, 29]
+    # A reader that does not hold the code in a single string keeps the
+    # lines themselves.
+    lean_reader = FortranReaderBase(
+        io.StringIO(text), FortranFormat(True, False), True, lean=True
+    )
+    assert isinstance(lean_reader.source_lines, SourceLines)
@@ -47,6 +47,7 @@ import pytest
 
 from fparser.common.sourceinfo import (
     FortranFormat,
+    _iter_lines,
     get_source_info_str,
     get_source_info,
 )
@@ -389,6 +390,28 @@ def test_get_source_info_utf8():
 ##############################################################################
 
 
+@pytest.mark.parametrize("line_break", ["\n", "\r\n", "\r", "\f"])
+def test_get_source_info_str_lines(line_break):
+    """
+    Tests that the lines of a string are scanned with the same line
+    boundaries as str.splitlines and that a long run of comments before the
+    first line of code is handled.
+    """
+    comments = line_break.join(["! A comment"] * 20000)
+    source = comments + line_break + "module free" + line_break
+    assert get_source_info_str(source) == FortranFormat(True, False)
+    source = "      x = 1" + line_break + "! -*- f90 -*-" + line_break + "y = 2"
+    assert get_source_info_str(source) == FortranFormat(True, False)
+    source = "! -*- fix -*-" + line_break + "module free"
+    assert get_source_info_str(source, ignore_encoding=False) == FortranFormat(
+        False, False
+    )
+    for chunk_size in [1, 5, 32768]:
+        assert list(_iter_lines(source, chunk_size)) == source.splitlines()
+        source += line_break
+        assert list(_iter_lines(source, chunk_size)) == source.splitlines()
+
+
 def test_get_source_info_wrong():
     """
     Tests that get_source_info throws an exception if passed the wrong type
@@ -72,9 +72,14 @@ Test parsing single Fortran lines.
 
 """
 
+import copy
+import pickle
+import threading
+
 import pytest
 
 from fparser.common.splitline import (
+    memoize,
     splitparen,
     splitquote,
     string_replace_map,
@@ -281,3 +286,164 @@ def test_string_replace_dict():
     repmap["F2PY_EXPR_TUPLE_11"] = "0.5d0*val"
     new_line = repmap("text with F2PY_EXPR_TUPLE_11 and F2PY_EXPR_TUPLE_1")
     assert new_line == "text with 0.5d0*val and 3 + 5"
+
+
+def test_string_replace_map_shared():
+    """Check that the (cached) map returned by string_replace_map cannot
+    be modified but can be copied and pickled."""
+    line, repmap = string_replace_map("a = b(1, 'c d')")
+    assert string_replace_map("a = b(1, 'c d')")[1] is repmap
+    with pytest.raises(TypeError) as err:
+        repmap["F2PY_EXPR_TUPLE_1"] = "x"
+    assert "Use StringReplaceDict(repmap) to make a copy" in str(err.value)
+    for method in ["clear", "pop", "popitem", "setdefault", "update"]:
+        with pytest.raises(TypeError):
+            getattr(repmap, method)()
+    copied = StringReplaceDict(repmap)
+    copied["F2PY_EXPR_TUPLE_1"] = "x"
+    assert copied(line) == "a = b(x)"
+    for duplicate in [copy.deepcopy(repmap), pickle.loads(pickle.dumps(repmap))]:
+        assert duplicate == repmap
+        assert duplicate(line) == "a = b(1, 'c d')"
+    # If nothing is replaced then the line itself and a shared, empty map
+    # are returned. The cache is cleared in case another line equal to
+    # this one has been cached.
+    string_replace_map.cache.clear()
+    line = "".join(["x = ", "y"])
+    new_line, repmap = string_replace_map(line)
+    assert new_line is line
+    assert repmap == {}
+    assert string_replace_map("z")[1] is repmap
+    assert string_replace_map("X = Y", lower=True)[0] == "x = y"
+
+
+def test_memoize():
+    """Check that the cache used by the memoize decorator is bounded, can
+    be resized and cleared and counts its hits and misses."""
+    calls = []
+
+    @memoize
+    def double(value):
+        calls.append(value)
+        return 2 * value
+
+    cache = double.cache
+    assert cache.maxsize == 1024
+    cache.resize(2)
+    assert [double(1), double(2), double(1), double(3)] == [2, 4, 2, 6]
+    assert (cache.hits, cache.misses, cache.size, len(cache)) == (1, 3, 2, 2)
+    # 2 was the least-recently used and so was discarded.
+    assert double(2) == 4
+    assert calls == [1, 2, 3, 2]
+    # Resizing and clearing empty the cache but keep the counts.
+    cache.resize(None)
+    assert cache.maxsize is None
+    assert cache.size == 0
+    double(1)
+    cache.clear()
+    assert cache.size == 0
+    assert (cache.hits, cache.misses) == (1, 5)
+    cache.resize(0)
+    double(1)
+    double(1)
+    assert cache.size == 0
+    assert calls == [1, 2, 3, 2, 1, 1, 1]
+
+
+def test_memoize_scope():
+    """Check that the cache is cleared at the end of the outermost scope
+    if it is scoped."""
+
+    @memoize
+    def double(value):
+        return 2 * value
+
+    cache = double.cache
+    with cache.scope():
+        double(1)
+    assert cache.size == 1
+    cache.scoped = True
+    with cache.scope():
+        double(1)
+        with cache.scope():
+            double(2)
+        assert cache.size == 2
+    assert cache.size == 0
+
+
+def test_memoize_scope_threads():
+    """Check that the cache is not cleared while a scope is open in another
+    thread and that the depth of the scopes is not corrupted by threads
+    opening and closing them at the same time."""
+
+    @memoize
+    def double(value):
+        return 2 * value
+
+    cache = double.cache
+    cache.scoped = True
+    opened = threading.Event()
+    closed = threading.Event()
+
+    def _scope():
+        with cache.scope():
+            opened.set()
+            closed.wait()
+
+    thread = threading.Thread(target=_scope)
+    thread.start()
+    opened.wait()
+    with cache.scope():
+        double(1)
+    # The other thread is still in its scope.
+    assert cache.size == 1
+    closed.set()
+    thread.join()
+    assert cache.size == 0
+
+    def _scopes():
+        for value in range(2000):
+            with cache.scope():
+                double(value)
+
+    threads = [threading.Thread(target=_scopes) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache._depth == 0
+    assert cache.size == 0
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "",
+        "a(b) = 'x(' // c(1, [2])",
+        "(a)(b)",
+        "(a",
+        "a)b(c]d)",
+        "'unclosed (",
+        "'it''s' \"(\" 'x\\'y'",
+        r"a\(b) \\(c) 'd\\' e\'",
+        "x = 'abc\\",
+    ],
+)
+def test_split_lexer_paths(line):
+    """Check that splitquote and splitparen give the same results when
+    they use the scanner (the default quotes and brackets) as when they
+    walk the line one character at a time (the same quotes and brackets
+    supplied in a different order).
+
+    """
+    for lower in [False, True]:
+        result = splitquote(line, lower=lower)
+        expected = splitquote(line, lower=lower, quotechars="'\"")
+        assert result == expected
+        assert [type(item) for item in result[0]] == [
+            type(item) for item in expected[0]
+        ]
+    result = splitparen(line)
+    expected = splitparen(line, paren_open="[(", paren_close="])")
+    assert result == expected
+    assert [type(item) for item in result] == [type(item) for item in expected]
@@ -70,6 +70,7 @@
 # Created: May 2006
 
 import logging
+import threading
 
 from fparser.one.block_statements import BeginSource
 from fparser.common.utils import AnalyzeError
@@ -84,20 +85,34 @@ class FortranParser:
 
     Use .parse() method for parsing, parsing result is saved in .block
     attribute.
+
+    :param reader: the source of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+    :param bool ignore_comments: whether or not to discard comments.
+    :param disk_cache: where to store the (unanalysed) parse tree so that, \
+        if the same code is parsed again (by any process), it can be \
+        loaded instead. None (the default) disables this.
+    :type disk_cache: Optional[\
+        :py:class:`fparser.common.parse_cache.ParseCache`]
     """
 
     cache = {}
+    # Guards the cache when parsers are created in several threads.
+    _cache_lock = threading.Lock()
 
-    def __init__(self, reader, ignore_comments=True):
+    def __init__(self, reader, ignore_comments=True, disk_cache=None):
         self.reader = reader
+        self.disk_cache = disk_cache
         logging.getLogger(__name__).setLevel(logging.DEBUG)
-        if reader.id in self.cache:
-            parser = self.cache[reader.id]
+        with self._cache_lock:
+            parser = self.cache.get(reader.id)
+            if parser is None:
+                self.cache[reader.id] = self
+        if parser is not None:
             self.block = parser.block
             self.is_analyzed = parser.is_analyzed
             logging.getLogger(__name__).info("using cached %s", (reader.id))
         else:
-            self.cache[reader.id] = self
             self.block = None
             self.is_analyzed = False
         self.ignore_comments = ignore_comments
@@ -125,6 +140,15 @@ class FortranParser:
         """Parses the program specified in the reader object."""
         if self.block is not None:
             return
+        key = None
+        if self.disk_cache is not None:
+            key = self.disk_cache.key(self.reader, "fparser1", self.ignore_comments)
+        if key is not None:
+            block = self.disk_cache.get(key)
+            if block is not None:
+                block.parent = self
+                self.block = block
+                return
         try:
             self.block = BeginSource(self)
         except KeyboardInterrupt:
@@ -144,6 +168,8 @@ class FortranParser:
             logger.debug("An error occurred during parsing.", exc_info=error)
             logger.critical("STOPPED PARSING")
             raise error
+        if key is not None:
+            self.disk_cache.put(key, self.block, self.reader.included_files)
         return
 
     def analyze(self):
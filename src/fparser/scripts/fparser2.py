@@ -78,6 +78,62 @@ except ImportError:
     from optparse import OptionParser
 
 
+def _no_output(_):
+    """
+    Discards a parse tree (for the `none` task).
+
+    :returns: None.
+    :rtype: NoneType
+
+    """
+    return None
+
+
+def _get_cache(options):
+    """
+    :param options: object constructed by OptionParser with cmd-line flags.
+
+    :returns: the cache of parse trees specified by the --cache-dir flag, \
+        if any.
+    :rtype: Optional[:py:class:`fparser.common.parse_cache.ParseCache`]
+
+    """
+    from fparser.common.parse_cache import ParseCache
+
+    cache_dir = getattr(options, "cache_dir", None)
+    return ParseCache(cache_dir) if cache_dir else None
+
+
+def parallel_runner(options, args):
+    """
+    Function to read, parse and output Fortran source code using a pool
+    of processes (see :py:func:`fparser.two.batch.parse_files`). The
+    output is the same as that of `runner`.
+
+    :param options: object constructed by OptionParser with cmd-line flags.
+    :param args: list of Fortran files to parse.
+    :type args: list of str
+
+    """
+    from fparser.two.batch import parse_files
+
+    # The output is created by the worker processes rather than sending
+    # the parse trees back.
+    reduce = {"show": str, "repr": repr}.get(options.task, _no_output)
+    for result in parse_files(
+        args,
+        jobs=options.jobs,
+        std=options.std,
+        reduce=reduce,
+        cache=_get_cache(options),
+    ):
+        print("File: '{0}'".format(result.filename), file=sys.stderr)
+        if result.error is not None:
+            print(result.error, file=sys.stderr)
+        elif options.task in ("show", "repr"):
+            print(result.result)
+
+
 def runner(_, options, args):
     """
     Function to read, parse and output Fortran source code.
@@ -87,13 +143,27 @@ def runner(_, options, args):
     :type args: list of str
 
     """
-    from fparser.two.parser import ParserFactory
+    from fparser.two.parser import Parser, ParserFactory
     from fparser.two.Fortran2003 import FortranSyntaxError, InternalError
     from fparser.common.readfortran import FortranFileReader
+    from fparser.two.symbol_table import SYMBOL_TABLES
 
     if not args:
         print("Error: No fortran files specified", file=sys.stderr)
         raise SystemExit(1)
+    jobs = getattr(options, "jobs", 1)
+    if jobs < 1:
+        print("Error: The number of jobs must be at least 1", file=sys.stderr)
+        raise SystemExit(1)
+    if jobs > 1:
+        parallel_runner(options, args)
+        return
+    cache = _get_cache(options)
+    # The parser (and so the class hierarchy) is only created once.
+    if cache is None:
+        fparser = ParserFactory().create(std=options.std)
+    else:
+        fparser = Parser(options.std, cache=cache)
     for filename in args:
         print("File: '{0}'".format(filename), file=sys.stderr)
         try:
@@ -102,7 +172,8 @@ def runner(_, options, args):
             print(error, file=sys.stderr)
             continue
         try:
-            fparser = ParserFactory().create(std=options.std)
+            # Each file starts with empty symbol tables.
+            SYMBOL_TABLES.clear()
             program = fparser(reader)
             if options.task == "show":
                 print(str(program))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# Copyright (c) 2024 Science and Technology Facilities Council
+#
+# All rights reserved.
+#
+# Modifications made as part of the fparser project are distributed
+# under the following license:
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measures how much memory the parse tree of a large, generated Fortran
+program (see :py:mod:`fparser.scripts.fparser2_bench`) occupies.
+
+Two figures are reported for each node of the tree: the size of the node
+objects themselves (including any instance dictionaries) and the total
+memory that is retained once the code has been parsed (which also
+includes the children, strings and lines referred to by the nodes, the
+symbol tables and the reader).
+
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from fparser.common.readfortran import FortranStringReader
+from fparser.common.sourceinfo import FortranFormat
+from fparser.scripts.fparser2_bench import create_bench
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.utils import Base, walk
+
+
+def node_size(node):
+    """
+    :param node: a node of a parse tree.
+    :type node: :py:class:`fparser.two.utils.Base`
+
+    :returns: the size (in bytes) of the node object, including its \
+        instance dictionary (if it has one).
+    :rtype: int
+
+    """
+    size = sys.getsizeof(node)
+    state = getattr(node, "__dict__", None)
+    if state is not None:
+        size += sys.getsizeof(state)
+    return size
+
+
+def measure(num_routines, std="f2008"):
+    """
+    Parses the generated benchmark code and measures the memory used.
+
+    :param int num_routines: the number of subroutines to create.
+    :param str std: the Fortran standard of the parser to use.
+
+    :returns: the number of nodes, the total size of the node objects \
+        and the memory retained by the parse.
+    :rtype: Tuple[int, int, int]
+
+    """
+    code = create_bench(num_routines)
+    parser = Parser(std)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        reader = FortranStringReader(code)
+        # Ensure the reader uses free format.
+        reader.set_format(FortranFormat(True, True))
+        context = ParseContext(parser)
+        tree = context.parse(reader)
+        del reader
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    nodes = [tree] + [node for node in walk(tree) if isinstance(node, Base)]
+    return len(nodes), sum(node_size(node) for node in nodes), retained
+
+
+def runner(num_routines: int, std="f2008"):
+    """
+    Entry point for running the benchmark.
+
+    :param num_routines: the number of subroutines to create in the \
+                         Fortran benchmark.
+    :param str std: the Fortran standard of the parser to use.
+
+    :raises ValueError: if num_routines < 1.
+
+    """
+    if num_routines < 1:
+        raise ValueError(
+            f"Number of routines to create must be a positive, "
+            f"non-zero integer but got: {num_routines}"
+        )
+
+    print(f"Parsing benchmark code with {num_routines} subroutines...")
+    num_nodes, nodes_size, retained = measure(num_routines, std)
+    print(f"Number of nodes = {num_nodes}")
+    print(f"Size of node objects = {nodes_size / num_nodes:.1f} bytes per node")
+    print(f"Memory retained by the parse = {retained / num_nodes:.1f} bytes per node")
+
+
+def main():
+    """Parses the command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "num_routines",
+        type=int,
+        nargs="?",
+        default=1000,
+        help="number of subroutines to generate",
+    )
+    parser.add_argument("--std", default="f2008", help="the Fortran standard")
+    args = parser.parse_args()
+    runner(args.num_routines, args.std)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
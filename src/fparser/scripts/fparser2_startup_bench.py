@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# Copyright (c) 2024 Science and Technology Facilities Council
+#
+# All rights reserved.
+#
+# Modifications made as part of the fparser project are distributed
+# under the following license:
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measures how long it takes to start fparser2, i.e. to import the parser
+and create it, in a fresh Python interpreter. This is what dominates
+the run time of short jobs such as parsing a single file.
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+import fparser
+
+# The code that is timed in each fresh interpreter. It prints the time
+# taken to import the parser and the time taken to create it.
+_STARTUP_CODE = """
+from time import perf_counter
+tstart = perf_counter()
+from fparser.two.parser import ParserFactory
+timport = perf_counter()
+ParserFactory().create(std={std!r})
+tcreate = perf_counter()
+print(timport - tstart, tcreate - timport)
+"""
+
+
+def time_startup(std="f2008"):
+    """
+    Imports and creates the parser in a fresh Python interpreter.
+
+    :param str std: the Fortran standard of the parser to create.
+
+    :returns: the time taken to import the parser and to create it.
+    :rtype: Tuple[float, float]
+
+    """
+    code = _STARTUP_CODE.format(std=std)
+    # Ensure that the interpreter imports this copy of fparser.
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(fparser.__file__)))]
+        + [path for path in [env.get("PYTHONPATH")] if path]
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        env=env,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    import_time, create_time = output.split()
+    return float(import_time), float(create_time)
+
+
+def runner(repeats: int, std="f2008"):
+    """
+    Entry point for running the benchmark.
+
+    :param repeats: the number of fresh interpreters to time.
+    :param str std: the Fortran standard of the parser to create.
+
+    :raises ValueError: if repeats < 1.
+
+    """
+    if repeats < 1:
+        raise ValueError(
+            f"Number of repeats must be a positive, non-zero integer but "
+            f"got: {repeats}"
+        )
+
+    print(f"Timing fparser2 start-up ({std}) {repeats} times...")
+    times = [time_startup(std) for _ in range(repeats)]
+    for label, values in (
+        ("import", [time[0] for time in times]),
+        ("create", [time[1] for time in times]),
+        ("import + create", [sum(time) for time in times]),
+    ):
+        print(
+            f"Time taken for {label}: min = {min(values):.4f}s, "
+            f"median = {statistics.median(values):.4f}s"
+        )
+
+
+def main():
+    """Parses the command-line arguments and runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "repeats", type=int, nargs="?", default=10, help="number of runs"
+    )
+    parser.add_argument("--std", default="f2008", help="the Fortran standard")
+    args = parser.parse_args()
+    runner(args.repeats, args.std)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -128,6 +128,20 @@ Description:
         choices=["f2003", "f2008"],
         help="Specify the Fortran standard to use. Default: %default.",
     )
+    parser.add_option(
+        "--jobs",
+        default=1,
+        type="int",
+        help="Specify the number of processes with which to parse the "
+        "files. Default: %default.",
+    )
+    parser.add_option(
+        "--cache-dir",
+        default=None,
+        help="Specify a directory in which to cache the result of parsing "
+        "each file so that files that have not changed are not parsed again. "
+        "Default: no caching.",
+    )
 
 
 def get_fortran_code_group(parser):
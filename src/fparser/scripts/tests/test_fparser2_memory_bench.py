@@ -0,0 +1,69 @@
+# Copyright (c) 2024 Science and Technology Facilities Council
+#
+# All rights reserved.
+##
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing tests for the fparser2 memory benchmark script."""
+
+import pytest
+
+from fparser.scripts import fparser2_memory_bench
+
+
+def test_measure():
+    """Check that measure() parses the generated code and reports the
+    memory used."""
+    num_nodes, nodes_size, retained = fparser2_memory_bench.measure(2)
+    assert num_nodes > 50
+    assert 0 < nodes_size < retained
+
+
+def test_runner_invalid_num_routines():
+    """Test the checking on the value of the supplied num_routines
+    parameter."""
+    with pytest.raises(ValueError) as err:
+        fparser2_memory_bench.runner(0)
+    assert (
+        "Number of routines to create must be a positive, non-zero integer but "
+        "got: 0" in str(err.value)
+    )
+
+
+def test_runner(capsys, monkeypatch):
+    """Check that normal usage gives the expected benchmark output."""
+    monkeypatch.setattr(
+        fparser2_memory_bench, "measure", lambda num_routines, std: (10, 720, 4000)
+    )
+    fparser2_memory_bench.runner(2)
+    stdout, stderr = capsys.readouterr()
+    assert stderr == ""
+    assert "Parsing benchmark code with 2 subroutines..." in stdout
+    assert "Number of nodes = 10" in stdout
+    assert "Size of node objects = 72.0 bytes per node" in stdout
+    assert "Memory retained by the parse = 400.0 bytes per node" in stdout
@@ -0,0 +1,62 @@
+# Copyright (c) 2024 Science and Technology Facilities Council
+#
+# All rights reserved.
+##
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Tests for the fparser2_startup_bench script."""
+
+import pytest
+from fparser.scripts import fparser2_startup_bench
+
+
+def test_time_startup():
+    """Check that time_startup() times a fresh interpreter."""
+    import_time, create_time = fparser2_startup_bench.time_startup("f2003")
+    assert import_time > 0.0
+    assert create_time > 0.0
+
+
+def test_runner_invalid_repeats():
+    """Test the checking on the value of the supplied repeats parameter."""
+    with pytest.raises(ValueError) as err:
+        fparser2_startup_bench.runner(0)
+    assert "Number of repeats must be a positive, non-zero integer but got: 0" in str(
+        err.value
+    )
+
+
+def test_runner(capsys, monkeypatch):
+    """Check that normal usage gives the expected benchmark output."""
+    monkeypatch.setattr(fparser2_startup_bench, "time_startup", lambda std: (0.5, 0.25))
+    fparser2_startup_bench.runner(2, "f2003")
+    stdout, stderr = capsys.readouterr()
+    assert stderr == ""
+    assert "start-up (f2003) 2 times" in stdout
+    assert "Time taken for import: min = 0.5000s, median = 0.5000s" in stdout
+    assert "Time taken for import + create: min = 0.7500s" in stdout
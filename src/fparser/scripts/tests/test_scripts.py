@@ -38,6 +38,8 @@
 
 # pylint: disable=too-few-public-methods
 
+import os
+
 import pytest
 from fparser.scripts import fparser2, read
 
@@ -151,8 +153,13 @@ def test_runner_internal_error(tmpdir, monkeypatch, capsys):
     # Create a dummy function that replaces the parser
 
     def dummy_parser(_self, std="f2003"):
-        """dummy function that simply raises an internal error"""
-        raise InternalError(std)
+        """dummy function that returns a parser that simply raises an
+        internal error"""
+
+        def parse(_reader):
+            raise InternalError(std)
+
+        return parse
 
     # monkeypatch the parser so that it returns an InternalError exception.
     from fparser.two.parser import ParserFactory
@@ -470,6 +477,79 @@ def test_main_output_std_invalid(capsys, monkeypatch):
     )
 
 
+@pytest.mark.parametrize("task", ["show", "repr", "none"])
+def test_main_jobs(tmpdir, capsys, monkeypatch, task):
+    """Test that the script main() function produces the same output
+    (in the same order) when the files are parsed by several processes
+    using --jobs.
+
+    """
+    import sys
+
+    my_files = []
+    for name, code in [
+        ("hello.f90", "program hello\nend program hello\n"),
+        ("broken.f90", "prog hello\nen\n"),
+        ("missing.f90", None),
+        ("mod.f90", "module mod\n  integer :: a\nend module mod\n"),
+    ]:
+        my_file = tmpdir.join(name)
+        if code:
+            my_file.write(code)
+        my_files.append(my_file.strpath)
+    monkeypatch.setattr(sys, "argv", ["fparser2", f"--task={task}"] + my_files)
+    fparser2.main()
+    expected = capsys.readouterr()
+    assert expected.err.count("File: '") == 4
+    assert "Syntax error: at line 1\n>>>prog hello" in expected.err
+    monkeypatch.setattr(
+        sys, "argv", ["fparser2", "--jobs=3", f"--task={task}"] + my_files
+    )
+    fparser2.main()
+    assert capsys.readouterr() == expected
+
+
+def test_main_jobs_invalid(capsys, monkeypatch):
+    """Test that the script main() function rejects an invalid number of
+    jobs."""
+    import sys
+
+    monkeypatch.setattr(sys, "argv", ["fparser2", "--jobs=0", "hello.f90"])
+    with pytest.raises(SystemExit) as excinfo:
+        fparser2.main()
+    assert excinfo.value.code == 1
+    _, stderr = capsys.readouterr()
+    assert "Error: The number of jobs must be at least 1" in stderr
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_main_cache_dir(tmpdir, capsys, monkeypatch, jobs):
+    """Test that the script main() function produces the same output when
+    the parse trees are cached using --cache-dir.
+
+    """
+    import sys
+
+    my_files = []
+    for name in ("hello.f90", "mod.f90"):
+        my_file = tmpdir.join(name)
+        my_file.write(f"module {name[:-4]}\n  integer :: a\nend module\n")
+        my_files.append(my_file.strpath)
+    monkeypatch.setattr(sys, "argv", ["fparser2"] + my_files)
+    fparser2.main()
+    expected = capsys.readouterr()
+    cache_dir = tmpdir.join("cache").strpath
+    for _ in range(2):
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["fparser2", f"--jobs={jobs}", f"--cache-dir={cache_dir}"] + my_files,
+        )
+        fparser2.main()
+        assert capsys.readouterr() == expected
+        assert len(os.listdir(cache_dir)) == 2
+
+
 # read.py script function runner()
 
 # Create a dummy class (DummyReadArgs) with the required attribute to pass
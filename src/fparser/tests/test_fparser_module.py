@@ -37,6 +37,7 @@ Test the setup performed for the fparser module.
 
 """
 import os
+import pytest
 import fparser
 
 
@@ -48,24 +49,35 @@ def test_fparser_get_version(monkeypatch):
     assert isinstance(ver1, str)
     assert "." in ver1
 
-    def _broken_version(_name):
-        """Broken routine with which to patch the `version` method."""
-        raise fparser.PackageNotFoundError()
-
     try:
         from importlib import metadata
-
-        monkeypatch.setattr(metadata, "version", _broken_version)
     except ImportError:
         # Use backport package for python <3.8
-        import importlib_metadata
+        import importlib_metadata as metadata
 
-        monkeypatch.setattr(importlib_metadata, "version", _broken_version)
+    def _broken_version(_name):
+        """Broken routine with which to patch the `version` method."""
+        raise metadata.PackageNotFoundError()
+
+    monkeypatch.setattr(metadata, "version", _broken_version)
     ver2 = fparser._get_version()
     assert isinstance(ver2, str)
     assert "." in ver2
 
 
+def test_fparser_version_attribute(monkeypatch):
+    """Test that the __version__ attribute of the fparser module is only
+    looked up when it is first used and that any other missing attribute
+    raises the usual error."""
+    monkeypatch.delitem(vars(fparser), "__version__", raising=False)
+    assert "__version__" not in vars(fparser)
+    assert fparser.__version__ == fparser._get_version()
+    assert vars(fparser)["__version__"] == fparser.__version__
+    with pytest.raises(AttributeError) as err:
+        _ = fparser.not_an_attribute
+    assert "module 'fparser' has no attribute 'not_an_attribute'" in str(err.value)
+
+
 def test_fparser_logging_handler(tmpdir, caplog):
     """Test the custom error handler that is configured in the __init__.py
     file.  Invalid characters in an input file are skipped and logging
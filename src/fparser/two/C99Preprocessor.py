@@ -166,6 +166,7 @@ class Cpp_If_Stmt(WORDClsBase):
         pattern.Pattern("<ifdef>", r"^\s*#\s*ifdef\b", value="#ifdef"),
         pattern.Pattern("<ifndef>", r"^\s*#\s*ifndef\b", value="#ifndef"),
     )
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -223,6 +224,7 @@ class Cpp_Elif_Stmt(WORDClsBase):
     use_names = ["Cpp_Pp_Tokens"]
 
     _pattern = pattern.Pattern("<elif-stmt>", r"^\s*#\s*elif\b", value="#elif")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -266,6 +268,7 @@ class Cpp_Else_Stmt(StringBase):
     subclass_names = []
 
     _pattern = pattern.Pattern("<else>", r"^\s*#\s*else\b")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -301,6 +304,7 @@ class Cpp_Endif_Stmt(StringBase):
     subclass_names = []
 
     _pattern = pattern.Pattern("<endif>", r"^\s*#\s*endif\b", value="#endif")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -337,6 +341,7 @@ class Cpp_Include_Stmt(Base):  # 6.10.2 Source file inclusion
     _regex = re.compile(r"#\s*include\b")
 
     use_names = ["Include_Filename"]
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -406,6 +411,7 @@ class Cpp_Macro_Stmt(Base):  # 6.10.3 Macro replacement
     use_names = ["Cpp_Macro_Identifier", "Cpp_Macro_Identifier_List", "Cpp_Pp_Tokens"]
 
     _regex = re.compile(r"#\s*define\b")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -573,6 +579,7 @@ class Cpp_Undef_Stmt(WORDClsBase):
     use_names = ["Cpp_Macro_Identifier"]
 
     _pattern = pattern.Pattern("<undef>", r"^\s*(#\s*undef)\b", value="#undef")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -618,6 +625,7 @@ class Cpp_Line_Stmt(WORDClsBase):  # 6.10.4 Line control
     use_names = ["Cpp_Pp_Tokens"]
 
     _pattern = pattern.Pattern("<line>", r"^\s*#\s*line\b", value="#line")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -662,6 +670,7 @@ class Cpp_Error_Stmt(WORDClsBase):  # 6.10.5 Error directive
     use_names = ["Cpp_Pp_Tokens"]
 
     _pattern = pattern.Pattern("<error>", r"^\s*#\s*error\b", value="#error")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -709,6 +718,7 @@ class Cpp_Warning_Stmt(WORDClsBase):
     use_names = ["Cpp_Pp_Tokens"]
 
     _pattern = pattern.Pattern("<warning>", r"^\s*#\s*warning\b", value="#warning")
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
@@ -758,6 +768,7 @@ class Cpp_Null_Stmt(Base):  # 6.10.7 Null directive
     """
 
     subclass_names = []
+    leading_keywords = ("#",)
 
     @staticmethod
     def match(string):
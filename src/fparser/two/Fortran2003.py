@@ -77,7 +77,7 @@ import sys
 from fparser.common.splitline import string_replace_map
 from fparser.two import pattern_tools as pattern
 from fparser.common.readfortran import FortranReaderBase
-from fparser.two.symbol_table import SYMBOL_TABLES
+from fparser.two.symbol_table import active_symbol_tables
 from fparser.two.utils import (
     Base,
     BlockBase,
@@ -99,6 +99,7 @@ from fparser.two.utils import (
     UnaryOpBase,
     walk,
     DynamicImport,
+    expr_parser_match,
 )
 from fparser.two.utils import (
     EXTENSIONS,
@@ -128,6 +129,8 @@ class Comment(Base):
     """
 
     subclass_names = []
+    # A Comment never matches a line of Fortran.
+    leading_keywords = ()
 
     @show_result
     def __new__(cls, string, parent_cls=None):
@@ -268,7 +271,10 @@ class Program(BlockBase):  # R201
         """
         # pylint: disable=unused-argument
         try:
-            return Base.__new__(cls, string, _deepcopy=_deepcopy)
+            # The parse of a program is a scope of the string_replace_map
+            # cache.
+            with string_replace_map.cache.scope():
+                return Base.__new__(cls, string, _deepcopy=_deepcopy)
         except NoMatchError:
             # At the moment there is no useful information provided by
             # NoMatchError so we pass on an empty string.
@@ -373,6 +379,7 @@ class Include_Stmt(Base):  # pylint: disable=invalid-name
     """
 
     use_names = ["Include_Filename"]
+    leading_keywords = ("INCLUDE",)
 
     @staticmethod
     def match(string):
@@ -1637,6 +1644,7 @@ class Derived_Type_Def(BlockBase):  # R429
         "Type_Bound_Procedure_Part",
         "End_Type_Stmt",
     ]
+    leading_keywords = ("TYPE",)
 
     @staticmethod
     def match(reader):
@@ -2764,6 +2772,7 @@ class Enum_Def(BlockBase):  # R460
 
     subclass_names = []
     use_names = ["Enum_Def_Stmt", "Enumerator_Def_Stmt", "End_Enum_Stmt"]
+    leading_keywords = ("ENUM",)
 
     @staticmethod
     def match(reader):
@@ -3102,6 +3111,17 @@ class Type_Declaration_Stmt(Type_Declaration_StmtBase):  # R501
 
     subclass_names = []
     use_names = ["Declaration_Type_Spec", "Attr_Spec_List", "Entity_Decl_List"]
+    leading_keywords = (
+        "INTEGER",
+        "REAL",
+        "COMPLEX",
+        "LOGICAL",
+        "CHARACTER",
+        "DOUBLE",
+        "BYTE",
+        "TYPE",
+        "CLASS",
+    )
 
     @staticmethod
     def get_attr_spec_list_cls():
@@ -3131,7 +3151,7 @@ class Type_Declaration_Stmt(Type_Declaration_StmtBase):  # R501
         if result:
             # We matched a declaration - capture the declared symbols in the
             # symbol table of the current scoping region.
-            table = SYMBOL_TABLES.current_scope
+            table = active_symbol_tables().current_scope
 
             if table and isinstance(result[0], Intrinsic_Type_Spec):
                 # We have a definition of symbol(s) of intrinsic type
@@ -3706,6 +3726,7 @@ class Access_Stmt(StmtBase, WORDClsBase):  # R518
 
     subclass_names = []
     use_names = ["Access_Spec", "Access_Id_List"]
+    leading_keywords = ("PUBLIC", "PRIVATE")
 
     @staticmethod
     def match(string):
@@ -3762,6 +3783,7 @@ class Allocatable_Stmt(StmtBase, WORDClsBase):  # R520
 
     subclass_names = []
     use_names = ["Object_Name_Deferred_Shape_Spec_List_Item_List"]
+    leading_keywords = ("ALLOCATABLE",)
 
     @staticmethod
     def match(string):
@@ -3784,6 +3806,7 @@ class Asynchronous_Stmt(StmtBase, WORDClsBase):  # R521
 
     subclass_names = []
     use_names = ["Object_Name_List"]
+    leading_keywords = ("ASYNCHRONOUS",)
 
     @staticmethod
     def match(string):
@@ -3802,6 +3825,7 @@ class Bind_Stmt(StmtBase):  # R522
 
     subclass_names = []
     use_names = ["Language_Binding_Spec", "Bind_Entity_List"]
+    leading_keywords = ("BIND",)
 
     @staticmethod
     def match(string):
@@ -3850,6 +3874,7 @@ class Data_Stmt(StmtBase):  # R524
 
     subclass_names = []
     use_names = ["Data_Stmt_Set"]
+    leading_keywords = ("DATA",)
 
     @staticmethod
     def match(string):
@@ -4100,6 +4125,7 @@ class Dimension_Stmt(StmtBase):  # R535
 
     subclass_names = []
     use_names = ["Array_Name", "Array_Spec"]
+    leading_keywords = ("DIMENSION",)
 
     @staticmethod
     def match(string):
@@ -4140,6 +4166,7 @@ class Intent_Stmt(StmtBase):  # R536
 
     subclass_names = []
     use_names = ["Intent_Spec", "Dummy_Arg_Name_List"]
+    leading_keywords = ("INTENT",)
 
     @staticmethod
     def match(string):
@@ -4175,6 +4202,7 @@ class Optional_Stmt(StmtBase, WORDClsBase):  # R537
 
     subclass_names = []
     use_names = ["Dummy_Arg_Name_List"]
+    leading_keywords = ("OPTIONAL",)
 
     @staticmethod
     def match(string):
@@ -4195,6 +4223,7 @@ class Parameter_Stmt(StmtBase, CALLBase):  # R538
 
     subclass_names = []
     use_names = ["Named_Constant_Def_List"]
+    leading_keywords = ("PARAMETER",)
 
     @staticmethod
     def match(string):
@@ -4229,6 +4258,7 @@ class Cray_Pointer_Stmt(StmtBase, WORDClsBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Cray_Pointer_Decl_List"]
+    leading_keywords = ("POINTER",)
 
     @staticmethod
     def match(string):
@@ -4383,6 +4413,7 @@ class Pointer_Stmt(StmtBase, WORDClsBase):  # R540
 
     subclass_names = []
     use_names = ["Pointer_Decl_List"]
+    leading_keywords = ("POINTER",)
 
     @staticmethod
     def match(string):
@@ -4422,6 +4453,7 @@ class Protected_Stmt(StmtBase, WORDClsBase):  # R542
 
     subclass_names = []
     use_names = ["Entity_Name_List"]
+    leading_keywords = ("PROTECTED",)
 
     @staticmethod
     def match(string):
@@ -4442,6 +4474,7 @@ class Save_Stmt(StmtBase, WORDClsBase):  # R543
 
     subclass_names = []
     use_names = ["Saved_Entity_List"]
+    leading_keywords = ("SAVE",)
 
     @staticmethod
     def match(string):
@@ -4507,6 +4540,7 @@ class Target_Stmt(StmtBase):  # R546
 
     subclass_names = []
     use_names = ["Target_Entity_Decl_List"]
+    leading_keywords = ("TARGET",)
 
     @staticmethod
     def match(string):
@@ -4531,6 +4565,7 @@ class Value_Stmt(StmtBase, WORDClsBase):  # R547
 
     subclass_names = []
     use_names = ["Dummy_Arg_Name_List"]
+    leading_keywords = ("VALUE",)
 
     @staticmethod
     def match(string):
@@ -4551,6 +4586,7 @@ class Volatile_Stmt(StmtBase, WORDClsBase):  # R548
 
     subclass_names = []
     use_names = ["Object_Name_List"]
+    leading_keywords = ("VOLATILE",)
 
     @staticmethod
     def match(string):
@@ -4576,6 +4612,7 @@ class Implicit_Stmt(StmtBase):  # R549
 
     subclass_names = []
     use_names = ["Implicit_Spec_List"]
+    leading_keywords = ("IMPLICIT",)
 
     @staticmethod
     def match(string):
@@ -4673,6 +4710,7 @@ class Namelist_Stmt(StmtBase):  # R552
 
     subclass_names = []
     use_names = ["Namelist_Group_Name", "Namelist_Group_Object_List"]
+    leading_keywords = ("NAMELIST",)
 
     @staticmethod
     def match(string):
@@ -4739,6 +4777,7 @@ class Equivalence_Stmt(StmtBase, WORDClsBase):  # R554
 
     subclass_names = []
     use_names = ["Equivalence_Set_List"]
+    leading_keywords = ("EQUIVALENCE",)
 
     @staticmethod
     def match(string):
@@ -4798,6 +4837,7 @@ class Common_Stmt(StmtBase):  # R557
 
     subclass_names = []
     use_names = ["Common_Block_Name", "Common_Block_Object_List"]
+    leading_keywords = ("COMMON",)
 
     @staticmethod
     def match(string):
@@ -5312,6 +5352,7 @@ class Allocate_Stmt(StmtBase):  # R623
 
     subclass_names = []
     use_names = ["Type_Spec", "Allocation_List", "Alloc_Opt_List"]
+    leading_keywords = ("ALLOCATE",)
 
     @classmethod
     def match(cls, string):
@@ -5528,6 +5569,7 @@ class Nullify_Stmt(StmtBase, CALLBase):  # R633
 
     subclass_names = []
     use_names = ["Pointer_Object_List"]
+    leading_keywords = ("NULLIFY",)
 
     @staticmethod
     def match(string):
@@ -5558,6 +5600,7 @@ class Deallocate_Stmt(StmtBase):  # R635
 
     subclass_names = []
     use_names = ["Allocate_Object_List", "Dealloc_Opt_List"]
+    leading_keywords = ("DEALLOCATE",)
 
     @staticmethod
     def match(string):
@@ -5771,6 +5814,7 @@ class Mult_Operand(BinaryOpBase):  # R704
     use_names = ["Mult_Operand"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Level_1_Expr, pattern.power_op.named(), Mult_Operand, string, right=False
@@ -5806,6 +5850,7 @@ class Add_Operand(BinaryOpBase):  # pylint: disable=invalid-name
     use_names = ["Mult_Operand"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         """Implement the matching for the add-operand rule. Makes use of the
         pre-defined mult_op pattern and the BinaryOpBase baseclass.
@@ -5816,9 +5861,12 @@ class Add_Operand(BinaryOpBase):  # pylint: disable=invalid-name
             instance matching a level-2-expr expression, a string \
             containing the matched operator and an fparser2 class \
             instance matching a mult-operand if there is a match, or \
-            None if there is not.
+            None if there is not. If expressions are parsed by \
+            precedence climbing then the matching node is returned \
+            instead (see :py:func:`fparser.two.utils.expr_parser_match`).
         :rtype: (subclass of :py:class:`fparser.two.utils.Base`, str, \
-            subclass of :py:class:`fparser.two.utils.Base`) or NoneType
+            subclass of :py:class:`fparser.two.utils.Base`) or \
+            :py:class:`fparser.two.utils.Base` or NoneType
 
         """
         return BinaryOpBase.match(
@@ -5842,6 +5890,7 @@ class Level_2_Expr(BinaryOpBase):  # R706
     use_names = ["Level_2_Expr"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Level_2_Expr, pattern.add_op.named(), Add_Operand, string
@@ -5860,6 +5909,7 @@ class Level_2_Unary_Expr(UnaryOpBase):  # R706.c
     use_names = []
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return UnaryOpBase.match(pattern.add_op.named(), Add_Operand, string)
 
@@ -5882,6 +5932,7 @@ class Level_3_Expr(BinaryOpBase):  # R710
     use_names = ["Level_3_Expr"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Level_3_Expr, pattern.concat_op.named(), Level_2_Expr, string
@@ -5905,6 +5956,7 @@ class Level_4_Expr(BinaryOpBase):  # R712
     use_names = []
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Level_3_Expr, pattern.rel_op.named(), Level_3_Expr, string
@@ -5928,6 +5980,7 @@ class And_Operand(UnaryOpBase):  # R714
     use_names = []
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return UnaryOpBase.match(pattern.not_op.named(), Level_4_Expr, string)
 
@@ -5945,6 +5998,7 @@ class Or_Operand(BinaryOpBase):  # R715
     use_names = ["Or_Operand", "And_Operand"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Or_Operand, pattern.and_op.named(), And_Operand, string
@@ -5964,6 +6018,7 @@ class Equiv_Operand(BinaryOpBase):  # R716
     use_names = ["Equiv_Operand"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Equiv_Operand, pattern.or_op.named(), Or_Operand, string
@@ -5984,6 +6039,7 @@ class Level_5_Expr(BinaryOpBase):  # R717
     use_names = ["Level_5_Expr"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Level_5_Expr, pattern.equiv_op.named(), Equiv_Operand, string
@@ -6009,6 +6065,7 @@ class Expr(BinaryOpBase):  # R722
     use_names = ["Expr"]
 
     @staticmethod
+    @expr_parser_match
     def match(string):
         return BinaryOpBase.match(
             Expr,
@@ -6502,6 +6559,7 @@ class Where_Stmt(StmtBase):  # R743
 
     subclass_names = []
     use_names = ["Mask_Expr", "Where_Assignment_Stmt"]
+    leading_keywords = ("WHERE",)
 
     @staticmethod
     def match(string):
@@ -6548,6 +6606,7 @@ class Where_Construct(BlockBase):  # R744
         "Elsewhere_Stmt",
         "End_Where_Stmt",
     ]
+    leading_keywords = ("WHERE",)
 
     @staticmethod
     def match(string):
@@ -6673,6 +6732,7 @@ class Masked_Elsewhere_Stmt(StmtBase):  # R749
 
     subclass_names = []
     use_names = ["Mask_Expr", "Where_Construct_Name"]
+    leading_keywords = ("ELSE",)
 
     @staticmethod
     def match(string):
@@ -6718,6 +6778,7 @@ class Elsewhere_Stmt(StmtBase, WORDClsBase):  # R750
     subclass_names = []
     use_names = ["Where_Construct_Name"]
     _regex = re.compile(r"ELSE\s*WHERE", re.I)
+    leading_keywords = ("ELSE",)
 
     @staticmethod
     def match(string):
@@ -6767,6 +6828,7 @@ class Forall_Construct(BlockBase):  # R752
 
     subclass_names = []
     use_names = ["Forall_Construct_Stmt", "Forall_Body_Construct", "End_Forall_Stmt"]
+    leading_keywords = ("FORALL",)
 
     @staticmethod
     def match(reader):
@@ -6965,6 +7027,7 @@ class Forall_Stmt(StmtBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Forall_Header", "Forall_Assignment_Stmt"]
+    leading_keywords = ("FORALL",)
 
     @staticmethod
     def match(string):
@@ -7070,6 +7133,7 @@ class If_Construct(BlockBase):  # R802
         "Else_Stmt",
         "End_If_Stmt",
     ]
+    leading_keywords = ("IF",)
 
     @staticmethod
     def match(string):
@@ -7157,6 +7221,7 @@ class Else_If_Stmt(StmtBase):  # R804
 
     subclass_names = []
     use_names = ["Scalar_Logical_Expr", "If_Construct_Name"]
+    leading_keywords = ("ELSE",)
 
     @staticmethod
     def match(string):
@@ -7203,6 +7268,7 @@ class Else_Stmt(StmtBase):  # R805
 
     subclass_names = []
     use_names = ["If_Construct_Name"]
+    leading_keywords = ("ELSE",)
 
     @staticmethod
     def match(string):
@@ -7258,6 +7324,7 @@ class If_Stmt(StmtBase):  # R807
     subclass_names = []
     use_names = ["Scalar_Logical_Expr", "Action_Stmt_C802"]
     action_stmt_cls = Action_Stmt_C802
+    leading_keywords = ("IF",)
 
     @classmethod
     def match(cls, string):
@@ -7317,6 +7384,7 @@ class Case_Construct(BlockBase):  # R808
         "End_Select_Stmt",
         "Execution_Part_Construct",
     ]
+    leading_keywords = ("SELECT",)
 
     @staticmethod
     def match(reader):
@@ -7393,6 +7461,7 @@ class Case_Stmt(StmtBase):  # R810
 
     subclass_names = []
     use_names = ["Case_Selector", "Case_Construct_Name"]
+    leading_keywords = ("CASE",)
 
     @staticmethod
     def match(string):
@@ -7531,6 +7600,7 @@ class Associate_Construct(BlockBase):  # R816
 
     subclass_names = []
     use_names = ["Associate_Stmt", "Execution_Part_Construct", "End_Associate_Stmt"]
+    leading_keywords = ("ASSOCIATE",)
 
     @staticmethod
     def match(reader):
@@ -7622,6 +7692,7 @@ class Select_Type_Construct(BlockBase):  # R821
         "Execution_Part_Construct",
         "End_Select_Type_Stmt",
     ]
+    leading_keywords = ("SELECT",)
 
     @staticmethod
     def match(reader):
@@ -7689,6 +7760,7 @@ class Type_Guard_Stmt(StmtBase):  # R823
 
     subclass_names = []
     use_names = ["Type_Spec", "Select_Construct_Name"]
+    leading_keywords = ("TYPE", "CLASS")
 
     @staticmethod
     def match(string):
@@ -7816,6 +7888,7 @@ class Block_Label_Do_Construct(BlockBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Label_Do_Stmt", "Execution_Part_Construct", "End_Do"]
+    leading_keywords = ("DO",)
 
     @classmethod
     def match(cls, reader):
@@ -7875,6 +7948,7 @@ class Block_Nonlabel_Do_Construct(BlockBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Nonlabel_Do_Stmt", "Execution_Part_Construct", "End_Do_Stmt"]
+    leading_keywords = ("DO",)
 
     @classmethod
     def match(cls, reader):
@@ -8223,6 +8297,7 @@ class Action_Term_Do_Construct(BlockBase):  # R836
 
     subclass_names = []
     use_names = ["Label_Do_Stmt", "Execution_Part_Construct", "Do_Term_Action_Stmt"]
+    leading_keywords = ("DO",)
 
     @classmethod
     def match(cls, reader):
@@ -8312,6 +8387,7 @@ class Outer_Shared_Do_Construct(BlockBase):  # R839
 
     subclass_names = []
     use_names = ["Label_Do_Stmt", "Do_Body", "Shared_Term_Do_Construct"]
+    leading_keywords = ("DO",)
 
     @staticmethod
     def match(reader):
@@ -8379,6 +8455,7 @@ class Cycle_Stmt(StmtBase, WORDClsBase):  # R843
 
     subclass_names = []
     use_names = ["Do_Construct_Name"]
+    leading_keywords = ("CYCLE",)
 
     @staticmethod
     def match(string):
@@ -8392,6 +8469,7 @@ class Exit_Stmt(StmtBase, WORDClsBase):  # R844
 
     subclass_names = []
     use_names = ["Do_Construct_Name"]
+    leading_keywords = ("EXIT",)
 
     @staticmethod
     def match(string):
@@ -8405,6 +8483,7 @@ class Goto_Stmt(StmtBase):  # R845
 
     subclass_names = []
     use_names = ["Label"]
+    leading_keywords = ("GO",)
 
     @staticmethod
     def match(string):
@@ -8426,6 +8505,7 @@ class Computed_Goto_Stmt(StmtBase):  # R846
 
     subclass_names = []
     use_names = ["Label_List", "Scalar_Int_Expr"]
+    leading_keywords = ("GO",)
 
     @staticmethod
     def match(string):
@@ -8465,6 +8545,7 @@ class Arithmetic_If_Stmt(StmtBase):  # R847
 
     subclass_names = []
     use_names = ["Scalar_Numeric_Expr", "Label"]
+    leading_keywords = ("IF",)
 
     @staticmethod
     def match(string):
@@ -8492,6 +8573,7 @@ class Continue_Stmt(StmtBase, STRINGBase):  # R848
     """
 
     subclass_names = []
+    leading_keywords = ("CONTINUE",)
 
     @staticmethod
     def match(string):
@@ -8508,6 +8590,7 @@ class Stop_Stmt(StmtBase, WORDClsBase):  # R849
 
     subclass_names = []
     use_names = ["Stop_Code"]
+    leading_keywords = ("STOP",)
 
     @staticmethod
     def match(string):
@@ -8588,6 +8671,7 @@ class Open_Stmt(StmtBase, CALLBase):  # R904
 
     subclass_names = []
     use_names = ["Connect_Spec_List"]
+    leading_keywords = ("OPEN",)
 
     @staticmethod
     def match(string):
@@ -8728,6 +8812,7 @@ class Close_Stmt(StmtBase, CALLBase):  # R908
 
     subclass_names = []
     use_names = ["Close_Spec_List"]
+    leading_keywords = ("CLOSE",)
 
     @staticmethod
     def match(string):
@@ -8788,6 +8873,7 @@ class Read_Stmt(StmtBase):  # R910
 
     subclass_names = []
     use_names = ["Io_Control_Spec_List", "Input_Item_List", "Format"]
+    leading_keywords = ("READ",)
 
     @staticmethod
     def match(string):
@@ -8851,6 +8937,7 @@ class Write_Stmt(StmtBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Io_Control_Spec_List", "Output_Item_List"]
+    leading_keywords = ("WRITE",)
 
     @staticmethod
     def match(string):
@@ -8908,6 +8995,7 @@ class Print_Stmt(StmtBase):  # R912
 
     subclass_names = []
     use_names = ["Format", "Output_Item_List"]
+    leading_keywords = ("PRINT",)
 
     @staticmethod
     def match(string):
@@ -9308,6 +9396,7 @@ class Wait_Stmt(StmtBase, CALLBase):  # R921
 
     subclass_names = []
     use_names = ["Wait_Spec_List"]
+    leading_keywords = ("WAIT",)
 
     @staticmethod
     def match(string):
@@ -9370,6 +9459,7 @@ class Backspace_Stmt(StmtBase):  # R923
 
     subclass_names = []
     use_names = ["File_Unit_Number", "Position_Spec_List"]
+    leading_keywords = ("BACKSPACE",)
 
     @staticmethod
     def match(string):
@@ -9404,6 +9494,7 @@ class Endfile_Stmt(StmtBase):  # R924
 
     subclass_names = []
     use_names = ["File_Unit_Number", "Position_Spec_List"]
+    leading_keywords = ("ENDFILE",)
 
     @staticmethod
     def match(string):
@@ -9438,6 +9529,7 @@ class Rewind_Stmt(StmtBase):  # R925
 
     subclass_names = []
     use_names = ["File_Unit_Number", "Position_Spec_List"]
+    leading_keywords = ("REWIND",)
 
     @staticmethod
     def match(string):
@@ -9503,6 +9595,7 @@ class Flush_Stmt(StmtBase):  # R927
 
     subclass_names = []
     use_names = ["File_Unit_Number", "Position_Spec_List"]
+    leading_keywords = ("FLUSH",)
 
     @staticmethod
     def match(string):
@@ -9574,6 +9667,7 @@ class Inquire_Stmt(StmtBase):  # R929
 
     subclass_names = []
     use_names = ["Inquire_Spec_List", "Scalar_Int_Variable", "Output_Item_List"]
+    leading_keywords = ("INQUIRE",)
 
     @staticmethod
     def match(string):
@@ -9737,6 +9831,7 @@ class Format_Stmt(StmtBase, WORDClsBase):  # R1001
 
     subclass_names = []
     use_names = ["Format_Specification"]
+    leading_keywords = ("FORMAT",)
 
     @staticmethod
     def match(string):
@@ -11005,7 +11100,8 @@ class Main_Program0(BlockBase):
         # symbol table. We include a ':' so that it is not a valid Fortran
         # name and therefore cannot clash with any routine names.
         table_name = "fparser2:main_program"
-        SYMBOL_TABLES.enter_scope(table_name)
+        symbol_tables = active_symbol_tables()
+        symbol_tables.enter_scope(table_name)
 
         result = BlockBase.match(
             None,
@@ -11014,10 +11110,10 @@ class Main_Program0(BlockBase):
             reader,
         )
 
-        SYMBOL_TABLES.exit_scope()
+        symbol_tables.exit_scope()
         if not result:
             # The match failed so remove the associated symbol table
-            SYMBOL_TABLES.remove(table_name)
+            symbol_tables.remove(table_name)
 
         return result
 
@@ -11184,6 +11280,7 @@ class Use_Stmt(StmtBase):  # pylint: disable=invalid-name
 
     subclass_names = []
     use_names = ["Module_Nature", "Module_Name", "Rename_List", "Only_List"]
+    leading_keywords = ("USE",)
 
     @staticmethod
     def match(string):
@@ -11210,7 +11307,7 @@ class Use_Stmt(StmtBase):  # pylint: disable=invalid-name
         """
         result = Use_Stmt._match(string)
         if result:
-            table = SYMBOL_TABLES.current_scope
+            table = active_symbol_tables().current_scope
             if table:
                 only_list = None
                 rename_list = None
@@ -11604,6 +11701,7 @@ class Interface_Block(BlockBase):  # R1201
 
     subclass_names = []
     use_names = ["Interface_Stmt", "Interface_Specification", "End_Interface_Stmt"]
+    leading_keywords = ("INTERFACE", "ABSTRACT")
 
     @staticmethod
     def match(reader):
@@ -11855,6 +11953,7 @@ class Import_Stmt(StmtBase, WORDClsBase):  # pylint: disable=invalid-name
     subclass_names = []
     use_names = ["Import_Name_List"]
     tostr = WORDClsBase.tostr_a
+    leading_keywords = ("IMPORT",)
 
     @staticmethod
     def match(string):
@@ -11890,6 +11989,7 @@ class External_Stmt(StmtBase, WORDClsBase):  # R1210
 
     subclass_names = []
     use_names = ["External_Name_List"]
+    leading_keywords = ("EXTERNAL",)
 
     @staticmethod
     def match(string):
@@ -11915,6 +12015,7 @@ class Procedure_Declaration_Stmt(StmtBase):  # R1211
 
     subclass_names = []
     use_names = ["Proc_Interface", "Proc_Attr_Spec_List", "Proc_Decl_List"]
+    leading_keywords = ("PROCEDURE",)
 
     @staticmethod
     def match(string):
@@ -12052,6 +12153,7 @@ class Intrinsic_Stmt(StmtBase, WORDClsBase):  # R1216
 
     subclass_names = []
     use_names = ["Intrinsic_Procedure_Name_List"]
+    leading_keywords = ("INTRINSIC",)
 
     @staticmethod
     def match(string):
@@ -12411,7 +12513,7 @@ class Intrinsic_Function_Reference(CallBase):  # No explicit rule
 
         # Check that that this name is not being shadowed (i.e. overridden)
         # by a symbol in scope at this point.
-        table = SYMBOL_TABLES.current_scope
+        table = active_symbol_tables().current_scope
         try:
             table.lookup(function_name)
             # We found a matching name so refuse to match this intrinsic.
@@ -12486,6 +12588,7 @@ class Call_Stmt(StmtBase):  # R1218
 
     subclass_names = []
     use_names = ["Procedure_Designator", "Actual_Arg_Spec_List"]
+    leading_keywords = ("CALL",)
 
     @staticmethod
     def match(string):
@@ -13049,6 +13152,7 @@ class Entry_Stmt(StmtBase):  # R1235
 
     subclass_names = []
     use_names = ["Entry_Name", "Dummy_Arg_List", "Suffix"]
+    leading_keywords = ("ENTRY",)
 
     @staticmethod
     def match(string):
@@ -13088,6 +13192,7 @@ class Return_Stmt(StmtBase):  # R1236
 
     subclass_names = []
     use_names = ["Scalar_Int_Expr"]
+    leading_keywords = ("RETURN",)
 
     @staticmethod
     def match(string):
@@ -13110,6 +13215,7 @@ class Contains_Stmt(StmtBase, STRINGBase):  # R1237
     """
 
     subclass_names = []
+    leading_keywords = ("CONTAINS",)
 
     @staticmethod
     def match(string):
@@ -62,6 +62,7 @@ class Block_Construct(BlockBase):
         "Execution_Part_Construct",
         "End_Block_Stmt",
     ]
+    leading_keywords = ("BLOCK",)
 
     @staticmethod
     def match(reader):
@@ -54,6 +54,7 @@ class Critical_Construct(BlockBase):
 
     subclass_names = []
     use_names = ["Critical_Stmt", "Execution_Part_Construct", "End_Critical_Stmt"]
+    leading_keywords = ("CRITICAL",)
 
     @staticmethod
     def match(reader):
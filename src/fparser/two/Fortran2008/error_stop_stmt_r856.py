@@ -48,6 +48,7 @@ class Error_Stop_Stmt(StmtBase, WORDClsBase):  # R856
 
     subclass_names = []
     use_names = ["Stop_Code"]
+    leading_keywords = ("ERROR",)
 
     @staticmethod
     def match(string):
@@ -0,0 +1,271 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Parsing of many Fortran source files using a pool of processes.
+
+`parse_files` spreads the files over a
+:py:class:`concurrent.futures.ProcessPoolExecutor`. Each worker process
+creates its parser once and then parses each file that it is given in
+its own :py:class:`fparser.two.parser.ParseContext`. The result for each
+file is sent back as a :py:class:`FileResult`, either containing the
+(picklable) parse tree or, if a `reduce` function is supplied, whatever
+that function returns for the tree. Reducing the tree within the worker
+avoids the cost of sending large trees back to the calling process.
+Errors are reported per file and the results are returned in the order
+in which the files were supplied, so the outcome does not depend on the
+number of processes. The files may be in archives (see
+:py:mod:`fparser.common.archive`), in which case each worker opens an
+archive once and reads the files straight from it.
+
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from fparser.common.archive import ReaderFactory
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.serialization import dumps, loads
+from fparser.two.utils import FortranSyntaxError, InternalError
+
+__all__ = ["FileResult", "parse_files"]
+
+#: The outcome of parsing one file. `filename` is the file as it was
+#: supplied (a path or an ArchiveMember), `result` is the parse tree (or what
+#: the `reduce` function returned for it) and `error` is None or a
+#: description of why the file could not be read or parsed, in which case
+#: `result` is None.
+FileResult = namedtuple("FileResult", "filename result error")
+
+
+class _Worker:
+    """
+    Parses files with a parser that is created once.
+
+    :param str std: the Fortran standard.
+    :param bool ignore_comments: whether or not to drop comments.
+    :param include_dirs: directories in which to search for included files.
+    :type include_dirs: Optional[List[str]]
+    :param reduce: function applied to each parse tree.
+    :type reduce: Optional[Callable]
+    :param cache: the cache of parse trees, if any.
+    :type cache: Optional[:py:class:`fparser.common.parse_cache.ParseCache`]
+
+    """
+
+    def __init__(self, std, ignore_comments, include_dirs, reduce, cache=None):
+        self.parser = Parser(std, cache=cache)
+        self.ignore_comments = ignore_comments
+        self.include_dirs = include_dirs
+        self.reduce = reduce
+        self.readers = ReaderFactory(
+            ignore_comments=ignore_comments, include_dirs=include_dirs
+        )
+
+    def __call__(self, filename):
+        """
+        :param filename: the Fortran source file to parse.
+        :type filename: str | :py:class:`fparser.common.archive.ArchiveMember`
+
+        :returns: the outcome of parsing the file.
+        :rtype: :py:class:`fparser.two.batch.FileResult`
+
+        """
+        try:
+            reader = self.readers(filename)
+        except (IOError, ValueError) as error:
+            return FileResult(filename, None, str(error))
+        try:
+            tree = ParseContext(self.parser).parse(reader)
+        except FortranSyntaxError as msg:
+            return FileResult(filename, None, f"Syntax error: {msg}")
+        except InternalError as msg:
+            return FileResult(filename, None, f"Internal error in fparser: {msg}")
+        if self.reduce is not None:
+            return FileResult(filename, self.reduce(tree), None)
+        return FileResult(filename, tree, None)
+
+
+# The worker of the current process (set up by _init_worker).
+_WORKER = None
+
+
+def _init_worker(std, ignore_comments, include_dirs, reduce, cache=None):
+    """
+    Sets up the worker of a pool process. See :py:class:`_Worker` for the
+    arguments.
+
+    """
+    global _WORKER  # pylint: disable=global-statement
+    _WORKER = _Worker(std, ignore_comments, include_dirs, reduce, cache)
+
+
+def _run_worker(filename):
+    """
+    :param filename: the Fortran source file to parse.
+    :type filename: str | :py:class:`fparser.common.archive.ArchiveMember`
+
+    :returns: the outcome of parsing the file in this pool process. A \
+        parse tree is returned in the compact format of \
+        :py:mod:`fparser.two.serialization` as this is smaller to send \
+        than a pickle.
+    :rtype: :py:class:`fparser.two.batch.FileResult`
+
+    """
+    result = _WORKER(filename)
+    if _WORKER.reduce is None and result.error is None:
+        return result._replace(result=dumps(result.result))
+    return result
+
+
+def _load_result(result):
+    """
+    :param result: the outcome of parsing a file (without a `reduce` \
+        function) in a pool process.
+    :type result: :py:class:`fparser.two.batch.FileResult`
+
+    :returns: the outcome with any serialised parse tree loaded.
+    :rtype: :py:class:`fparser.two.batch.FileResult`
+
+    """
+    if result.error is None:
+        return result._replace(result=loads(result.result))
+    return result
+
+
+def parse_files(
+    filenames,
+    jobs=None,
+    std=None,
+    reduce=None,
+    ignore_comments=False,
+    include_dirs=None,
+    chunksize=1,
+    cache=None,
+):
+    """
+    Parses the specified Fortran source files using a pool of processes.
+    The result for each file is yielded as soon as it (and the results for
+    all of the files before it) are available.
+
+    For example, to obtain the number of top-level program units in each
+    file:
+
+    >>> def count_units(tree):
+    ...     return len(tree.children) if tree else 0
+    >>> for result in parse_files(filenames, jobs=8, reduce=count_units):
+    ...     print(result.filename, result.error or result.result)
+
+    :param filenames: the Fortran source files to parse. Files in an \
+        archive are given by an \
+        :py:class:`fparser.common.archive.ArchiveMember` (see \
+        :py:meth:`fparser.common.archive.FortranArchive.members`).
+    :type filenames: Iterable[str | \
+        :py:class:`fparser.common.archive.ArchiveMember`]
+    :param int jobs: the number of processes to use. Defaults to the \
+        number of CPUs. If this is 1 then the files are parsed in the \
+        calling process.
+    :param str std: the Fortran standard. Choices are 'f2003' or \
+        'f2008'. 'f2003' is the default.
+    :param reduce: function applied to the parse tree of each file (which \
+        may be None if there is no code) in the worker process. What it \
+        returns is sent back instead of the tree. This must be picklable, \
+        i.e. defined at the top level of a module.
+    :type reduce: Optional[Callable]
+    :param bool ignore_comments: whether or not to drop comments.
+    :param include_dirs: directories in which to search for included files.
+    :type include_dirs: Optional[List[str]]
+    :param int chunksize: the number of files that are sent to a worker \
+        process at a time.
+    :param cache: where to look up (and store) the parse tree of each \
+        file. This may be shared by all of the processes.
+    :type cache: Optional[:py:class:`fparser.common.parse_cache.ParseCache`]
+
+    :returns: the outcome of parsing each file, in the order in which the \
+        files were supplied.
+    :rtype: Iterator[:py:class:`fparser.two.batch.FileResult`]
+
+    :raises ValueError: if the value of jobs or std is invalid.
+
+    """
+    filenames = list(filenames)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        raise ValueError(f"The number of jobs must be at least 1 but got {jobs}")
+    if std not in (None, "f2003", "f2008"):
+        raise ValueError(f"'{std}' is an invalid standard")
+    return _parse_files(
+        filenames,
+        jobs,
+        (std, ignore_comments, include_dirs, reduce, cache),
+        chunksize,
+    )
+
+
+def _parse_files(filenames, jobs, worker_args, chunksize):
+    """
+    Generator that does the work of :py:func:`parse_files`.
+
+    :param filenames: the Fortran source files to parse.
+    :type filenames: List[str | \
+        :py:class:`fparser.common.archive.ArchiveMember`]
+    :param int jobs: the number of processes to use.
+    :param tuple worker_args: the arguments with which to create the \
+        :py:class:`_Worker` of each process.
+    :param int chunksize: the number of files that are sent to a worker \
+        process at a time.
+
+    :returns: the outcome of parsing each file, in order.
+    :rtype: Generator[:py:class:`fparser.two.batch.FileResult`]
+
+    """
+    if jobs == 1 or len(filenames) < 2:
+        worker = _Worker(*worker_args)
+        with worker.readers:
+            for filename in filenames:
+                yield worker(filename)
+        return
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(filenames)),
+        initializer=_init_worker,
+        initargs=worker_args,
+    ) as executor:
+        results = executor.map(_run_worker, filenames, chunksize=chunksize)
+        reduce = worker_args[3]
+        if reduce is None:
+            results = map(_load_result, results)
+        yield from results
@@ -0,0 +1,184 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Event-based parsing of Fortran code.
+
+`iter_events` presents the code as a flat stream of the statements that
+are matched, in the order in which they appear, together with their
+nesting depth. This suits tools (e.g. to count lines, find USE
+statements or index calls) that never walk the parse tree. Each
+construct (e.g. a module, subroutine, loop or if construct) produces an
+"enter" event for its opening statement, a "statement" event for each
+statement (or comment, include or directive) within it and an "exit"
+event for its closing statement (or with no statement, for a loop that
+is terminated by a labelled statement). The groupings of statements that are
+not constructs (e.g. the specification and execution parts) do not
+produce events.
+
+The statements are matched by the fparser2 classes, one program unit at
+a time (see :py:meth:`fparser.two.parser.ParseContext.iter_program_units`).
+The construct nodes are not returned and their `content` lists are
+emptied as the events are produced so, provided that the caller does not
+keep the statement nodes, each statement is released once its event has
+been handled. The memory used then depends upon the size of the largest
+program unit rather than that of the whole code, as each unit is matched
+(and so held) in full before its events are produced.
+
+"""
+
+from collections import namedtuple
+
+from fparser.two import Fortran2003
+from fparser.two.parser import ParseContext
+from fparser.two.utils import BlockBase, EndStmtBase
+
+__all__ = ["ENTER", "EXIT", "STATEMENT", "Event", "iter_events"]
+
+#: The kind of the event for the opening statement of a construct.
+ENTER = "enter"
+#: The kind of the event for a statement within a construct.
+STATEMENT = "statement"
+#: The kind of the event for the closing statement of a construct.
+EXIT = "exit"
+
+#: A statement that has been matched. `kind` is one of ENTER, STATEMENT
+#: or EXIT, `node` is the statement (which may be None for a construct
+#: that has no opening or closing statement, e.g. a main program without
+#: a program statement), `depth` is the number of constructs that
+#: enclose the statement (not counting the construct that an ENTER or
+#: EXIT event is for) and `construct` is the class of the construct that
+#: is entered or exited (or None for a STATEMENT event).
+Event = namedtuple("Event", "kind node depth construct")
+
+# The blocks that group statements but are not constructs.
+_GROUPS = (
+    Fortran2003.Program,
+    Fortran2003.Block,
+    Fortran2003.Do_Block,
+    Fortran2003.Do_Body,
+    Fortran2003.Function_Body,
+    Fortran2003.Subroutine_Body,
+    Fortran2003.Specification_Part,
+    Fortran2003.Implicit_Part,
+    Fortran2003.Execution_Part,
+    Fortran2003.Internal_Subprogram_Part,
+    Fortran2003.Module_Subprogram_Part,
+    Fortran2003.Component_Part,
+    Fortran2003.Type_Bound_Procedure_Part,
+)
+
+# The nodes that may precede the opening statement of a construct.
+_PREFIXES = (Fortran2003.Comment, Fortran2003.Include_Stmt)
+
+
+def iter_events(reader, parser=None):
+    """
+    Parses the Fortran code provided by the reader and yields an event
+    for each statement that is matched. For example, to find the modules
+    used by each program unit:
+
+    >>> for event in iter_events(reader):
+    ...     if event.kind == ENTER and event.depth == 0:
+    ...         unit = event.node
+    ...     elif isinstance(event.node, Fortran2003.Use_Stmt):
+    ...         print(unit, "uses", event.node.items[2])
+
+    :param reader: the source of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+    :param parser: the parser to use. Defaults to the default parser (see \
+        :py:meth:`fparser.two.parser.Parser.make_default`).
+    :type parser: Optional[:py:class:`fparser.two.parser.Parser`]
+
+    :returns: the events, in the order of the statements in the code.
+    :rtype: Generator[:py:class:`fparser.two.events.Event`]
+
+    :raises FortranSyntaxError: if the code is not valid Fortran.
+
+    """
+    for unit in ParseContext(parser).iter_program_units(reader):
+        yield from _node_events(unit)
+
+
+def _node_events(top):
+    """
+    Generator that produces the events for a node of the parse tree and
+    empties the `content` list of each block as it goes.
+
+    :param top: the node for which to produce events.
+    :type top: :py:class:`fparser.two.utils.Base`
+
+    :returns: the events for the node.
+    :rtype: Generator[:py:class:`fparser.two.events.Event`]
+
+    """
+    depth = 0
+    # Each entry holds the (reversed) nodes of a block that have still to
+    # be visited and, for a construct, its class and closing statement.
+    stack = [([top], None, None)]
+    while stack:
+        pending, construct, end = stack[-1]
+        if not pending:
+            stack.pop()
+            if construct is not None:
+                depth -= 1
+                yield Event(EXIT, end, depth, construct)
+            continue
+        node = pending.pop()
+        if not isinstance(node, BlockBase):
+            yield Event(STATEMENT, node, depth, None)
+            continue
+        content = node.content
+        node.content = []
+        content.reverse()
+        if isinstance(node, _GROUPS):
+            stack.append((content, None, None))
+            continue
+        # Any comments (or includes) before the opening statement are
+        # part of the enclosing block.
+        while content and isinstance(content[-1], _PREFIXES):
+            yield Event(STATEMENT, content.pop(), depth, None)
+        start = None
+        if content and not isinstance(content[-1], BlockBase):
+            start = content.pop()
+        # A loop that is terminated by a labelled statement (e.g.
+        # "10 x = i" or "10 CONTINUE") has no closing statement: that
+        # statement is part of its body.
+        end = None
+        if content and isinstance(content[0], EndStmtBase):
+            end = content.pop(0)
+        yield Event(ENTER, start, depth, type(node))
+        depth += 1
+        stack.append((content, type(node), end))
@@ -0,0 +1,460 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+"""
+Precedence-climbing parser for Fortran expressions (rules R702-R722).
+
+The classes implementing the expression rules (`Expr`, `Level_5_Expr`,
+..., `Mult_Operand`) match a string by splitting it at the right-most
+(or left-most) operator of their own level and then matching the text
+either side of it. This re-tokenises the text at every level and
+recurses once per operator so that long expressions are slow to parse
+and can exceed Python's recursion limit.
+
+`ExprParser` tokenises an expression once and parses it with
+precedence climbing, creating exactly the same nodes as the recursive
+rules would. It only accepts expressions that conform to the standard
+grammar. Anything else (defined operators, consecutive operators,
+chained relational operators, ...) is declined so that the caller
+falls back to the recursive rules, which then behave exactly as they
+always have.
+
+"""
+
+import re
+
+from fparser.common.splitline import string_replace_map
+from fparser.two import Fortran2003
+from fparser.two import pattern_tools as pattern
+from fparser.two.utils import _match_or_none, _set_parent, active_rules
+
+# Binding power of the intrinsic operators (larger binds more tightly).
+_EQUIV, _OR, _AND, _NOT, _REL, _CONCAT, _ADD, _MULT, _POWER = range(1, 10)
+
+# Maps the (upper-cased, white-space free) text of a token to its
+# binding power. Logical literals are part of an operand and map to None.
+_OPERATORS = {
+    "**": _POWER,
+    "*": _MULT,
+    "/": _MULT,
+    "+": _ADD,
+    "-": _ADD,
+    "//": _CONCAT,
+    "==": _REL,
+    "/=": _REL,
+    "<": _REL,
+    "<=": _REL,
+    ">": _REL,
+    ">=": _REL,
+    ".EQ.": _REL,
+    ".NE.": _REL,
+    ".LT.": _REL,
+    ".LE.": _REL,
+    ".GT.": _REL,
+    ".GE.": _REL,
+    ".NOT.": _NOT,
+    ".AND.": _AND,
+    ".OR.": _OR,
+    ".EQV.": _EQUIV,
+    ".NEQV.": _EQUIV,
+    ".TRUE.": None,
+    ".FALSE.": None,
+}
+
+_TOKEN_RE = re.compile(r"[.]\s*[A-Z]+\s*[.]|[*]+|/=|/+|==|[<>]=?|[+-]", re.I)
+
+# The placeholders that string_replace_map() puts into a line.
+_KEY_RE = re.compile(
+    r"_F2PY_STRING_CONSTANT_\d+_|F2PY_REAL_CONSTANT_\d+_|F2PY_EXPR_TUPLE_\d+"
+)
+
+
+class ExprParser:
+    """
+    Parses Fortran expressions with precedence climbing. An instance is
+    stored in the rule table of a parser that is created with
+    `precedence_climbing=True` and is then used by the `match` methods of
+    the expression classes.
+
+    """
+
+    def __init__(self):
+        # The last string that was declined. The match methods of the
+        # lower expression levels are called with the same string when
+        # falling back to the recursive rules and would decline it too.
+        self._declined = None
+        self._binary_classes = {
+            _EQUIV: Fortran2003.Level_5_Expr,
+            _OR: Fortran2003.Equiv_Operand,
+            _AND: Fortran2003.Or_Operand,
+            _REL: Fortran2003.Level_4_Expr,
+            _CONCAT: Fortran2003.Level_3_Expr,
+            _ADD: Fortran2003.Level_2_Expr,
+            _MULT: Fortran2003.Add_Operand,
+            _POWER: Fortran2003.Mult_Operand,
+        }
+        self._unary_patterns = {
+            Fortran2003.Level_2_Unary_Expr: pattern.add_op,
+            Fortran2003.And_Operand: pattern.not_op,
+        }
+        self._entry_levels = {
+            Fortran2003.Expr: _EQUIV,
+            Fortran2003.Level_5_Expr: _EQUIV,
+            Fortran2003.Equiv_Operand: _OR,
+            Fortran2003.Or_Operand: _AND,
+            Fortran2003.And_Operand: _NOT,
+            Fortran2003.Level_4_Expr: _REL,
+            Fortran2003.Level_3_Expr: _CONCAT,
+            Fortran2003.Level_2_Expr: _ADD,
+            Fortran2003.Level_2_Unary_Expr: _ADD,
+            Fortran2003.Add_Operand: _MULT,
+            Fortran2003.Mult_Operand: _POWER,
+        }
+
+    def parse(self, cls, string):
+        """
+        Parse the supplied string as an instance of the expression rule
+        `cls`.
+
+        :param cls: the expression rule to match.
+        :type cls: subclass of :py:class:`fparser.two.utils.Base`
+        :param str string: the text to match.
+
+        :returns: the matched node, or None if the expression should be \
+            matched by the recursive rules instead.
+        :rtype: :py:class:`fparser.two.utils.Base` or NoneType
+
+        """
+        if string == self._declined:
+            return None
+        obj = None
+        # Placeholders already in the text would confuse the
+        # restoration of the text of each node.
+        if "F2PY_" not in string:
+            obj = self._parse(cls, string)
+        if obj is None:
+            self._declined = string
+        return obj
+
+    def _parse(self, cls, string):
+        """
+        :param cls: the expression rule to match.
+        :type cls: subclass of :py:class:`fparser.two.utils.Base`
+        :param str string: the text to match.
+
+        :returns: the matched node or None.
+        :rtype: :py:class:`fparser.two.utils.Base` or NoneType
+
+        """
+        line, repmap = string_replace_map(string)
+        tokens = _tokenise(line)
+        if tokens is None:
+            return None
+        tree = self._build_tree(cls, tokens)
+        if tree is None:
+            return None
+
+        # The text of each node is that of its tokens with the
+        # placeholders put back, i.e. what repmap() would give for it. A
+        # placeholder never spans the boundary of a token so the position
+        # of a token in the restored text is simply shifted by the change
+        # in length caused by the placeholders before it.
+        pieces = []
+        shifts = []
+        prev = 0
+        shift = 0
+        for key in _KEY_RE.finditer(line):
+            value = repmap[key.group()]
+            pieces.append(line[prev : key.start()])
+            pieces.append(value)
+            shift += len(value) - len(key.group())
+            shifts.append((key.end(), shift))
+            prev = key.end()
+        pieces.append(line[prev:])
+        full = "".join(pieces)
+        starts = []
+        ends = []
+        shift = 0
+        key_idx = 0
+        for token in tokens:
+            for pos, positions in ((token[1], starts), (token[2], ends)):
+                while key_idx < len(shifts) and shifts[key_idx][0] <= pos:
+                    shift = shifts[key_idx][1]
+                    key_idx += 1
+                positions.append(pos + shift)
+
+        # Work out the text of every node from the top down (as the
+        # recursive rules do) and then create the nodes from the
+        # bottom up.
+        keep_source = active_rules().keep_source
+        order = []
+        stack = [(tree, string)]
+        while stack:
+            node, text = stack.pop()
+            order.append((node, text))
+            if node[0] is None:
+                continue
+            if node[2] is None:
+                match = self._unary_patterns[node[0]].match(text)
+                if not match:
+                    return None
+                node[1] = text[: match.end()].rstrip().upper()
+                stack.append((node[3], text[match.end() :].lstrip()))
+            else:
+                lhs, rhs = node[2], node[3]
+                stack.append((lhs, full[starts[lhs[4]] : ends[lhs[5]]]))
+                stack.append((rhs, full[starts[rhs[4]] : ends[rhs[5]]]))
+        for node, text in reversed(order):
+            if node[0] is None:
+                obj = _match_or_none(Fortran2003.Level_1_Expr, text)
+                if obj is None:
+                    return None
+            else:
+                if not keep_source:
+                    text = None
+                if node[2] is None:
+                    obj = _new_node(node[0], text, (node[1], node[3][6]))
+                else:
+                    obj = _new_node(node[0], text, (node[2][6], node[1], node[3][6]))
+            node[6] = obj
+        return tree[6]
+
+    def _build_tree(self, cls, tokens):
+        """
+        Build the parse tree of the tokens using precedence climbing.
+
+        Each node of the tree is a list [cls, op, lhs, rhs, first, last,
+        obj] where `first` and `last` are the indices of the first and
+        last tokens of the node. Leaves have `cls` set to None and
+        unary operations have `lhs` set to None.
+
+        :param cls: the expression rule to match.
+        :type cls: subclass of :py:class:`fparser.two.utils.Base`
+        :param tokens: the tokens of the expression.
+        :type tokens: list of (int or NoneType, int, int, str or NoneType)
+
+        :returns: the root of the tree or None if the tokens do not \
+            form an expression of the rule `cls`.
+        :rtype: list or NoneType
+
+        """
+        count = len(tokens)
+        binary_classes = self._binary_classes
+
+        def operand(idx, min_level):
+            """
+            Parse an operand, which may be preceded by a unary operator.
+
+            :returns: the parsed node and the index of the next token.
+            :rtype: (list, int) or NoneType
+
+            """
+            if idx >= count:
+                return None
+            level = tokens[idx][0]
+            if level is None:
+                return [None, None, None, None, idx, idx, None], idx + 1
+            if level == _ADD and min_level <= _ADD:
+                unary_cls = Fortran2003.Level_2_Unary_Expr
+                result = expression(idx + 1, _MULT)
+            elif level == _NOT and min_level <= _NOT:
+                unary_cls = Fortran2003.And_Operand
+                result = expression(idx + 1, _REL)
+            else:
+                return None
+            if result is None:
+                return None
+            rhs, next_idx = result
+            return [unary_cls, None, None, rhs, idx, rhs[5], None], next_idx
+
+        def expression(idx, min_level):
+            """
+            Parse an expression containing operators that bind at least
+            as tightly as `min_level`.
+
+            :returns: the parsed node and the index of the next token.
+            :rtype: (list, int) or NoneType
+
+            """
+            result = operand(idx, min_level)
+            if result is None:
+                return None
+            lhs, idx = result
+            while idx < count:
+                level = tokens[idx][0]
+                if level is None or level == _NOT:
+                    return None
+                if level < min_level:
+                    break
+                if level == _POWER:
+                    # Right associative. Both sides of a power-op are
+                    # primaries so the chain can be folded without
+                    # recursing.
+                    if lhs[0] is not None:
+                        return None
+                    chain = [lhs]
+                    while idx < count and tokens[idx][0] == _POWER:
+                        if idx + 1 >= count or tokens[idx + 1][0] is not None:
+                            return None
+                        chain.append(idx)
+                        chain.append([None, None, None, None, idx + 1, idx + 1, None])
+                        idx += 2
+                    lhs = chain.pop()
+                    while chain:
+                        op_idx = chain.pop()
+                        base = chain.pop()
+                        lhs = [
+                            Fortran2003.Mult_Operand,
+                            tokens[op_idx][3],
+                            base,
+                            lhs,
+                            base[4],
+                            lhs[5],
+                            None,
+                        ]
+                    continue
+                result = expression(idx + 1, level + 1)
+                if result is None:
+                    return None
+                rhs, next_idx = result
+                if level == _REL and next_idx < count and tokens[next_idx][0] == _REL:
+                    # Relational operators are not associative.
+                    return None
+                lhs = [
+                    binary_classes[level],
+                    tokens[idx][3],
+                    lhs,
+                    rhs,
+                    lhs[4],
+                    rhs[5],
+                    None,
+                ]
+                idx = next_idx
+            return lhs, idx
+
+        if cls is Fortran2003.Level_2_Unary_Expr:
+            # A leading sign and then an add-operand.
+            if tokens[0][0] == _ADD:
+                result = operand(0, _ADD)
+            else:
+                result = expression(0, _MULT)
+        else:
+            result = expression(0, self._entry_levels[cls])
+        if result is None or result[1] != count:
+            return None
+        return result[0]
+
+
+def _tokenise(line):
+    """
+    Split a line (as returned by string_replace_map) into operators and
+    operands.
+
+    :param str line: the text to split.
+
+    :returns: a list of (level, start, end, operator) tuples where \
+        `level` is the binding power of an operator or None for an \
+        operand, `start` and `end` give the (stripped) extent of the \
+        token in the line and `operator` is the normalised text of an \
+        operator. None is returned if the line contains no operators \
+        or contains a defined or unrecognised operator.
+    :rtype: list of (int or NoneType, int, int, str or NoneType) or NoneType
+
+    """
+    tokens = []
+    prev = 0
+    for match in _TOKEN_RE.finditer(line):
+        text = match.group().upper()
+        try:
+            if text[0] == ".":
+                level = _OPERATORS["".join(text.split())]
+            else:
+                level = _OPERATORS[text]
+        except KeyError:
+            return None
+        if level is None:
+            # A logical literal constant is part of an operand.
+            continue
+        _add_operand(tokens, line, prev, match.start())
+        # The operator as stored by BinaryOpBase.
+        tokens.append((level, match.start(), match.end(), text.replace(" ", "")))
+        prev = match.end()
+    if prev == 0:
+        return None
+    _add_operand(tokens, line, prev, len(line))
+    return tokens
+
+
+def _add_operand(tokens, line, start, end):
+    """
+    Add the operand found in line[start:end] (if there is one) to the
+    list of tokens.
+
+    :param tokens: the tokens found so far.
+    :type tokens: list of (int or NoneType, int, int, str or NoneType)
+    :param str line: the text being tokenised.
+    :param int start: the start of the operand text.
+    :param int end: the end of the operand text.
+
+    """
+    text = line[start:end]
+    stripped = text.strip()
+    if stripped:
+        start += len(text) - len(text.lstrip())
+        tokens.append((None, start, start + len(stripped), None))
+
+
+def _new_node(cls, string, items):
+    """
+    Create a node in the same way as `Base.__new__` does when the match
+    method of `cls` returns `items`.
+
+    :param cls: the class of the node.
+    :type cls: subclass of :py:class:`fparser.two.utils.Base`
+    :param string: the text matched by the node (or None if it is not \
+        kept).
+    :type string: Optional[str]
+    :param tuple items: the children of the node.
+
+    :returns: the new node.
+    :rtype: `cls`
+
+    """
+    obj = object.__new__(cls)
+    obj._string = string
+    obj.item = None
+    obj.parent = None
+    _set_parent(obj, items)
+    obj.init(*items)
+    return obj
@@ -69,7 +69,26 @@ for a particular standard."""
 import inspect
 import logging
 import sys
-from fparser.two.symbol_table import SYMBOL_TABLES
+from concurrent.futures import ThreadPoolExecutor
+from fparser.common.archive import ReaderFactory
+from fparser.common.splitline import string_replace_map
+from fparser.two.symbol_table import (
+    SYMBOL_TABLES,
+    SymbolTables,
+    _ACTIVE_SYMBOL_TABLES,
+    active_symbol_tables,
+)
+from fparser.two.expr_parser import ExprParser
+from fparser.two.serialization import FORMAT_VERSION, dumps, loads
+from fparser.two.utils import (
+    BlockBase,
+    FortranSyntaxError,
+    LeadingKeywordIndex,
+    NoMatchError,
+    ParseMemo,
+    RuleTable,
+    _ACTIVE_RULES,
+)
 
 
 def get_module_classes(input_module):
@@ -96,14 +115,49 @@ def get_module_classes(input_module):
 class ParserFactory:
     """Creates a parser suitable for the specified Fortran standard."""
 
-    def create(self, std=None):
+    #: The parser most recently created by `create` (see
+    #: :py:meth:`Parser.make_default`).
+    default_parser = None
+
+    def create(
+        self,
+        std=None,
+        memoize=False,
+        precedence_climbing=False,
+        keep_source=False,
+    ):
         """Creates a class hierarchy suitable for the specified Fortran
         standard. Also sets-up the list of classes that define scoping
         regions in the global SymbolTables object and clears any existing
         symbol table information.
 
+        The resulting :py:class:`Parser` becomes the default parser, i.e.
+        the one that is used when the returned Program class (or any
+        other class) is called directly. It is available as
+        `ParserFactory.default_parser`. Use :py:class:`Parser` directly to
+        hold parsers for several standards at the same time.
+
+        The class hierarchy is only built by the first call for each
+        standard. Subsequent calls re-use it (see `clear_cache`).
+
         :param str std: the Fortran standard. Choices are 'f2003' or \
                         'f2008'. 'f2003' is the default.
+        :param bool memoize: whether or not to cache the outcome of \
+            matching each substring of a statement with each class (see \
+            :py:class:`fparser.two.utils.ParseMemo`). This speeds up \
+            the parsing of statements in which alternative rules match \
+            the same text (e.g. references with several arguments) but \
+            adds a small overhead to others. The cache and its hit/miss statistics are available as \
+            `Fortran2003.Base.parse_memo`.
+        :param bool precedence_climbing: whether or not to parse \
+            expressions by precedence climbing (see \
+            :py:class:`fparser.two.expr_parser.ExprParser`) rather than \
+            by recursively splitting them at each operator level. This \
+            produces the same parse tree but is much faster for long \
+            expressions.
+        :param bool keep_source: whether or not each node keeps a copy of \
+            the text that it was matched from (see \
+            :py:attr:`fparser.two.utils.Base.string`).
         :return: a Program class (not object) for use with the Fortran reader
         :rtype: :py:class:`fparser.two.Fortran2003.Program`
 
@@ -124,56 +178,40 @@ class ParserFactory:
         # Clear any existing symbol tables.
         SYMBOL_TABLES.clear()
 
-        # find all relevant classes in our Fortran2003 file as we
-        # always need these.
-        # pylint: disable=import-outside-toplevel
-        from fparser.two import Fortran2003
-
-        f2003_cls_members = get_module_classes(Fortran2003)
-        if not std:
-            # default to f2003.
-            std = "f2003"
-
-        if std == "f2003":
-            # we already have our required list of classes so call _setup
-            # to setup our class hierarchy.
-            self._setup(f2003_cls_members)
-            # The class hierarchy has been set up so return the top
-            # level class that we start from when parsing Fortran code.
-            return Fortran2003.Program
-        if std == "f2008":
-            # we need to find all relevent classes in our Fortran2003
-            # and Fortran2008 files and then ensure that where classes
-            # have the same name we return the Fortran2008 class
-            # i.e. where Fortran2008 extends Fortran2003 we return
-            # Fortran2008.
-            # First find all Fortran2008 classes.
-            from fparser.two import Fortran2008
-
-            f2008_cls_members = inspect.getmembers(
-                sys.modules[Fortran2008.__name__], inspect.isclass
-            )
+        parser = Parser(
+            std,
+            memoize=memoize,
+            precedence_climbing=precedence_climbing,
+            keep_source=keep_source,
+        )
+        parser.make_default()
+        # The top level class that we start from when parsing Fortran
+        # code. Fortran2008 does not extend the top level class so this is
+        # always the Fortran2003 one.
+        return Parser.program_class()
+
+    @staticmethod
+    def clear_cache(std=None):
+        """Discards the class hierarchy that has been cached for the
+        specified Fortran standard (or for all standards) so that it is
+        built afresh for the next parser that is created. This must be
+        called if any of the classes (or their `subclass_names`,
+        `use_names` or `leading_keywords`) are modified after a parser has
+        been created. Existing parsers keep the hierarchy that they were created with.
+
+        :param str std: the Fortran standard for which to discard the \
+            hierarchy. If this is not supplied then the hierarchies for \
+            all standards are discarded.
 
-            # next add in Fortran2003 classes if they do not already
-            # exist as a Fortran2008 class.
-            f2008_class_names = [i[0] for i in f2008_cls_members]
-            for local_cls in f2003_cls_members:
-                if local_cls[0] not in f2008_class_names:
-                    f2008_cls_members.append(local_cls)
-            # we now have our required list of classes so call _setup
-            # to setup our class hierarchy.
-            self._setup(f2008_cls_members)
-            # The class hierarchy has been set up so return the top
-            # level class that we start from when parsing Fortran
-            # code. Fortran2008 does not extend the top level class so
-            # we return the Fortran2003 one.
-            return Fortran2003.Program
-
-        raise ValueError(f"'{std}' is an invalid standard")
+        """
+        if std is None:
+            _HIERARCHIES.clear()
+        else:
+            _HIERARCHIES.pop(std, None)
 
     def _setup(self, input_classes):
         """Perform some Python magic to create the connections between classes
-        and populate the baseclass with this information. This has
+        and construct the class hierarchy from this information. This has
         been lifted from the original implementation and no attempt
         has been made to tidy up the code, other than making it
         conformant to the coding rules.
@@ -181,16 +219,18 @@ class ParserFactory:
         :param list input_classes: a list of tuples each containing a \
         class name and a class.
 
+        :returns: the optimised mapping from class name to the list of \
+            subclasses to try and the leading keyword index.
+        :rtype: Tuple[Dict[str, List[type]], \
+            :py:class:`fparser.two.utils.LeadingKeywordIndex`]
+
         """
         # pylint: disable=import-outside-toplevel
         from fparser.two import Fortran2003
 
         class_type = type(Fortran2003.Base)
 
-        # Reset subclasses dictionary in case this function has been
-        # called before. If this is not done then multiple calls to
-        # the ParserFactory create method may not work correctly.
-        Fortran2003.Base.subclasses = {}
+        subclasses = {}
         base_classes = {}
 
         for _, cls in input_classes:
@@ -255,7 +295,7 @@ class ParserFactory:
             local_subclass_names[cls] = opt_subclass_names[:]
 
         # Now that we've optimised the list of subclass names for each class,
-        # use this information to initialise the Base.subclasses dictionary:
+        # use this information to initialise the subclasses dictionary:
         for clsname, cls in base_classes.items():
             if not hasattr(cls, "subclass_names"):
                 message = f"{clsname} class is missing subclass_names list"
@@ -263,9 +303,9 @@ class ParserFactory:
                 continue
             subclass_names = local_subclass_names.get(cls, [])
             try:
-                bits = Fortran2003.Base.subclasses[clsname]
+                bits = subclasses[clsname]
             except KeyError:
-                Fortran2003.Base.subclasses[clsname] = bits = []
+                subclasses[clsname] = bits = []
             for name in subclass_names:
                 if name in base_classes:
                     bits.append(base_classes[name])
@@ -281,3 +321,485 @@ class ParserFactory:
                 if name not in base_classes:
                     message = f"{name} not defined, used by {cls.__name__}"
                     logging.getLogger(__name__).debug(message)
+
+        # Construct the index used to select the classes that may match a
+        # statement based upon its leading keyword.
+        keyword_index = LeadingKeywordIndex(subclasses)
+        for cls in base_classes.values():
+            keyword_index.keywords(cls)
+
+        return subclasses, keyword_index
+
+
+class Parser:
+    """
+    A Fortran parser for a particular standard. Each Parser owns its rule
+    table (see :py:class:`fparser.two.utils.RuleTable`) so that several
+    parsers (e.g. for different standards) can be held and used in the
+    same process. A parser makes its rule table the active one while it
+    parses. It may also be used as a context manager to make it the
+    active parser when calling classes directly:
+
+    >>> f2008_parser = Parser("f2008")
+    >>> ast = f2008_parser(reader)
+    >>> with f2008_parser:
+    ...     node = Fortran2003.Expr("a + b")
+
+    A parser is only active in the current context (i.e. thread or
+    asyncio task). When called (or activated), it constructs symbol tables
+    in the active container (by default the global `SYMBOL_TABLES`) and
+    uses its own packrat cache and expression parser, neither of which may
+    be used by two threads at once. Use a :py:class:`ParseContext` (or
+    :py:func:`parse_many`) for each parse that may run concurrently.
+
+    :param str std: the Fortran standard. Choices are 'f2003' or \
+        'f2008'. 'f2003' is the default.
+    :param bool memoize: whether or not to cache the outcome of matching \
+        each substring of a statement with each class (see \
+        :py:class:`fparser.two.utils.ParseMemo`).
+    :param bool precedence_climbing: whether or not to parse expressions \
+        by precedence climbing (see \
+        :py:class:`fparser.two.expr_parser.ExprParser`).
+    :param cache: where to store the parse tree (and symbol tables) of \
+        each source file so that, if it is parsed again, they can be \
+        loaded instead. None (the default) disables caching. Entries are \
+        keyed on the content of the code and not on where it is, so the \
+        tree that is loaded for a file with the same content as one that \
+        was parsed previously has readers that name that earlier file \
+        (e.g. in `item.reader.id`).
+    :type cache: Optional[:py:class:`fparser.common.parse_cache.ParseCache`]
+    :param bool keep_source: whether or not each node keeps a copy of the \
+        text that it was matched from. By default only the nodes whose \
+        value is their text (e.g. names and literals) keep it and the \
+        `string` of any other node is recreated when it is requested (see \
+        :py:attr:`fparser.two.utils.Base.string`).
+
+    :raises ValueError: if the supplied value for the std parameter is \
+        invalid.
+
+    """
+
+    def __init__(
+        self,
+        std=None,
+        memoize=False,
+        precedence_climbing=False,
+        cache=None,
+        keep_source=False,
+    ):
+        if not std:
+            # default to f2003.
+            std = "f2003"
+        if std not in ("f2003", "f2008"):
+            raise ValueError(f"'{std}' is an invalid standard")
+        self.std = std
+        subclasses, keyword_index, dispatch = _get_hierarchy(std)
+        self.rules = RuleTable(
+            subclasses,
+            keyword_index,
+            ParseMemo() if memoize else None,
+            ExprParser() if precedence_climbing else None,
+            dispatch,
+            keep_source,
+        )
+        self.cache = cache
+        # The tokens with which to restore the rules that were active before
+        # each (nested) activation of this parser.
+        self._tokens = []
+
+    @staticmethod
+    def program_class():
+        """
+        :returns: the top level class that we start from when parsing \
+            Fortran code.
+        :rtype: type
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from fparser.two import Fortran2003
+
+        return Fortran2003.Program
+
+    def __enter__(self):
+        self._tokens.append(_ACTIVE_RULES.set(self.rules))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _ACTIVE_RULES.reset(self._tokens.pop())
+
+    def __call__(self, reader):
+        """
+        Parses the Fortran code provided by the reader.
+
+        :param reader: the source of the Fortran code.
+        :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        :returns: the parse tree or None if there is no code.
+        :rtype: Optional[:py:class:`fparser.two.Fortran2003.Program`]
+
+        """
+        token = _ACTIVE_RULES.set(self.rules)
+        try:
+            return self._parse(reader)
+        finally:
+            _ACTIVE_RULES.reset(token)
+
+    def _parse(self, reader):
+        """
+        Parses the Fortran code provided by the reader with the active rules
+        and symbol tables, using the cache (if any) of this parser. On a
+        cache hit, the symbol tables that the parse would have created are
+        added to the active symbol tables.
+
+        :param reader: the source of the Fortran code.
+        :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        :returns: the parse tree or None if there is no code.
+        :rtype: Optional[:py:class:`fparser.two.Fortran2003.Program`]
+
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(
+                reader,
+                "fparser2",
+                self.std,
+                FORMAT_VERSION,
+                self.rules.keep_source,
+            )
+        if key is None:
+            return self.program_class()(reader)
+        symbol_tables = active_symbol_tables()
+        cached = self.cache.get(key)
+        if cached is not None:
+            tree, tables = loads(cached, extra=True)
+            for table in tables:
+                try:
+                    existing = [symbol_tables.lookup(table.name)]
+                except KeyError:
+                    existing = []
+                symbol_tables.replace_tables(existing, [table])
+            return tree
+        previous = {id(table) for table in symbol_tables.tables}
+        tree = self.program_class()(reader)
+        tables = [table for table in symbol_tables.tables if id(table) not in previous]
+        self.cache.put(key, dumps(tree, extra=tables), reader.included_files)
+        return tree
+
+    def make_default(self):
+        """
+        Makes this the default parser, i.e. the one that is active when no
+        other parser has been activated. The `subclasses`, `keyword_index`,
+        `parse_memo` and `expr_parser` attributes of `Base` are set to
+        those of this parser for backwards compatibility.
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from fparser.two import Fortran2003
+
+        base = Fortran2003.Base
+        base.rules = self.rules
+        base.subclasses = self.rules.subclasses
+        base.keyword_index = self.rules.keyword_index
+        base.parse_memo = self.rules.parse_memo
+        base.expr_parser = self.rules.expr_parser
+        ParserFactory.default_parser = self
+
+
+class ParseContext:
+    """
+    Holds all of the mutable state of a parse: the symbol tables that are
+    constructed and the packrat cache and expression parser (if enabled)
+    used by the parser. Parses performed in different contexts are
+    independent of one another and may therefore run concurrently in
+    different threads (or be offloaded to threads by asyncio tasks):
+
+    >>> context = ParseContext(Parser("f2008"))
+    >>> ast = context.parse(reader)
+    >>> table = context.symbol_tables.lookup("my_mod")
+
+    A context may also be used as a context manager, in which case it is
+    active for the current thread (or asyncio task) only.
+
+    :param parser: the parser to use. Defaults to the default parser (see \
+        :py:meth:`Parser.make_default`).
+    :type parser: Optional[:py:class:`fparser.two.parser.Parser`]
+
+    """
+
+    def __init__(self, parser=None):
+        if parser is None:
+            parser = ParserFactory.default_parser or Parser()
+        self.parser = parser
+        rules = parser.rules
+        # The class hierarchy is shared (and not modified while parsing)
+        # but the state of the cache and expression parser is not.
+        self.rules = RuleTable(
+            rules.subclasses,
+            rules.keyword_index,
+            ParseMemo() if rules.parse_memo is not None else None,
+            ExprParser() if rules.expr_parser is not None else None,
+            rules.dispatch,
+            rules.keep_source,
+        )
+        #: The symbol tables constructed while parsing in this context.
+        #: Consistency checks are enabled if they are in the symbol tables
+        #: that are active when the context is created.
+        self.symbol_tables = SymbolTables()
+        self.symbol_tables.enable_checks(active_symbol_tables().checks_enabled)
+        # The tokens with which to restore the state that was active before
+        # each (nested) activation of this context.
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(
+            (
+                _ACTIVE_RULES.set(self.rules),
+                _ACTIVE_SYMBOL_TABLES.set(self.symbol_tables),
+            )
+        )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        rules_token, tables_token = self._tokens.pop()
+        _ACTIVE_SYMBOL_TABLES.reset(tables_token)
+        _ACTIVE_RULES.reset(rules_token)
+
+    def parse(self, reader):
+        """
+        Parses the Fortran code provided by the reader in this context.
+
+        :param reader: the source of the Fortran code.
+        :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        :returns: the parse tree or None if there is no code.
+        :rtype: Optional[:py:class:`fparser.two.Fortran2003.Program`]
+
+        """
+        with self:
+            # pylint: disable=protected-access
+            return self.parser._parse(reader)
+
+    def iter_program_units(self, reader, keep_symbol_tables=False):
+        """
+        Parses the Fortran code provided by the reader in this context one
+        program unit at a time. Each node that `parse` would return as a
+        child of the `Program` (i.e. each program unit and any comments,
+        includes and directives between them) is yielded as soon as it has
+        been matched, rather than once all of the code has been parsed:
+
+        >>> for unit in ParseContext(Parser("f2008")).iter_program_units(reader):
+        ...     print(unit.__class__.__name__, unit.get_name())
+
+        Once a node has been yielded, the source lines that the reader
+        cached for it are discarded and, unless `keep_symbol_tables` is
+        True, so are the symbol tables created for it (as these refer to
+        the nodes) when the next node is requested. Provided that the
+        caller does not keep the nodes and the code is read from a file,
+        the memory used therefore depends on the size of the largest
+        program unit rather than on the size of the file. The yielded
+        nodes have no parent and the cache of the parser (if any) is not
+        used.
+
+        :param reader: the source of the Fortran code.
+        :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+        :param bool keep_symbol_tables: whether or not to keep the symbol \
+            tables of every program unit in `symbol_tables`.
+
+        :returns: the top-level nodes of the parse tree, in order.
+        :rtype: Generator[:py:class:`fparser.two.utils.Base`]
+
+        :raises FortranSyntaxError: if a program unit is not valid Fortran.
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from fparser.two import Fortran2003
+
+        previous = {id(table) for table in self.symbol_tables.tables}
+        while True:
+            content = []
+            with self, string_replace_map.cache.scope():
+                Fortran2003.add_comments_includes_directives(content, reader)
+                try:
+                    # Look at the next item to see whether there is another
+                    # program unit.
+                    item = reader.next()
+                except StopIteration:
+                    item = None
+                if item is not None:
+                    reader.put_item(item)
+                    if item.reader is reader:
+                        # The lines before this item are no longer needed.
+                        reader.source_lines.discard(item.span[0] - 1)
+                    try:
+                        unit = Fortran2003.Program_Unit(reader)
+                    except NoMatchError:
+                        unit = None
+                    if unit is None:
+                        # As for Program, look for a main program without a
+                        # program statement.
+                        result = BlockBase.match(
+                            Fortran2003.Main_Program0, [], None, reader
+                        )
+                        if not result:
+                            raise FortranSyntaxError(reader, "")
+                        content.extend(result[0])
+                    else:
+                        content.append(unit)
+                if self.rules.parse_memo is not None:
+                    # The cached results refer to the last statement.
+                    self.rules.parse_memo.clear()
+            if item is None:
+                yield from content
+                return
+            # Hold no references to the nodes once they have been yielded.
+            item = None
+            yield from content
+            content = None
+            if not keep_symbol_tables:
+                self.symbol_tables.replace_tables(
+                    [
+                        table
+                        for table in self.symbol_tables.tables
+                        if id(table) not in previous
+                    ],
+                    [],
+                )
+
+
+def iter_program_units(reader, parser=None):
+    """
+    Parses the Fortran code provided by the reader one program unit at a
+    time in a new :py:class:`ParseContext`. See
+    :py:meth:`ParseContext.iter_program_units`.
+
+    :param reader: the source of the Fortran code.
+    :type reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+    :param parser: the parser to use. Defaults to the default parser (see \
+        :py:meth:`Parser.make_default`).
+    :type parser: Optional[:py:class:`fparser.two.parser.Parser`]
+
+    :returns: the top-level nodes of the parse tree, in order.
+    :rtype: Generator[:py:class:`fparser.two.utils.Base`]
+
+    :raises FortranSyntaxError: if a program unit is not valid Fortran.
+
+    """
+    return ParseContext(parser).iter_program_units(reader)
+
+
+def parse_many(
+    paths, max_workers=None, parser=None, ignore_comments=True, include_dirs=None
+):
+    """
+    Parses the specified Fortran source files using a pool of threads.
+    Each file is parsed in its own :py:class:`ParseContext`. The files may
+    be in archives (see :py:mod:`fparser.common.archive`).
+
+    :param paths: the Fortran source files to parse.
+    :type paths: Iterable[str | \
+        :py:class:`fparser.common.archive.ArchiveMember`]
+    :param int max_workers: the maximum number of threads to use. See \
+        :py:class:`concurrent.futures.ThreadPoolExecutor` for the default.
+    :param parser: the parser to use. Defaults to the default parser (see \
+        :py:meth:`Parser.make_default`).
+    :type parser: Optional[:py:class:`fparser.two.parser.Parser`]
+    :param bool ignore_comments: whether or not to drop comments.
+    :param include_dirs: directories in which to search for included files.
+    :type include_dirs: Optional[List[str]]
+
+    :returns: the parse tree (or None if there is no code) for each file, \
+        in the order in which the files were supplied.
+    :rtype: List[Optional[:py:class:`fparser.two.Fortran2003.Program`]]
+
+    :raises FortranSyntaxError: if the code in any of the files is \
+        not valid Fortran.
+
+    """
+    if parser is None:
+        parser = ParserFactory.default_parser or Parser()
+
+    readers = ReaderFactory(ignore_comments=ignore_comments, include_dirs=include_dirs)
+
+    def _parse(path):
+        """
+        :param path: the Fortran source file to parse.
+        :type path: str | :py:class:`fparser.common.archive.ArchiveMember`
+
+        :returns: the parse tree or None if there is no code.
+        :rtype: Optional[:py:class:`fparser.two.Fortran2003.Program`]
+
+        """
+        return ParseContext(parser).parse(readers(path))
+
+    with readers, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_parse, paths))
+
+
+# The class hierarchies that have been built, keyed on the Fortran
+# standard. Each is a tuple containing the `subclasses` dict, the
+# LeadingKeywordIndex and the (shared) dict of compiled dispatch tuples for
+# that standard.
+_HIERARCHIES = {}
+
+
+def _get_hierarchy(std):
+    """
+    Gets the class hierarchy for the specified standard from the cache or,
+    failing that, by inspecting the classes.
+
+    :param str std: the (valid) Fortran standard.
+
+    :returns: the optimised mapping from class name to the list of \
+        subclasses to try, the leading keyword index and the dict of \
+        compiled dispatch tuples.
+    :rtype: Tuple[Dict[str, List[type]], \
+        :py:class:`fparser.two.utils.LeadingKeywordIndex`, \
+        Dict[type, Tuple[type, ...]]]
+
+    """
+    hierarchy = _HIERARCHIES.get(std)
+    if hierarchy is not None:
+        return hierarchy
+
+    subclasses, keyword_index = ParserFactory()._setup(_get_std_classes(std))
+    hierarchy = _HIERARCHIES[std] = (subclasses, keyword_index, {})
+    return hierarchy
+
+
+def _get_std_classes(std):
+    """
+    :param str std: the (valid) Fortran standard.
+
+    :returns: the classes that make up the specified standard as a list \
+        of tuples each containing a class name and a class.
+    :rtype: List[Tuple[str, type]]
+
+    """
+    # pylint: disable=import-outside-toplevel
+    from fparser.two import Fortran2003
+
+    # find all relevant classes in our Fortran2003 file as we
+    # always need these.
+    f2003_cls_members = get_module_classes(Fortran2003)
+    if std == "f2003":
+        return f2003_cls_members
+    # we need to find all relevent classes in our Fortran2003
+    # and Fortran2008 files and then ensure that where classes
+    # have the same name we return the Fortran2008 class
+    # i.e. where Fortran2008 extends Fortran2003 we return
+    # Fortran2008.
+    # First find all Fortran2008 classes.
+    from fparser.two import Fortran2008
+
+    f2008_cls_members = inspect.getmembers(
+        sys.modules[Fortran2008.__name__], inspect.isclass
+    )
+
+    # next add in Fortran2003 classes if they do not already
+    # exist as a Fortran2008 class.
+    f2008_class_names = [i[0] for i in f2008_cls_members]
+    for local_cls in f2003_cls_members:
+        if local_cls[0] not in f2008_class_names:
+            f2008_cls_members.append(local_cls)
+    return f2008_cls_members
@@ -74,6 +74,7 @@ Author: Pearu Peterson <pearu@cens.ioc.ee>
 Created: Oct 2006
 
 """
+
 import re
 
 dollar_ok = True
@@ -272,13 +273,24 @@ class Pattern:
         return Pattern(label, pattern, flags=self._flags)
 
     def named(self, name=None):
+        # The same named patterns are requested by match methods every
+        # time they are called so cache them (and hence their compiled
+        # form).
+        try:
+            return self._named_patterns[name]
+        except AttributeError:
+            self._named_patterns = {}
+        except KeyError:
+            pass
         if name is None:
             label = self.label
             assert label[0] + label[-1] == "<>" and " " not in label, repr(label)
         else:
             label = "<%s>" % (name)
         pattern = "(?P%s%s)" % (label.replace("-", "_"), self.pattern)
-        return Pattern(label, pattern, flags=self._flags, value=self.value)
+        result = Pattern(label, pattern, flags=self._flags, value=self.value)
+        self._named_patterns[name] = result
+        return result
 
     def rename(self, label):
         if label[0] + label[-1] != "<>":
@@ -0,0 +1,417 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""
+Incremental reparsing of Fortran code that has been edited.
+
+`reparse` updates an existing parse tree after some lines of the source
+have been changed. Rather than parsing all of the code again, it finds
+the smallest block (:py:class:`fparser.two.utils.BlockBase` subtree, e.g.
+a construct or the execution part of a subroutine) that encloses the
+edited lines, parses just the new text of that block and splices the
+result into the tree. If that fails (e.g. because the edit changed the
+structure of the code) then the enclosing block is tried and so on up
+to the whole program.
+
+A block is only accepted if the new text parses as the same class and
+all of it is consumed. Declarations and USE statements are recorded in
+the symbol table of the enclosing scoping region while parsing. A block
+is therefore not reparsed on its own if it contains (or would contain)
+any of these. Instead, the enclosing scoping region (e.g. the
+subroutine) is reparsed and its symbol table is replaced.
+
+"""
+
+from fparser.common.readfortran import FortranStringReader
+from fparser.two import Fortran2003
+from fparser.two.symbol_table import SymbolTable, active_symbol_tables
+from fparser.two.utils import (
+    BlockBase,
+    FortranSyntaxError,
+    NoMatchError,
+    ScopingRegionMixin,
+)
+
+__all__ = ["reparse"]
+
+# The name of the symbol table that is used when matching a main program
+# without a program statement (see Fortran2003.Main_Program0).
+_MAIN_PROGRAM_TABLE = "fparser2:main_program"
+
+# The statements that record symbols in the symbol table of the current
+# scoping region.
+_DECLARATIONS = (Fortran2003.Type_Declaration_Stmt, Fortran2003.Use_Stmt)
+
+
+def _span(node):
+    """
+    :param node: a node of a parse tree.
+    :type node: :py:class:`fparser.two.utils.Base`
+
+    :returns: the first and last lines of the source from which the \
+        node was parsed or None if these are not known.
+    :rtype: Optional[Tuple[int, int]]
+
+    """
+    if isinstance(node, BlockBase):
+        if not node.content:
+            return None
+        first = _span(node.content[0])
+        last = _span(node.content[-1])
+        if first is None or last is None:
+            return None
+        return first[0], last[1]
+    item = getattr(node, "item", None)
+    if item is None:
+        return None
+    return item.span
+
+
+def _items(nodes):
+    """
+    :param nodes: nodes of a parse tree.
+    :type nodes: Iterable[:py:class:`fparser.two.utils.Base`]
+
+    :returns: the items read by the reader from which the statements (and \
+        comments etc.) in the subtrees of the nodes were parsed.
+    :rtype: Generator[:py:class:`fparser.common.readfortran.Line` | \
+        :py:class:`fparser.common.readfortran.Comment`]
+
+    """
+    stack = list(nodes)
+    stack.reverse()
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BlockBase):
+            stack.extend(reversed(node.content))
+        else:
+            # The nodes within a statement do not have items of their own.
+            item = getattr(node, "item", None)
+            if item is not None:
+                yield item
+
+
+def _start_stmt(block):
+    """
+    :param block: a block of code.
+    :type block: :py:class:`fparser.two.utils.BlockBase`
+
+    :returns: the statement that starts the block if it is a scoping \
+        region, or None.
+    :rtype: Optional[:py:class:`fparser.two.utils.ScopingRegionMixin`]
+
+    """
+    if block.content and isinstance(block.content[0], ScopingRegionMixin):
+        return block.content[0]
+    return None
+
+
+def _is_scoping_region(node):
+    """
+    :param node: a node of a parse tree.
+    :type node: :py:class:`fparser.two.utils.Base`
+
+    :returns: whether or not the node is a block with its own symbol table.
+    :rtype: bool
+
+    """
+    return isinstance(node, Fortran2003.Main_Program0) or (
+        isinstance(node, BlockBase) and _start_stmt(node) is not None
+    )
+
+
+def _scoping_regions(node):
+    """
+    :param node: a node of a parse tree.
+    :type node: :py:class:`fparser.two.utils.Base`
+
+    :returns: the outermost scoping regions within (or equal to) the node, \
+        and whether or not any declarations are found outside of them.
+    :rtype: Tuple[List[:py:class:`fparser.two.utils.BlockBase`], bool]
+
+    """
+    regions = []
+    declares = False
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if _is_scoping_region(node):
+            regions.append(node)
+            continue
+        if isinstance(node, _DECLARATIONS):
+            declares = True
+            continue
+        if isinstance(node, BlockBase):
+            stack.extend(reversed(node.content))
+    return regions, declares
+
+
+def _table(tables, region, parent):
+    """
+    :param tables: the container of all symbol tables.
+    :type tables: :py:class:`fparser.two.symbol_table.SymbolTables`
+    :param region: a scoping region.
+    :type region: :py:class:`fparser.two.utils.BlockBase`
+    :param parent: the symbol table of the scoping region enclosing the \
+        region, or None if it is at the top level.
+    :type parent: Optional[:py:class:`fparser.two.symbol_table.SymbolTable`]
+
+    :returns: the symbol table of the scoping region.
+    :rtype: :py:class:`fparser.two.symbol_table.SymbolTable`
+
+    :raises KeyError: if there is no such table.
+
+    """
+    if isinstance(region, Fortran2003.Main_Program0):
+        return tables.lookup(_MAIN_PROGRAM_TABLE)
+    stmt = _start_stmt(region)
+    if parent is None:
+        return tables.lookup(stmt.get_scope_name())
+    for child in parent.children:
+        if child.node is stmt:
+            return child
+    raise KeyError(f"No symbol table for '{stmt.get_scope_name()}'")
+
+
+def _enclosing_table(tables, path):
+    """
+    :param tables: the container of all symbol tables.
+    :type tables: :py:class:`fparser.two.symbol_table.SymbolTables`
+    :param path: the nodes from the root of the tree down to (but not \
+        including) the node of interest.
+    :type path: List[:py:class:`fparser.two.utils.Base`]
+
+    :returns: the symbol table of the innermost scoping region in the \
+        path or None if there is none.
+    :rtype: Optional[:py:class:`fparser.two.symbol_table.SymbolTable`]
+
+    """
+    table = None
+    for node in path:
+        if _is_scoping_region(node):
+            table = _table(tables, node, table)
+    return table
+
+
+def _reparse_block(block, parent_table, region_lines, offset, source_reader):
+    """
+    Parses the new text of a block on its own.
+
+    :param block: the block to reparse.
+    :type block: :py:class:`fparser.two.utils.BlockBase`
+    :param parent_table: the symbol table of the scoping region that \
+        encloses the block (or None).
+    :type parent_table: Optional[:py:class:`fparser.two.symbol_table.SymbolTable`]
+    :param List[str] region_lines: the new text of the block.
+    :param int offset: the number of lines before the block.
+    :param source_reader: the reader from which the tree was parsed.
+    :type source_reader: :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+    :returns: the new block and the symbol table into which any symbol \
+        tables of the new block have been placed, or None if the new text \
+        is not a valid block of the same class.
+    :rtype: Optional[Tuple[:py:class:`fparser.two.utils.BlockBase`, \
+        :py:class:`fparser.two.symbol_table.SymbolTable`]]
+
+    """
+    reader = FortranStringReader(
+        "\n".join(region_lines),
+        include_dirs=source_reader.include_dirs,
+        ignore_comments=source_reader.ignore_comments,
+        include_omp_conditional_lines=source_reader.include_omp_conditional_lines,
+    )
+    reader.set_format(source_reader.format)
+    reader.exit_on_error = source_reader.exit_on_error
+    # Any symbols and symbol tables that are created while parsing go into
+    # this scratch table (which is not added to its parent) so that nothing
+    # is changed if the block is rejected.
+    scratch = SymbolTable("fparser2:reparse", parent=parent_table)
+    with active_symbol_tables().scope(scratch):
+        try:
+            new_block = type(block)(reader)
+        except (NoMatchError, FortranSyntaxError):
+            return None
+        if not isinstance(new_block, type(block)) or not scratch.is_empty:
+            return None
+        try:
+            reader.next()
+        except StopIteration:
+            pass
+        else:
+            # Not all of the text is part of the block.
+            return None
+    stack = [new_block]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BlockBase):
+            if node.string is reader:
+                node.string = source_reader
+            stack.extend(node.content)
+    for item in _items([new_block]):
+        if item.reader is reader:
+            item.reader = source_reader
+            item.span = (item.span[0] + offset, item.span[1] + offset)
+    return new_block, scratch
+
+
+def reparse(tree, old_source, new_source, first, last):
+    """
+    Updates a parse tree after lines `first` to `last` of the source code
+    from which it was parsed have been replaced. The smallest block of
+    code that encloses these lines is parsed again and replaces the
+    corresponding part of the tree, together with the affected symbol
+    tables. The tree must have been parsed in (and this must be called
+    in) the same context, e.g.:
+
+    >>> tree = parser(FortranStringReader(old_source, ignore_comments=False))
+    >>> tree = reparse(tree, old_source, new_source, 10, 12)
+
+    :param tree: the tree to update.
+    :type tree: :py:class:`fparser.two.Fortran2003.Program`
+    :param str old_source: the code from which the tree was parsed.
+    :param str new_source: the edited code.
+    :param int first: the first line (counting from 1) of the old code \
+        that has been changed.
+    :param int last: the last line of the old code that has been changed. \
+        For an insertion of lines before line `first`, this is `first - 1`.
+
+    :returns: the updated tree. This is the supplied tree unless all of \
+        the code had to be parsed again.
+    :rtype: :py:class:`fparser.two.Fortran2003.Program`
+
+    :raises ValueError: if the edited lines are not within the old code \
+        or if the code outside of them has also changed.
+    :raises FortranSyntaxError: if the edited code is not valid Fortran.
+
+    """
+    old_lines = old_source.splitlines()
+    new_lines = new_source.splitlines()
+    delta = len(new_lines) - len(old_lines)
+    if not 1 <= first <= last + 1 <= len(old_lines) + 1 or last + delta < first - 1:
+        raise ValueError(
+            f"Lines {first} to {last} are not a valid range of the "
+            f"{len(old_lines)} lines of the old code that have been edited."
+        )
+    if (
+        old_lines[: first - 1] != new_lines[: first - 1]
+        or old_lines[last:] != new_lines[last + delta :]
+    ):
+        raise ValueError(
+            f"The code outside of lines {first} to {last} has also been edited."
+        )
+    # The lines either side of an insertion must both be in the block.
+    low, high = (first, last) if first <= last else (last, first)
+
+    # Find the blocks that enclose the edit, from the outermost inwards.
+    path = [tree]
+    node = tree
+    while True:
+        for child in node.content:
+            if isinstance(child, BlockBase):
+                span = _span(child)
+                if span and span[0] <= low and high <= span[1]:
+                    path.append(child)
+                    node = child
+                    break
+        else:
+            break
+
+    tables = active_symbol_tables()
+    # The reader from which the tree was parsed.
+    source_reader = tree.string
+    while len(path) > 1:
+        block = path.pop()
+        regions, declares = _scoping_regions(block)
+        if declares:
+            # The symbols declared in the enclosing scoping region would
+            # change.
+            continue
+        start, end = _span(block)
+        try:
+            parent_table = _enclosing_table(tables, path)
+            old_tables = [_table(tables, region, parent_table) for region in regions]
+        except KeyError:
+            # The symbol tables do not match the tree (e.g. they have been
+            # cleared) so they cannot be updated.
+            continue
+        result = _reparse_block(
+            block,
+            parent_table,
+            new_lines[start - 1 : end + delta],
+            start - 1,
+            source_reader,
+        )
+        if result is None:
+            continue
+        new_block, scratch = result
+        tables.replace_tables(old_tables, list(scratch.children), parent_table)
+        if delta:
+            # Move the nodes that follow the block.
+            following = []
+            for parent, child in zip(path, path[1:] + [block]):
+                idx = next(i for i, node in enumerate(parent.content) if node is child)
+                following.extend(parent.content[idx + 1 :])
+            for item in _items(following):
+                if item.reader is source_reader:
+                    item.span = (item.span[0] + delta, item.span[1] + delta)
+        parent = path[-1]
+        for idx, child in enumerate(parent.content):
+            if child is block:
+                parent.content[idx] = new_block
+                break
+        new_block.parent = parent
+        return tree
+
+    # Parse all of the code again.
+    regions, _ = _scoping_regions(tree)
+    old_tables = []
+    for region in regions:
+        try:
+            old_tables.append(_table(tables, region, None))
+        except KeyError:
+            pass
+    reader = FortranStringReader(
+        new_source,
+        include_dirs=source_reader.include_dirs,
+        ignore_comments=source_reader.ignore_comments,
+        include_omp_conditional_lines=source_reader.include_omp_conditional_lines,
+    )
+    reader.set_format(source_reader.format)
+    reader.exit_on_error = source_reader.exit_on_error
+    scratch = SymbolTable("fparser2:reparse")
+    with tables.scope(scratch):
+        new_tree = type(tree)(reader)
+    tables.replace_tables(old_tables, list(scratch.children))
+    return new_tree
@@ -34,11 +34,15 @@
 
 """
 The fparser2 symbol-table module. Defines various classes as well as
-the single, global SYMBOL_TABLES instance. The latter is a container
-for all of the top-level scoping units encountered during parsing.
+the global SYMBOL_TABLES instance. The latter is a container for all
+of the top-level scoping units encountered during parsing, unless the
+parse is performed within a :py:class:`fparser.two.parser.ParseContext`
+which has its own container.
 
 """
+import contextvars
 from collections import namedtuple
+from contextlib import contextmanager
 
 
 class SymbolTableError(Exception):
@@ -69,6 +73,16 @@ class SymbolTables:
         )
         return result + "\n".join(sorted(self._symbol_tables.keys()))
 
+    @property
+    def checks_enabled(self):
+        """
+        :returns: whether or not consistency checks are enabled in the \
+            symbol tables that are created.
+        :rtype: bool
+
+        """
+        return self._enable_checks
+
     def enable_checks(self, value):
         """
         Sets whether or not to enable consistency checks in every symbol
@@ -125,6 +139,77 @@ class SymbolTables:
         """
         return self._symbol_tables[name.lower()]
 
+    @property
+    def tables(self):
+        """
+        :returns: the top-level (un-nested) symbol tables.
+        :rtype: List[:py:class:`fparser.two.symbol_table.SymbolTable`]
+        """
+        return list(self._symbol_tables.values())
+
+    def replace_tables(self, old_tables, new_tables, parent=None):
+        """
+        Replaces symbol tables (e.g. those of scoping regions that have been
+        reparsed). The new tables take the place of the first of the old
+        tables or, if there are no old tables, are added at the end.
+
+        :param old_tables: the tables to remove. These must be children of \
+            `parent` or, if that is None, top-level tables.
+        :type old_tables: List[:py:class:`fparser.two.symbol_table.SymbolTable`]
+        :param new_tables: the tables to add in their place.
+        :type new_tables: List[:py:class:`fparser.two.symbol_table.SymbolTable`]
+        :param parent: the table containing the tables or None for the \
+            top-level tables.
+        :type parent: Optional[:py:class:`fparser.two.symbol_table.SymbolTable`]
+
+        :raises SymbolTableError: if any of the old tables is not a child of \
+            the supplied parent (or a top-level table).
+
+        """
+        if parent is None:
+            tables = list(self._symbol_tables.values())
+        else:
+            tables = parent.children
+        positions = []
+        for table in old_tables:
+            for idx, existing in enumerate(tables):
+                if existing is table:
+                    positions.append(idx)
+                    break
+            else:
+                raise SymbolTableError(
+                    f"Symbol table '{table.name}' is not a child of "
+                    f"'{parent.name if parent else 'the top level'}'."
+                )
+        position = min(positions) if positions else len(tables)
+        remaining = [table for idx, table in enumerate(tables) if idx not in positions]
+        remaining[position:position] = new_tables
+        for table in new_tables:
+            table.parent = parent
+        if parent is None:
+            self._symbol_tables = {table.name: table for table in remaining}
+        else:
+            tables[:] = remaining
+
+    @contextmanager
+    def scope(self, table):
+        """
+        Context manager that makes the supplied (existing) symbol table the
+        current scope, e.g. so that code within a scoping region can be
+        parsed on its own.
+
+        :param table: the table to make the current scope or None for no \
+            scope.
+        :type table: Optional[:py:class:`fparser.two.symbol_table.SymbolTable`]
+
+        """
+        previous = self._current_scope
+        self._current_scope = table
+        try:
+            yield table
+        finally:
+            self._current_scope = previous
+
     @property
     def current_scope(self):
         """
@@ -498,6 +583,8 @@ class SymbolTable:
     # and visibility). We may need a distinct Symbol class so as to provide
     # type checking for the various properties.
     Symbol = namedtuple("Symbol", "name primitive_type")
+    # So that symbols can be pickled (e.g. by the parse cache).
+    Symbol.__qualname__ = "SymbolTable.Symbol"
 
     def __init__(self, name, parent=None, checking_enabled=False, node=None):
         self._name = name.lower()
@@ -646,6 +733,15 @@ class SymbolTable:
             return self.parent.lookup(lname)
         raise KeyError(f"Failed to find symbol named '{lname}'")
 
+    @property
+    def is_empty(self):
+        """
+        :returns: True if this table contains no symbols and no uses of \
+            modules (it may still have children).
+        :rtype: bool
+        """
+        return not self._data_symbols and not self._modules
+
     @property
     def name(self):
         """
@@ -790,9 +886,36 @@ class SymbolTable:
         return True
 
 
-#: The single, global container for all symbol tables constructed while
-#: parsing.
+#: The global container for all symbol tables constructed while parsing
+#: (unless a :py:class:`fparser.two.parser.ParseContext` is active).
 SYMBOL_TABLES = SymbolTables()
 
+# The symbol tables of the parse context that is active in the current
+# context (thread or asyncio task). If this is None then SYMBOL_TABLES is
+# used.
+_ACTIVE_SYMBOL_TABLES = contextvars.ContextVar(
+    "fparser_active_symbol_tables", default=None
+)
 
-__all__ = ["SymbolTableError", "SymbolTables", "SymbolTable", "SYMBOL_TABLES"]
+
+def active_symbol_tables():
+    """
+    :returns: the container for the symbol tables constructed while \
+        parsing in the current context. This is SYMBOL_TABLES unless a \
+        :py:class:`fparser.two.parser.ParseContext` is active.
+    :rtype: :py:class:`fparser.two.symbol_table.SymbolTables`
+
+    """
+    tables = _ACTIVE_SYMBOL_TABLES.get()
+    if tables is None:
+        return SYMBOL_TABLES
+    return tables
+
+
+__all__ = [
+    "SymbolTableError",
+    "SymbolTables",
+    "SymbolTable",
+    "SYMBOL_TABLES",
+    "active_symbol_tables",
+]
@@ -0,0 +1,157 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""Module containing tests for the fparser.two.batch module."""
+
+import tarfile
+
+import pytest
+
+from fparser.common.archive import ArchiveMember, FortranArchive
+from fparser.two import Fortran2003
+from fparser.two.batch import FileResult, parse_files
+from fparser.two.utils import InternalError
+
+
+@pytest.fixture(name="fortran_files")
+def fixture_fortran_files(tmp_path):
+    """
+    :returns: the names of some Fortran files (and of a file that does \
+        not exist), one of which contains a syntax error.
+    :rtype: List[str]
+
+    """
+    sources = {
+        "hello.f90": "program hello\nend program hello\n",
+        "broken.f90": "prog hello\nen\n",
+        "mod.f90": (
+            "module mod\ncontains\n  subroutine sub(x)\n    real :: x\n"
+            "    x = 2.0 * x\n  end subroutine sub\nend module mod\n"
+        ),
+        "coarray.f90": "program p\n  real, codimension[*] :: a\nend program p\n",
+    }
+    filenames = []
+    for name, source in sources.items():
+        path = tmp_path / name
+        path.write_text(source)
+        filenames.append(str(path))
+    filenames.insert(2, str(tmp_path / "missing.f90"))
+    return filenames
+
+
+def test_parse_files_in_process(fortran_files):
+    """Test that files are parsed in order, with errors reported per file,
+    when a single job is requested."""
+    results = list(parse_files(fortran_files, jobs=1))
+    assert [result.filename for result in results] == fortran_files
+    assert all(isinstance(result, FileResult) for result in results)
+    hello, broken, missing, mod, coarray = results
+    assert isinstance(hello.result, Fortran2003.Program)
+    assert hello.error is None
+    assert str(hello.result) == "PROGRAM hello\nEND PROGRAM hello"
+    assert broken.result is None
+    assert broken.error.startswith("Syntax error: at line 1\n>>>prog hello")
+    assert missing.result is None
+    assert "No such file or directory" in missing.error
+    assert "SUBROUTINE sub(x)" in str(mod.result)
+    # Coarrays are not supported by the default (Fortran2003) standard.
+    assert coarray.error.startswith("Syntax error")
+    coarray = list(parse_files(fortran_files[-1:], std="f2008"))[0]
+    assert "CODIMENSION [*]" in str(coarray.result)
+
+
+def test_parse_files_pool(fortran_files):
+    """Test that the results obtained using a pool of processes (with and
+    without a reduce function) are the same as those obtained in
+    process."""
+    expected = list(parse_files(fortran_files, jobs=1, std="f2008", reduce=repr))
+    results = list(parse_files(fortran_files, jobs=2, std="f2008", reduce=repr))
+    assert results == expected
+    assert results[0].result.startswith("Program(")
+    # The trees themselves can be sent back.
+    trees = list(parse_files(fortran_files, jobs=3, std="f2008"))
+    assert [tree.error for tree in trees] == [item.error for item in expected]
+    assert [repr(tree.result) for tree in trees if tree.error is None] == [
+        item.result for item in expected if item.error is None
+    ]
+
+
+def test_parse_files_internal_error(fortran_files, monkeypatch):
+    """Test that an internal error in fparser is reported for the file."""
+
+    def _raise(_self, _reader):
+        raise InternalError("oops")
+
+    monkeypatch.setattr("fparser.two.parser.ParseContext.parse", _raise)
+    result = list(parse_files(fortran_files[:1], jobs=4))[0]
+    assert result.result is None
+    assert result.error == (
+        "Internal error in fparser: 'oops'. Please report this to the authors."
+    )
+
+
+def test_parse_files_invalid():
+    """Test that invalid arguments are rejected straight away."""
+    with pytest.raises(ValueError) as excinfo:
+        parse_files(["a.f90"], jobs=0)
+    assert "number of jobs must be at least 1 but got 0" in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        parse_files(["a.f90"], std="f77")
+    assert "'f77' is an invalid standard" in str(excinfo.value)
+    assert not list(parse_files([], jobs=4))
+
+
+def test_parse_files_archive(fortran_files, tmp_path):
+    """Test that files in an archive are parsed, with the same results as
+    the files themselves, both in process and by a pool of processes."""
+    path = str(tmp_path / "release.tar.gz")
+    with tarfile.open(path, "w:gz") as archive:
+        for filename in fortran_files:
+            if not filename.endswith("missing.f90"):
+                archive.add(filename, arcname=filename.rsplit("/", 1)[1])
+    with FortranArchive(path) as archive:
+        members = archive.members()
+    members.insert(2, ArchiveMember(path, "missing.f90"))
+    members.append(ArchiveMember(str(tmp_path / "missing.zip"), "x.f90"))
+    expected = list(parse_files(fortran_files, jobs=1, reduce=repr))
+    for jobs in [1, 2]:
+        results = list(parse_files(members, jobs=jobs, reduce=repr))
+        assert [result.filename for result in results] == members
+        assert [result.result for result in results[:-1]] == [
+            result.result for result in expected
+        ]
+        assert results[1].error.startswith("Syntax error: at line 1\n>>>prog hello")
+        assert "There is no file 'missing.f90' in archive" in results[2].error
+        assert "No such file or directory" in results[-1].error
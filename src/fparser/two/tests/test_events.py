@@ -0,0 +1,185 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""Module containing tests for the event-based parsing of Fortran code
+(fparser.two.events)."""
+
+import pytest
+
+from fparser.common.readfortran import FortranStringReader
+from fparser.two.events import ENTER, EXIT, STATEMENT, iter_events
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.utils import BlockBase, FortranSyntaxError, walk
+
+_SOURCE = """! Header
+module my_mod
+  integer :: a
+contains
+  subroutine my_sub(x)
+    real :: x
+    integer :: i
+    ! Loop
+    do i = 1, 3
+      if (x > 0) then
+        x = x + 1
+      else
+        x = 0
+      end if
+    end do
+    do 20 i = 1, 2
+      x = 3
+20  x = 4
+  end subroutine my_sub
+end module my_mod
+x = 1
+end
+"""
+
+
+def _events(source, parser=None):
+    """
+    :param str source: the Fortran code.
+    :param parser: the parser to use.
+    :type parser: Optional[:py:class:`fparser.two.parser.Parser`]
+
+    :returns: the kind, depth, construct name and text of each event.
+    :rtype: List[Tuple[str, int, Optional[str], str]]
+
+    """
+    reader = FortranStringReader(source, ignore_comments=False)
+    return [
+        (
+            event.kind,
+            event.depth,
+            event.construct.__name__ if event.construct else None,
+            str(event.node) if event.node is not None else None,
+        )
+        for event in iter_events(reader, parser or Parser("f2008"))
+    ]
+
+
+def test_iter_events():
+    """Test that iter_events produces the expected events, with the
+    comments before a construct being part of the enclosing block and
+    the groupings of statements that are not constructs not producing
+    events."""
+    assert _events(_SOURCE) == [
+        (STATEMENT, 0, None, "! Header"),
+        (ENTER, 0, "Module", "MODULE my_mod"),
+        (STATEMENT, 1, None, "INTEGER :: a"),
+        (STATEMENT, 1, None, "CONTAINS"),
+        (ENTER, 1, "Subroutine_Subprogram", "SUBROUTINE my_sub(x)"),
+        (STATEMENT, 2, None, "REAL :: x"),
+        (STATEMENT, 2, None, "INTEGER :: i"),
+        (STATEMENT, 2, None, "! Loop"),
+        (ENTER, 2, "Block_Nonlabel_Do_Construct", "DO i = 1, 3"),
+        (ENTER, 3, "If_Construct", "IF (x > 0) THEN"),
+        (STATEMENT, 4, None, "x = x + 1"),
+        (STATEMENT, 4, None, "ELSE"),
+        (STATEMENT, 4, None, "x = 0"),
+        (EXIT, 3, "If_Construct", "END IF"),
+        (EXIT, 2, "Block_Nonlabel_Do_Construct", "END DO"),
+        (ENTER, 2, "Action_Term_Do_Construct", "DO 20 i = 1, 2"),
+        (STATEMENT, 3, None, "x = 3"),
+        (STATEMENT, 3, None, "x = 4"),
+        (EXIT, 2, "Action_Term_Do_Construct", None),
+        (EXIT, 1, "Subroutine_Subprogram", "END SUBROUTINE my_sub"),
+        (EXIT, 0, "Module", "END MODULE my_mod"),
+        # A main program without a program statement.
+        (ENTER, 0, "Main_Program0", None),
+        (STATEMENT, 1, None, "x = 1"),
+        (EXIT, 0, "Main_Program0", "END"),
+    ]
+    assert not _events("")
+
+
+@pytest.mark.parametrize(
+    "last, construct",
+    [("x = i", "Action_Term_Do_Construct"), ("CONTINUE", "Block_Label_Do_Construct")],
+)
+def test_iter_events_label_do(last, construct):
+    """Test that the labelled statement that terminates a loop produces a
+    statement event and that the exit event of the loop has no
+    statement."""
+    source = f"do 10 i = 1, 3\n10 {last}\nend\n"
+    assert _events(source) == [
+        (ENTER, 0, "Main_Program0", None),
+        (ENTER, 1, construct, "DO 10 i = 1, 3"),
+        (STATEMENT, 2, None, last),
+        (EXIT, 1, construct, None),
+        (EXIT, 0, "Main_Program0", "END"),
+    ]
+
+
+def test_iter_events_statements():
+    """Test that the statements of the events are those of the parse tree
+    and that the content of the constructs is not kept."""
+    # Program only accepts a main program without a program statement if
+    # it is the only program unit.
+    source = _SOURCE[: _SOURCE.index("x = 1")]
+    parser = Parser("f2008")
+    tree = ParseContext(parser).parse(
+        FortranStringReader(source, ignore_comments=False)
+    )
+    expected = [
+        str(node)
+        for block in walk(tree, BlockBase)
+        for node in block.content
+        if not isinstance(node, BlockBase)
+    ]
+    statements = []
+    for event in iter_events(
+        FortranStringReader(source, ignore_comments=False), parser
+    ):
+        if event.node is not None:
+            statements.append(event.node)
+            if event.node.parent is not None:
+                assert event.node.parent.content == []
+    assert len(statements) == 20
+    assert sorted(map(str, statements)) == sorted(expected)
+
+
+def test_iter_events_error():
+    """Test that the events before a syntax error are produced and that
+    the error is then raised."""
+    reader = FortranStringReader(
+        "module my_mod\nend module my_mod\nsubroutine my_sub(\nend\n"
+    )
+    events = iter_events(reader, Parser())
+    assert str(next(events).node) == "MODULE my_mod"
+    assert next(events).kind == EXIT
+    with pytest.raises(FortranSyntaxError) as err:
+        next(events)
+    assert "at line 3" in str(err.value)
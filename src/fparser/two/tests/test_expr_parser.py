@@ -0,0 +1,201 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+"""Module containing tests for the precedence-climbing expression parser
+of fparser2."""
+
+import pytest
+from fparser.two import Fortran2003
+from fparser.two.expr_parser import ExprParser
+from fparser.two.parser import Parser
+from fparser.two.utils import Base, NoMatchError, walk
+
+
+def _match(cls, string, engine):
+    """Match the string with the supplied class with or without the
+    precedence-climbing parser.
+
+    :returns: the repr of the matched node, the text and parent of \
+        every node in the tree, or None if there is no match.
+    :rtype: (str, list of (str, str, type)) or NoneType
+
+    """
+    try:
+        with Parser(precedence_climbing=engine, keep_source=True):
+            obj = cls(string)
+    except NoMatchError:
+        return None
+    return (
+        repr(obj),
+        [
+            (type(node).__name__, node.string, type(node.parent))
+            for node in walk(obj, Base)
+        ],
+    )
+
+
+@pytest.mark.usefixtures("f2003_create")
+@pytest.mark.parametrize(
+    "string",
+    [
+        "a + b * c",
+        "-a ** b ** c + d",
+        "a - b - c + d",
+        "a * b / c * d",
+        "-( a+b ) * c",
+        "a // b // c == d",
+        "a .and. .not. b < 2 .or. c .eqv. d .neqv. e",
+        "x .and. -y > 0",
+        ".not. a .and. b",
+        "a < -b",
+        "'a+b' // c(i+1, j)",
+        "1.0e-5 * x + 2.0_wp",
+        "a. AND .b",
+        "a**-b",
+        "a + -b",
+        "- -a",
+        "a < b < c",
+        "a .myop. b",
+        "a .myop. b .eq. c",
+        ".myop. a * b",
+        " -a",
+        "a = b",
+        "a => b",
+        "a / / b",
+        "F2PY_EXPR_TUPLE_1 + a",
+    ],
+)
+@pytest.mark.parametrize(
+    "cls",
+    [
+        Fortran2003.Expr,
+        Fortran2003.Level_5_Expr,
+        Fortran2003.Equiv_Operand,
+        Fortran2003.Or_Operand,
+        Fortran2003.And_Operand,
+        Fortran2003.Level_4_Expr,
+        Fortran2003.Level_3_Expr,
+        Fortran2003.Level_2_Expr,
+        Fortran2003.Level_2_Unary_Expr,
+        Fortran2003.Add_Operand,
+        Fortran2003.Mult_Operand,
+    ],
+)
+def test_same_tree(cls, string):
+    """Test that the precedence-climbing parser gives exactly the same
+    result as the recursive rules, including for expressions that it
+    declines to parse itself.
+
+    """
+    assert _match(cls, string, True) == _match(cls, string, False)
+
+
+@pytest.mark.usefixtures("f2003_create")
+@pytest.mark.parametrize(
+    "string",
+    [
+        "a",
+        "a + -b",
+        "a < b < c",
+        "a .myop. b",
+        ".myop. a",
+        " -a",
+        "a = b",
+        "a + b(",
+        "F2PY_EXPR_TUPLE_1 + a",
+    ],
+)
+def test_declined(string):
+    """Test that the parser declines expressions that it cannot be sure to
+    parse in the same way as the recursive rules, and that it remembers
+    the last one that it declined.
+
+    """
+    parser = ExprParser()
+    assert parser.parse(Fortran2003.Expr, string) is None
+    assert parser._declined == string
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_entry_level():
+    """Test that the parser only accepts the operators allowed by the
+    class that is being matched."""
+    parser = ExprParser()
+    assert isinstance(
+        parser.parse(Fortran2003.Add_Operand, "a * b"), Fortran2003.Add_Operand
+    )
+    assert parser.parse(Fortran2003.Add_Operand, "a + b") is None
+    assert parser.parse(Fortran2003.Add_Operand, "-a") is None
+    node = parser.parse(Fortran2003.Level_2_Unary_Expr, "-a * b")
+    assert isinstance(node, Fortran2003.Level_2_Unary_Expr)
+    assert parser.parse(Fortran2003.Level_2_Unary_Expr, "-a + b") is None
+    assert isinstance(
+        parser.parse(Fortran2003.And_Operand, ".not. a == b"),
+        Fortran2003.And_Operand,
+    )
+    assert parser.parse(Fortran2003.And_Operand, ".not. a .and. b") is None
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_long_expression():
+    """Test that a sum of 1000 terms can be parsed (the recursive rules
+    exceed the recursion limit) and output."""
+    terms = [f"c{idx} * x(i, {idx})" for idx in range(1000)]
+    with Parser(precedence_climbing=True):
+        expr = Fortran2003.Expr(" + ".join(terms))
+    assert isinstance(expr, Fortran2003.Level_2_Expr)
+    assert str(expr) == " + ".join(terms)
+    assert repr(expr).startswith("Level_2_Expr(" * 999 + "Add_Operand(Name('c0')")
+    node = expr
+    for idx in range(999, 0, -1):
+        assert node.items[1] == "+"
+        assert str(node.items[2]) == f"c{idx} * x(i, {idx})"
+        assert node.items[2].parent is node
+        node = node.items[0]
+    assert str(node) == "c0 * x(i, 0)"
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_expr_parser_match():
+    """Test that the match methods of the expression classes return the node
+    built by the expression parser when precedence climbing is enabled and
+    the tuple of the recursive matcher otherwise."""
+    assert Fortran2003.Level_2_Expr.match.__name__ == "match"
+    with Parser():
+        result = Fortran2003.Level_2_Expr.match("a + b")
+    assert isinstance(result, tuple)
+    with Parser(precedence_climbing=True):
+        node = Fortran2003.Level_2_Expr.match("a + b")
+    assert isinstance(node, Fortran2003.Level_2_Expr)
+    assert node.items == result
@@ -31,13 +31,32 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-""" Module containing tests for the parser file """
+"""Module containing tests for the parser file"""
 
+import os
 import pytest
-from fparser.two.parser import ParserFactory
+import threading
+import zipfile
+from fparser.two.parser import (
+    Parser,
+    ParseContext,
+    ParserFactory,
+    iter_program_units,
+    parse_many,
+)
+from fparser.common.archive import ArchiveMember
 from fparser.common.readfortran import FortranStringReader
-from fparser.two.utils import FortranSyntaxError, StmtBase
-from fparser.two.symbol_table import SYMBOL_TABLES
+from fparser.common.splitline import string_replace_map
+from fparser.two.utils import (
+    FortranSyntaxError,
+    NoMatchError,
+    ParseMemo,
+    StmtBase,
+    active_rules,
+    walk,
+)
+from fparser.two.expr_parser import ExprParser
+from fparser.two.symbol_table import SYMBOL_TABLES, active_symbol_tables
 from fparser.two import Fortran2003, Fortran2008
 
 
@@ -86,6 +105,399 @@ def test_parserfactory_std():
         assert "is an invalid standard" in str(excinfo.value)
 
 
+def test_parserfactory_keyword_index():
+    """Test that the ParserFactory sets up the leading-keyword index for
+    the chosen standard.
+
+    """
+    ParserFactory().create(std="f2003")
+    index = Fortran2003.Base.keyword_index
+    assert index is not None
+    assert index.keywords(Fortran2003.Stop_Stmt) == frozenset(["STOP"])
+    assert index.keywords(Fortran2003.Action_Stmt) is None
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.keyword_index is not index
+    index = Fortran2003.Base.keyword_index
+    assert index.keywords(Fortran2008.Error_Stop_Stmt) == frozenset(["ERROR"])
+    assert index.keywords(Fortran2008.Block_Construct) == frozenset(["BLOCK"])
+    assert index.keywords(Fortran2008.Critical_Construct) == frozenset(["CRITICAL"])
+
+
+def test_parserfactory_memoize():
+    """Test that the ParserFactory only enables the cache of match results
+    when requested and that a new cache is created for each parser.
+
+    """
+    ParserFactory().create(std="f2003")
+    assert Fortran2003.Base.parse_memo is None
+    ParserFactory().create(std="f2008", memoize=True)
+    memo = Fortran2003.Base.parse_memo
+    assert isinstance(memo, ParseMemo)
+    ParserFactory().create(std="f2008", memoize=True)
+    assert Fortran2003.Base.parse_memo is not memo
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.parse_memo is None
+
+
+def test_parserfactory_precedence_climbing():
+    """Test that the ParserFactory only enables the precedence-climbing
+    expression parser when requested and that the same parse tree is
+    produced either way.
+
+    """
+    code = "subroutine s\n  x = -a + b * c ** 2 // d\nend subroutine s\n"
+    parser = ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.expr_parser is None
+    expected = repr(parser(FortranStringReader(code)))
+    parser = ParserFactory().create(std="f2008", precedence_climbing=True)
+    assert isinstance(Fortran2003.Base.expr_parser, ExprParser)
+    assert repr(parser(FortranStringReader(code))) == expected
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.expr_parser is None
+
+
+def test_parserfactory_subclass_dispatch():
+    """Test that the rule table of the parser compiles the tuple of
+    subclasses to try for every class, including those that have been
+    extended by a later standard, and that each standard has its own
+    tables.
+
+    """
+    ParserFactory().create(std="f2003")
+    rules = Fortran2003.Base.rules
+    dispatch = rules.subclass_dispatch(Fortran2003.Attr_Spec)
+    assert isinstance(dispatch, tuple)
+    assert rules.dispatch[Fortran2003.Attr_Spec] is dispatch
+    assert Fortran2003.Access_Spec in dispatch
+    assert Fortran2008.Codimension_Attr_Spec not in dispatch
+    # Classes without subclasses have an empty table.
+    assert rules.subclass_dispatch(Fortran2003.Name) == ()
+    ParserFactory().create(std="f2008")
+    rules = Fortran2003.Base.rules
+    assert Fortran2008.Codimension_Attr_Spec in rules.subclass_dispatch(
+        Fortran2008.Attr_Spec
+    )
+    # The Fortran2003 class tries the same subclasses as the class that
+    # extends it.
+    assert rules.subclass_dispatch(Fortran2003.Attr_Spec) == rules.subclass_dispatch(
+        Fortran2008.Attr_Spec
+    )
+
+    # A class that is created after the parser has been set up gets its own
+    # table on first use.
+    class Fred(Fortran2003.Action_Stmt):
+        """A class that is not known to the parser."""
+
+    assert Fred not in rules.dispatch
+    with pytest.raises(NoMatchError):
+        Fred("stop")
+    assert rules.dispatch[Fred] == ()
+
+
+def test_parser_objects():
+    """Test that Parser objects for different standards can be held and
+    used alternately in the same process, that each owns its rule table and
+    that the default parser is restored once they are done.
+
+    """
+    ParserFactory().create(std="f2003")
+    default_rules = Fortran2003.Base.rules
+    f2003_parser = Parser()
+    f2008_parser = Parser("f2008", memoize=True, precedence_climbing=True)
+    assert f2003_parser.std == "f2003"
+    assert f2003_parser.rules is not default_rules
+    assert f2003_parser.rules.parse_memo is None
+    assert isinstance(f2008_parser.rules.parse_memo, ParseMemo)
+    assert isinstance(f2008_parser.rules.expr_parser, ExprParser)
+    code = "program p\n  real, codimension[*] :: a\n  a = 1.0 + a\nend program p\n"
+    for _ in range(2):
+        assert str(f2008_parser(FortranStringReader(code))) == (
+            "PROGRAM p\n  REAL, CODIMENSION [*] :: a\n  a = 1.0 + a\nEND PROGRAM p"
+        )
+        assert active_rules() is default_rules
+        with pytest.raises(FortranSyntaxError):
+            f2003_parser(FortranStringReader(code))
+        assert active_rules() is default_rules
+    # Classes may also be matched directly with a parser active, including
+    # when activations are nested.
+    with f2008_parser:
+        assert active_rules() is f2008_parser.rules
+        assert str(Fortran2003.Attr_Spec("codimension [*]")) == "CODIMENSION [*]"
+        with f2003_parser:
+            with pytest.raises(NoMatchError):
+                Fortran2003.Attr_Spec("codimension [*]")
+        assert active_rules() is f2008_parser.rules
+    assert active_rules() is default_rules
+    with pytest.raises(NoMatchError):
+        Fortran2003.Attr_Spec("codimension [*]")
+    # Both parsers share the (cached) hierarchy of their standard with the
+    # parsers created by the ParserFactory.
+    assert f2003_parser.rules.subclasses is default_rules.subclasses
+    assert f2003_parser.rules.dispatch is default_rules.dispatch
+
+    with pytest.raises(ValueError) as excinfo:
+        Parser("invalid")
+    assert "'invalid' is an invalid standard" in str(excinfo.value)
+
+
+def test_parser_make_default():
+    """Test that the ParserFactory makes the parser that it creates the
+    default one and keeps the attributes of Base that mirror it up to
+    date."""
+    ParserFactory().create(std="f2008", memoize=True)
+    parser = ParserFactory.default_parser
+    assert parser.std == "f2008"
+    assert Fortran2003.Base.rules is parser.rules
+    assert Fortran2003.Base.subclasses is parser.rules.subclasses
+    assert Fortran2003.Base.keyword_index is parser.rules.keyword_index
+    assert Fortran2003.Base.parse_memo is parser.rules.parse_memo
+    assert Fortran2003.Base.expr_parser is None
+    f2003_parser = Parser("f2003")
+    f2003_parser.make_default()
+    assert ParserFactory.default_parser is f2003_parser
+    assert Fortran2003.Base.parse_memo is None
+    with pytest.raises(NoMatchError):
+        Fortran2003.Attr_Spec("codimension [*]")
+
+
+def test_parse_context():
+    """Test that a ParseContext has its own symbol tables, cache and
+    expression parser and that it is only active in the thread that
+    activated it."""
+    ParserFactory().create(std="f2003")
+    parser = Parser("f2008", memoize=True, precedence_climbing=True)
+    context = ParseContext(parser)
+    assert context.parser is parser
+    assert context.rules.subclasses is parser.rules.subclasses
+    assert context.rules.dispatch is parser.rules.dispatch
+    assert isinstance(context.rules.parse_memo, ParseMemo)
+    assert context.rules.parse_memo is not parser.rules.parse_memo
+    assert isinstance(context.rules.expr_parser, ExprParser)
+    assert context.rules.expr_parser is not parser.rules.expr_parser
+    code = "module my_mod\n  real, codimension[*] :: a\nend module my_mod\n"
+    ast = context.parse(FortranStringReader(code))
+    assert "CODIMENSION [*]" in str(ast)
+    assert context.symbol_tables.lookup("my_mod")
+    assert "my_mod" not in SYMBOL_TABLES._symbol_tables
+    assert active_rules() is Fortran2003.Base.rules
+    assert active_symbol_tables() is SYMBOL_TABLES
+
+    # The default parser is used if none is supplied.
+    assert ParseContext().parser is ParserFactory.default_parser
+
+    # Consistency checks are enabled if they are in the active tables.
+    assert not context.symbol_tables.checks_enabled
+    SYMBOL_TABLES.enable_checks(True)
+    try:
+        assert ParseContext(parser).symbol_tables.checks_enabled
+    finally:
+        SYMBOL_TABLES.enable_checks(False)
+
+    seen = []
+
+    def _check():
+        seen.append((active_rules(), active_symbol_tables()))
+
+    with context:
+        assert active_rules() is context.rules
+        assert active_symbol_tables() is context.symbol_tables
+        thread = threading.Thread(target=_check)
+        thread.start()
+        thread.join()
+    assert seen == [(Fortran2003.Base.rules, SYMBOL_TABLES)]
+    assert active_symbol_tables() is SYMBOL_TABLES
+
+
+_UNITS_SOURCE = """! Header
+module my_mod
+  integer :: a
+end module my_mod
+! Between units
+subroutine my_sub(x)
+  real :: x
+  x = 1.0
+end subroutine my_sub
+program my_prog
+  use my_mod
+end program my_prog
+! Trailer
+"""
+
+
+def test_iter_program_units():
+    """Test that ParseContext.iter_program_units yields the same nodes as
+    the children of the Program returned by parse, one program unit at a
+    time, and that the source lines and symbol tables of the program units
+    that have been yielded are discarded."""
+    parser = Parser("f2008")
+    tree = ParseContext(parser).parse(
+        FortranStringReader(_UNITS_SOURCE, ignore_comments=False)
+    )
+    context = ParseContext(parser)
+    reader = FortranStringReader(_UNITS_SOURCE, ignore_comments=False)
+    units = []
+    tables = []
+    discarded = []
+    for unit in context.iter_program_units(reader):
+        units.append(unit)
+        tables.append([table.name for table in context.symbol_tables.tables])
+        discarded.append(reader.source_lines.discarded)
+        assert unit.parent is None
+    assert [type(unit) for unit in units] == [type(child) for child in tree.children]
+    assert [str(unit) for unit in units] == [str(child) for child in tree.children]
+    assert tables == [
+        ["my_mod"],
+        ["my_mod"],
+        ["my_sub"],
+        ["my_sub"],
+        ["my_prog"],
+        [],
+    ]
+    assert discarded == [1, 1, 5, 5, 9, 9]
+    assert context.symbol_tables.tables == []
+
+    # The symbol tables of every unit may be kept.
+    context = ParseContext(parser)
+    reader = FortranStringReader(_UNITS_SOURCE)
+    units = list(context.iter_program_units(reader, keep_symbol_tables=True))
+    assert [table.name for table in context.symbol_tables.tables] == [
+        "my_mod",
+        "my_sub",
+        "my_prog",
+    ]
+    assert context.symbol_tables.lookup("my_sub").node.parent is units[1]
+
+
+def test_iter_program_units_main_program():
+    """Test that iter_program_units accepts a main program without a
+    program statement and code that contains no program units."""
+    parser = Parser()
+    reader = FortranStringReader("x = 1\nprint *, x\nend\n")
+    units = list(iter_program_units(reader, parser))
+    assert len(units) == 1
+    assert isinstance(units[0], Fortran2003.Main_Program0)
+    assert str(units[0]) == "x = 1\nPRINT *, x\nEND"
+    assert not list(iter_program_units(FortranStringReader("\n\n"), parser))
+    reader = FortranStringReader("! Just a comment\n", ignore_comments=False)
+    units = list(iter_program_units(reader, parser))
+    assert [str(unit) for unit in units] == ["! Just a comment"]
+
+
+def test_iter_program_units_error():
+    """Test that iter_program_units yields the program units before a
+    syntax error and then raises FortranSyntaxError."""
+    reader = FortranStringReader(
+        "module my_mod\nend module my_mod\nsubroutine my_sub(\nend\n"
+    )
+    units = iter_program_units(reader, Parser())
+    assert isinstance(next(units), Fortran2003.Module)
+    with pytest.raises(FortranSyntaxError) as err:
+        next(units)
+    assert "at line 3\n>>>subroutine my_sub(" in str(err.value)
+
+
+def test_string_replace_map_scope(monkeypatch):
+    """Test that the parse of a program, and of each program unit by
+    iter_program_units, is a scope of the string_replace_map cache."""
+    cache = string_replace_map.cache
+    parser = Parser("f2008")
+    ParseContext(parser).parse(FortranStringReader(_UNITS_SOURCE))
+    assert cache.size > 0
+    monkeypatch.setattr(cache, "scoped", True)
+    hits = cache.hits
+    ParseContext(parser).parse(FortranStringReader(_UNITS_SOURCE))
+    assert cache.hits > hits
+    assert cache.size == 0
+    for _ in iter_program_units(FortranStringReader(_UNITS_SOURCE), parser):
+        assert cache.size == 0
+
+
+def test_parse_many(tmp_path):
+    """Test that parse_many parses files concurrently, each with its own
+    symbol tables, and returns the trees in order."""
+    ParserFactory().create(std="f2003")
+    SYMBOL_TABLES.clear()
+    paths = []
+    for idx in range(8):
+        path = tmp_path / f"mod{idx}.f90"
+        path.write_text(
+            f"module mod{idx}\ncontains\n  subroutine sub{idx}(x)\n"
+            f"    real :: x\n    x = x + {idx}.0 * x\n  end subroutine\n"
+            f"end module mod{idx}\n"
+        )
+        paths.append(str(path))
+    trees = parse_many(paths, max_workers=4)
+    assert len(trees) == 8
+    for idx, tree in enumerate(trees):
+        assert isinstance(tree, Fortran2003.Program)
+        assert f"MODULE mod{idx}\n" in str(tree)
+        assert f"x = x + {idx}.0 * x" in str(tree)
+    # The global symbol tables are not used.
+    assert not SYMBOL_TABLES._symbol_tables
+    assert trees == parse_many(paths, max_workers=1)
+
+    # A parser for another standard may be supplied.
+    path = tmp_path / "coarray.f90"
+    path.write_text("program p\n  real, codimension[*] :: a\nend program p\n")
+    (tree,) = parse_many([str(path)], parser=Parser("f2008"))
+    assert "CODIMENSION [*]" in str(tree)
+    with pytest.raises(FortranSyntaxError):
+        parse_many([str(path)])
+
+    # Files may be in archives.
+    archive_path = str(tmp_path / "mods.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for path in paths:
+            archive.write(path, arcname=os.path.basename(path))
+    members = [ArchiveMember(archive_path, f"mod{idx}.f90") for idx in range(8)]
+    assert parse_many(members, max_workers=4) == trees
+
+
+def test_parserfactory_cache(monkeypatch):
+    """Test that the ParserFactory only builds the class hierarchy once for
+    each standard and that the cached hierarchy can be discarded.
+
+    """
+    ParserFactory.clear_cache()
+    ParserFactory().create(std="f2003")
+    f2003_subclasses = Fortran2003.Base.subclasses
+    f2003_index = Fortran2003.Base.keyword_index
+    ParserFactory().create(std="f2008")
+    f2008_subclasses = Fortran2003.Base.subclasses
+    assert f2008_subclasses is not f2003_subclasses
+
+    # The cached hierarchy is swapped back in (along with the dispatch
+    # tables) without inspecting the classes again.
+    monkeypatch.setattr(
+        "fparser.two.parser.get_module_classes",
+        lambda module: pytest.fail("hierarchy rebuilt"),
+    )
+    ParserFactory().create(std="f2003")
+    assert Fortran2003.Base.subclasses is f2003_subclasses
+    assert Fortran2003.Base.keyword_index is f2003_index
+    assert Fortran2008.Codimension_Attr_Spec not in (
+        Fortran2003.Base.rules.subclass_dispatch(Fortran2003.Attr_Spec)
+    )
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.subclasses is f2008_subclasses
+    assert Fortran2008.Codimension_Attr_Spec in (
+        Fortran2003.Base.rules.subclass_dispatch(Fortran2003.Attr_Spec)
+    )
+    monkeypatch.undo()
+
+    # Discarding the hierarchy for one standard leaves the other alone.
+    ParserFactory.clear_cache("f2003")
+    ParserFactory().create(std="f2003")
+    assert Fortran2003.Base.subclasses is not f2003_subclasses
+    assert Fortran2003.Base.subclasses == f2003_subclasses
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.subclasses is f2008_subclasses
+
+    ParserFactory.clear_cache()
+    ParserFactory().create(std="f2008")
+    assert Fortran2003.Base.subclasses is not f2008_subclasses
+
+
 def _cmp_tree_types_rec(
     node1: Fortran2003.Program, node2: Fortran2003.Program, depth: int = 0
 ):
@@ -162,6 +574,69 @@ end program awesome
 """
 
 
+@pytest.mark.parametrize("precedence_climbing", [False, True])
+def test_keep_source(precedence_climbing):
+    """Test that, by default, nodes do not keep the text that they were
+    matched from (other than those whose value it is) but that this is
+    recreated when it is requested, and that the text is kept if the
+    parser is created with keep_source=True."""
+    source = "program p\n  x = A +  2.0e0 *b\nend program p\n"
+    parser = Parser(precedence_climbing=precedence_climbing)
+    assert parser.rules.keep_source is False
+    tree = ParseContext(parser).parse(FortranStringReader(source))
+    stmt = walk(tree, Fortran2003.Assignment_Stmt)[0]
+    expr = stmt.items[2]
+    assert isinstance(expr, Fortran2003.Level_2_Expr)
+    # pylint: disable=protected-access
+    assert stmt._string is None
+    assert expr._string is None
+    assert expr.string == "A + 2.0E0 * b"
+    assert stmt.items[0].string == "x"
+    # The reader is kept by the nodes that are matched from it.
+    assert isinstance(tree.string, FortranStringReader)
+    assert str(tree) == "PROGRAM p\n  x = A + 2.0E0 * b\nEND PROGRAM p"
+
+    parser = Parser(precedence_climbing=precedence_climbing, keep_source=True)
+    context = ParseContext(parser)
+    assert context.rules.keep_source is True
+    keep_tree = context.parse(FortranStringReader(source))
+    assert keep_tree == tree
+    stmt = walk(keep_tree, Fortran2003.Assignment_Stmt)[0]
+    assert stmt.string == "x = A +  2.0e0 *b"
+    assert stmt.items[2].string == "A +  2.0e0 *b"
+    assert ParserFactory().create(keep_source=True)
+    assert ParserFactory.default_parser.rules.keep_source is True
+    ParserFactory().create()
+
+
+def test_lean_reader():
+    """Test that parsing the code of a lean reader gives the same tree and
+    error messages but that the caches of the items in the tree are
+    released."""
+    source = (
+        "module m\ncontains\n  subroutine s(a)\n    real :: a\n"
+        "    a = a + 1.0\n  end subroutine s\nend module m\ninclude 'x.inc'\n"
+    )
+    parser = Parser()
+    tree = ParseContext(parser).parse(FortranStringReader(source))
+    lean_tree = ParseContext(parser).parse(FortranStringReader(source, lean=True))
+    assert lean_tree == tree
+    items = [node.item for node in walk(tree) if getattr(node, "item", None)]
+    assert any(item.parse_cache for item in items)
+    items = [node.item for node in walk(lean_tree) if getattr(node, "item", None)]
+    assert len(items) == 8
+    assert not any(item.parse_cache for item in items)
+
+    source = "program p\n  integer :: a\n  a = \n  a = 1\nend program p\n"
+    messages = []
+    for lean in [False, True]:
+        with pytest.raises(FortranSyntaxError) as err:
+            ParseContext(parser).parse(FortranStringReader(source, lean=lean))
+        messages.append(str(err.value))
+    assert messages[0] == messages[1]
+    assert "at line 3\n>>>  a =" in messages[1]
+
+
 def test_deepcopy():
     """
     Test that we can deepcopy a parsed fparser tree.
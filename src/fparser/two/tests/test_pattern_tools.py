@@ -161,3 +161,15 @@ def test_attr_spec_pattern(pattern):
     assert abs_attr_spec.match(pattern.lower())
     assert not abs_attr_spec.match("X" + pattern)
     assert not abs_attr_spec.match(pattern + "X")
+
+
+def test_named_pattern_cached():
+    """Tests that the named form of a pattern is only created once."""
+    add_op = fparser.two.pattern_tools.add_op
+    named = add_op.named()
+    assert add_op.named() is named
+    assert named.get_compiled().match("+").group("add_op") == "+"
+    other = add_op.named("sign")
+    assert other is not named
+    assert add_op.named("sign") is other
+    assert other.get_compiled().match("-").group("sign") == "-"
@@ -0,0 +1,247 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""Module containing tests for the incremental reparsing of edited code
+(fparser.two.reparse)."""
+
+import pytest
+
+from fparser.common.readfortran import FortranStringReader
+from fparser.two import Fortran2003
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.reparse import reparse
+from fparser.two.utils import Base, FortranSyntaxError
+
+SOURCE = """\
+module my_mod
+  use other, only: q
+  real :: a
+contains
+  subroutine sub1(x)
+    real :: x
+    integer :: i
+    ! A comment
+    do i = 1, 10
+      x = x + 1.0
+    end do
+  end subroutine sub1
+  subroutine sub2(y)
+    real :: y
+    y = 2.0
+  end subroutine sub2
+end module my_mod
+"""
+
+LINES = SOURCE.splitlines(True)
+
+
+def _edit(first, last, new_lines):
+    """
+    :returns: the source with lines `first` to `last` replaced.
+    :rtype: str
+
+    """
+    return "".join(LINES[: first - 1] + new_lines + LINES[last:])
+
+
+def _statements(tree):
+    """
+    :returns: the class, span and text of each statement and comment in \
+        the tree, having checked the parent of every node.
+    :rtype: List[Tuple[str, Tuple[int, int], str]]
+
+    """
+    statements = []
+
+    def _visit(node):
+        if getattr(node, "item", None) is not None:
+            statements.append((type(node).__name__, node.item.span, str(node)))
+        for child in node.children:
+            if isinstance(child, Base):
+                assert child.parent is node
+                _visit(child)
+
+    _visit(tree)
+    return statements
+
+
+def _tables(symbol_tables):
+    """
+    :returns: the names, symbols and nested tables of the symbol tables.
+    :rtype: List[Tuple]
+
+    """
+
+    def _table(table):
+        assert all(child.parent is table for child in table.children)
+        return (str(table), [_table(child) for child in table.children])
+
+    return [_table(table) for table in symbol_tables._symbol_tables.values()]
+
+
+@pytest.fixture(name="parser")
+def fixture_parser():
+    """:returns: a parser that does not discard comments."""
+    return Parser("f2008")
+
+
+def _parse(parser, source):
+    """
+    :returns: the tree and the context in which it was parsed.
+    :rtype: Tuple[:py:class:`fparser.two.Fortran2003.Program`, \
+        :py:class:`fparser.two.parser.ParseContext`]
+
+    """
+    context = ParseContext(parser)
+    return context.parse(FortranStringReader(source, ignore_comments=False)), context
+
+
+@pytest.mark.parametrize(
+    "first, last, new_lines, in_place",
+    [
+        # Change a statement in a loop.
+        (10, 10, ["      x = x + 2.0\n", "      x = sqrt(x)\n"], True),
+        # Insert a statement.
+        (10, 9, ["      x = 0.0\n"], True),
+        # Delete a statement and a loop.
+        (10, 10, [], True),
+        (9, 11, [], True),
+        # Change a comment.
+        (8, 8, ["    ! Another comment\n"], True),
+        # Change declarations and USE statements.
+        (7, 7, ["    integer :: i, j\n"], True),
+        (15, 15, ["    real :: z\n", "    y = 2.0\n"], True),
+        (2, 2, ["  use other, only: q, r\n"], True),
+        # Change the arguments of a subroutine.
+        (5, 5, ["  subroutine sub1(x, w)\n"], True),
+        # Add a subroutine.
+        (
+            12,
+            12,
+            [
+                "  end subroutine sub1\n",
+                "  subroutine sub3\n",
+                "  end subroutine sub3\n",
+            ],
+            True,
+        ),
+        # Add a program unit.
+        (18, 17, ["subroutine sub4\n", "end subroutine sub4\n"], False),
+    ],
+)
+def test_reparse(parser, first, last, new_lines, in_place):
+    """Test that the tree and symbol tables after an edit has been reparsed
+    are the same as those obtained by parsing the edited code from
+    scratch."""
+    new_source = _edit(first, last, new_lines)
+    tree, context = _parse(parser, SOURCE)
+    sub2 = tree.content[0].content[-2].content[-1]
+    assert isinstance(sub2, Fortran2003.Subroutine_Subprogram)
+    with context:
+        new_tree = reparse(tree, SOURCE, new_source, first, last)
+    assert (new_tree is tree) is in_place
+    expected, expected_context = _parse(parser, new_source)
+    assert repr(new_tree) == repr(expected)
+    assert str(new_tree) == str(expected)
+    assert _statements(new_tree) == _statements(expected)
+    assert _tables(context.symbol_tables) == _tables(expected_context.symbol_tables)
+    if 5 <= first < 12:
+        # The unedited subroutine has not been parsed again.
+        assert tree.content[0].content[-2].content[-1] is sub2
+
+
+def test_reparse_smallest_block(parser):
+    """Test that only the smallest block enclosing the edit is parsed
+    again and that the symbol tables are then left alone."""
+    tree, context = _parse(parser, SOURCE)
+    sub1 = tree.content[0].content[-2].content[1]
+    table = context.symbol_tables.lookup("my_mod").children[0]
+    assert table.node is sub1.content[0]
+    old_loop = sub1.content[2].content[0]
+    assert isinstance(old_loop, Fortran2003.Block_Nonlabel_Do_Construct)
+    new_source = _edit(10, 10, ["      x = x * 3.0\n"])
+    with context:
+        reparse(tree, SOURCE, new_source, 10, 10)
+    new_loop = sub1.content[2].content[0]
+    assert new_loop is not old_loop
+    assert new_loop.parent is sub1.content[2]
+    assert new_loop.content[1].item.span == (10, 10)
+    assert new_loop.content[1].item.reader is tree.string
+    assert str(new_loop.content[1]) == "x = x * 3.0"
+    assert context.symbol_tables.lookup("my_mod").children[0] is table
+
+
+def test_reparse_rename(parser):
+    """Test that renaming a module replaces its (top-level) symbol table."""
+    new_source = SOURCE.replace("my_mod", "new_mod")
+    tree, context = _parse(parser, SOURCE)
+    with context:
+        assert reparse(tree, SOURCE, new_source, 1, 17) is tree
+    assert str(tree).startswith("MODULE new_mod\n")
+    assert list(context.symbol_tables._symbol_tables) == ["new_mod"]
+    assert context.symbol_tables.lookup("new_mod").node is tree.content[0].content[0]
+
+
+def test_reparse_syntax_error(parser):
+    """Test that an edit that makes the code invalid raises an error and
+    leaves the tree and symbol tables unchanged."""
+    tree, context = _parse(parser, SOURCE)
+    statements = _statements(tree)
+    tables = _tables(context.symbol_tables)
+    with context:
+        with pytest.raises(FortranSyntaxError):
+            reparse(tree, SOURCE, _edit(11, 11, []), 11, 11)
+    assert _statements(tree) == statements
+    assert _tables(context.symbol_tables) == tables
+
+
+def test_reparse_invalid_range(parser):
+    """Test that the edited lines must be valid and that the code outside
+    them must not have been changed."""
+    tree, context = _parse(parser, SOURCE)
+    with context:
+        with pytest.raises(ValueError) as excinfo:
+            reparse(tree, SOURCE, SOURCE, 0, 1)
+        assert "Lines 0 to 1 are not a valid range of the 17 lines" in str(
+            excinfo.value
+        )
+        with pytest.raises(ValueError) as excinfo:
+            reparse(tree, SOURCE, SOURCE, 10, 20)
+        assert "Lines 10 to 20 are not a valid range" in str(excinfo.value)
+        with pytest.raises(ValueError) as excinfo:
+            reparse(tree, SOURCE, _edit(3, 3, ["  real :: b\n"]), 10, 10)
+        assert "The code outside of lines 10 to 10 has also been edited" in str(
+            excinfo.value
+        )
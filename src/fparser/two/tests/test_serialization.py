@@ -0,0 +1,213 @@
+# -----------------------------------------------------------------------------
+# BSD 3-Clause License
+#
+# Copyright (c) 2024, Science and Technology Facilities Council.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# -----------------------------------------------------------------------------
+
+
+"""Module containing tests for the fparser.two.serialization module."""
+
+import io
+
+import pytest
+
+from fparser.common.readfortran import FortranStringReader, Line
+from fparser.two import Fortran2003
+from fparser.two.parser import ParseContext, Parser
+from fparser.two.reparse import reparse
+from fparser.two.serialization import FORMAT_VERSION, dump, dumps, load, loads
+from fparser.two.utils import Base, walk
+
+CODE = """\
+! A comment
+module my_mod
+  use other_mod, only: b => c
+  implicit none
+  integer, parameter :: n = 10
+  character(len=*), parameter :: name = "my_mod"
+contains
+  subroutine my_sub(x)
+    real, intent(inout) :: x(n)
+    integer :: i
+    outer: do i = 1, n
+      if (x(i) > 0.0) then
+        x(i) = -x(i) + 2.0 * b ! negate
+      end if
+    end do outer
+10  continue
+  end subroutine my_sub
+end module my_mod
+"""
+
+
+@pytest.fixture(name="context")
+def fixture_context():
+    """
+    :returns: a context in which to parse code with the f2008 parser.
+    :rtype: :py:class:`fparser.two.parser.ParseContext`
+    """
+    return ParseContext(Parser("f2008"))
+
+
+def _nodes(tree):
+    """
+    :param tree: a parse tree.
+    :type tree: :py:class:`fparser.two.utils.Base`
+
+    :returns: all of the nodes in the tree, starting with the root.
+    :rtype: List[:py:class:`fparser.two.utils.Base`]
+    """
+    return [tree] + [node for node in walk(tree) if isinstance(node, Base)]
+
+
+def test_round_trip(context):
+    """Test that a tree is rebuilt with the same structure and state."""
+    reader = FortranStringReader(CODE, ignore_comments=False)
+    tree = context.parse(reader)
+    data = dumps(tree)
+    assert isinstance(data, bytes)
+    new_tree = loads(data)
+    assert str(new_tree) == str(tree)
+    assert repr(new_tree) == repr(tree)
+    old_nodes = _nodes(tree)
+    new_nodes = _nodes(new_tree)
+    assert [type(node) for node in new_nodes] == [type(node) for node in old_nodes]
+    assert new_tree.parent is None
+    new_node = {id(old): new for old, new in zip(old_nodes, new_nodes)}
+    for old, new in zip(old_nodes, new_nodes):
+        assert new is not old
+        for name in ("string", "item", "parent", "items", "content", "separator"):
+            assert hasattr(new, name) == hasattr(old, name)
+        if hasattr(old, "string") and old.string is not reader:
+            assert new.string == old.string
+        if old.parent is not None:
+            assert new.parent is new_node[id(old.parent)]
+        if isinstance(getattr(old, "item", None), Line):
+            assert new.item.span == old.item.span
+            assert new.item.label == old.item.label
+            assert new.item.name == old.item.name
+            assert new.item.line == old.item.line
+            assert new.item.parse_cache == {}
+            assert new.item.reader is new_tree.string
+    # Equal strings are only stored once.
+    names = [name.string for name in walk(new_tree, Fortran2003.Name)]
+    assert names.count("i") > 1
+    assert len({id(name) for name in names if name == "i"}) == 1
+    # The reader has the same options (but no code).
+    new_reader = new_tree.string
+    assert new_reader.id == reader.id
+    assert new_reader.format == reader.format
+    assert new_reader.ignore_comments is False
+    assert new_reader.include_dirs == reader.include_dirs
+    assert new_reader.get_item() is None
+
+
+def test_no_match(context, monkeypatch):
+    """Test that loading a tree does not match any code."""
+    tree = context.parse(FortranStringReader(CODE))
+    data = dumps(tree)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("match called")
+
+    monkeypatch.setattr(Fortran2003.Base, "__new__", _fail)
+    assert str(loads(data)) == str(tree)
+
+
+def test_subtree_and_none(context):
+    """Test that part of a tree (whose parent is not stored) and None may
+    be serialised."""
+    tree = context.parse(FortranStringReader(CODE))
+    loop = walk(tree, Fortran2003.Block_Nonlabel_Do_Construct)[0]
+    new_loop = loads(dumps(loop))
+    assert str(new_loop) == str(loop)
+    assert new_loop.parent is None
+    assert loads(dumps(None)) is None
+    assert loads(dumps(None, extra=[1]), extra=True) == (None, [1])
+
+
+def test_extra(context):
+    """Test that objects stored with the tree refer to the nodes of the
+    loaded tree."""
+    tree = context.parse(FortranStringReader(CODE))
+    tables = context.symbol_tables.tables
+    new_tree, new_tables = loads(dumps(tree, extra=tables), extra=True)
+    assert [table.name for table in new_tables] == ["my_mod"]
+    assert new_tables[0].node is new_tree.children[0].children[0]
+    assert new_tables[0].children[0].lookup("x").primitive_type == "real"
+    assert loads(dumps(tree), extra=True)[1] is None
+
+
+def test_other_values(context):
+    """Test that attribute values of other types survive a round trip."""
+    tree = context.parse(FortranStringReader("program p\nend program p\n"))
+    stmt = tree.children[0].children[0]
+    stmt.items = ({"ints": (1, [2, 3]), "mixed": (stmt, 4, "a"), "set": {5}},)
+    new_stmt = loads(dumps(tree)).children[0].children[0]
+    assert new_stmt.items == (
+        {"ints": (1, [2, 3]), "mixed": (new_stmt, 4, "a"), "set": {5}},
+    )
+
+
+def test_reparse_loaded_tree(context):
+    """Test that a loaded tree can be updated by reparse."""
+    tree = loads(dumps(context.parse(FortranStringReader(CODE))))
+    new_code = CODE.replace("2.0 * b", "3.0 * b")
+    with context:
+        tree = reparse(tree, CODE, new_code, 13, 13)
+    assert "x(i) = - x(i) + 3.0 * b" in str(tree)
+
+
+def test_dump_load_file(context):
+    """Test that a tree may be written to (and read from) a file."""
+    tree = context.parse(FortranStringReader(CODE))
+    stream = io.BytesIO()
+    dump(tree, stream, extra="extra")
+    stream.seek(0)
+    new_tree, extra = load(stream, extra=True)
+    assert str(new_tree) == str(tree)
+    assert extra == "extra"
+
+
+def test_invalid_data():
+    """Test that data that was not created by dumps (or was created with
+    another version of the format) is rejected."""
+    with pytest.raises(ValueError) as err:
+        loads(b"not a tree")
+    assert "The data is not a serialised fparser2 parse tree." in str(err.value)
+    data = dumps(None)
+    data = data[:4] + bytes([FORMAT_VERSION + 1]) + data[5:]
+    with pytest.raises(ValueError) as err:
+        loads(data)
+    assert (
+        f"The parse tree was serialised with format version {FORMAT_VERSION + 1} "
+        f"but version {FORMAT_VERSION} is required." in str(err.value)
+    )
@@ -164,3 +164,57 @@ def test_nested_removal():
     tables.remove("some_mod")
     assert "some_mod" not in tables._symbol_tables
     assert "another_mod" in tables._symbol_tables
+
+
+def test_replace_tables():
+    """Check that top-level and nested tables can be replaced in place."""
+    tables = SymbolTables()
+    first = tables.add("first")
+    second = tables.add("second")
+    third = tables.add("third")
+    new = SymbolTable("new")
+    tables.replace_tables([second], [new])
+    assert list(tables._symbol_tables.values()) == [first, new, third]
+    assert new.parent is None
+    # Tables are added at the end if none are replaced.
+    last = SymbolTable("last")
+    tables.replace_tables([], [last])
+    assert list(tables._symbol_tables) == ["first", "new", "third", "last"]
+    # Nested tables.
+    children = [SymbolTable(f"child{idx}", parent=first) for idx in range(3)]
+    for child in children:
+        first.add_child(child)
+    tables.replace_tables(children[1:], [new], first)
+    assert first.children == [children[0], new]
+    assert new.parent is first
+    with pytest.raises(SymbolTableError) as err:
+        tables.replace_tables([children[1]], [], first)
+    assert "Symbol table 'child1' is not a child of 'first'" in str(err.value)
+    with pytest.raises(SymbolTableError) as err:
+        tables.replace_tables([children[0]], [])
+    assert "'child0' is not a child of 'the top level'" in str(err.value)
+
+
+def test_scope():
+    """Check that the scope() context manager sets and restores the
+    current scope."""
+    tables = SymbolTables()
+    outer = tables.add("outer")
+    table = SymbolTable("scratch")
+    assert table.is_empty
+    with tables.scope(table) as scope:
+        assert scope is table
+        assert tables.current_scope is table
+        tables.enter_scope("inner")
+        tables.current_scope.add_data_symbol("var", "integer")
+        tables.exit_scope()
+    assert tables.current_scope is None
+    assert table.children[0].name == "inner"
+    assert not table.children[0].is_empty
+    assert table.is_empty
+    tables.enter_scope("outer")
+    with pytest.raises(KeyError):
+        with tables.scope(None):
+            assert tables.current_scope is None
+            raise KeyError("oops")
+    assert tables.current_scope is outer
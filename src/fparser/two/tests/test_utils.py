@@ -40,7 +40,8 @@ exception handling and ast traversal.
 import pytest
 from fparser.api import get_reader
 from fparser.two import Fortran2003, utils
-
+from fparser.two.parser import ParserFactory
+from fparser.two.utils import walk
 
 # test BlockBase
 
@@ -141,3 +142,322 @@ def test_endstmtbase_match():
         require_stmt_type=True,
     )
     assert result == ("SUBROUTINE", Fortran2003.Name("sub"))
+
+
+# test LeadingKeywordIndex
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_leading_keyword_index_keywords():
+    """Test that the LeadingKeywordIndex.keywords() method computes the
+    effective leading keywords of a class, including those of any
+    subclasses that Base.__new__ would try.
+
+    """
+    index = utils.LeadingKeywordIndex(utils.Base.subclasses)
+    assert index.keywords(Fortran2003.Call_Stmt) == frozenset(["CALL"])
+    assert index.keywords(Fortran2003.End_Do_Stmt) == frozenset(["END"])
+    # A comment never matches a line of Fortran.
+    assert index.keywords(Fortran2003.Comment) == frozenset()
+    # An assignment may begin with any name.
+    assert index.keywords(Fortran2003.Assignment_Stmt) is None
+    # The union of all subclasses is taken for a class without a match
+    # method.
+    assert index.keywords(Fortran2003.Access_Spec) is None
+    assert index.keywords(Fortran2003.Io_Control_Spec) is None
+    # Any subclass without a restriction removes the restriction.
+    assert index.keywords(Fortran2003.Action_Stmt) is None
+    assert index.keywords(Fortran2003.Executable_Construct) is None
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_leading_keyword_index_groups():
+    """Test that the LeadingKeywordIndex.groups() method only retains
+    classes that could match a line, in the order in which Base.__new__
+    would try them.
+
+    """
+    index = utils.LeadingKeywordIndex(utils.Base.subclasses)
+    classes = (Fortran2003.Execution_Part_Construct, Fortran2003.End_Program_Stmt)
+    reader = get_reader("call sub()\n", isfree=True)
+    groups = index.groups(classes, reader.get_item())
+    assert len(groups) == 2
+    assert Fortran2003.Call_Stmt in groups[0]
+    assert Fortran2003.Assignment_Stmt in groups[0]
+    assert Fortran2003.Print_Stmt not in groups[0]
+    assert Fortran2003.If_Construct not in groups[0]
+    assert groups[0].index(Fortran2003.Assignment_Stmt) < groups[0].index(
+        Fortran2003.Call_Stmt
+    )
+    assert groups[1] == ()
+    # Keywords that are prefixes of the first word are found.
+    reader = get_reader("enddo\n", isfree=True)
+    groups = index.groups(classes, reader.get_item())
+    assert Fortran2003.Call_Stmt not in groups[0]
+    assert groups[1] == (Fortran2003.End_Program_Stmt,)
+    # Results are cached.
+    reader = get_reader("end program\n", isfree=True)
+    assert index.groups(classes, reader.get_item()) is groups
+    # Items that cannot be dispatched on return the original classes.
+    expected = ((classes[0],), (classes[1],))
+    reader = get_reader("! a comment\n", isfree=True, ignore_comments=False)
+    assert index.groups(classes, reader.get_item()) == expected
+    reader = get_reader("include 'fred.h'\n", isfree=True)
+    assert index.groups(classes, reader.get_item()) == expected
+    assert index.groups(classes, None) == expected
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_blockbase_match_keyword_index(monkeypatch):
+    """Test that BlockBase.match gives the same result irrespective of
+    whether or not the leading-keyword index is in use.
+
+    """
+    code = (
+        "! A comment\n"
+        "program test\n"
+        "  use my_mod, only: a\n"
+        "  implicit none\n"
+        "  integer :: i, iff\n"
+        "  real :: arr(10)\n"
+        "#ifdef DEBUG\n"
+        "  print *, 'debug'\n"
+        "#endif\n"
+        "  iff = 1\n"
+        "  data1: do i = 1, 10\n"
+        "    if (i > 5) cycle\n"
+        "    arr(i) = real(i)\n"
+        "  end do data1\n"
+        "  if (iff == 1) then\n"
+        "    call sub(arr)\n"
+        "  else if (iff == 2) then\n"
+        "    goto 10\n"
+        "  else\n"
+        "    where (arr > 1.0) arr = 0.0\n"
+        "  end if\n"
+        "  do 10 i = 1, 2\n"
+        "10 continue\n"
+        "contains\n"
+        "  subroutine sub(x)\n"
+        "    real, intent(inout) :: x(:)\n"
+        "    x = 2.0*x\n"
+        "  end subroutine sub\n"
+        "end program test\n"
+    )
+    assert utils.Base.keyword_index is not None
+    reader = get_reader(code, isfree=True, ignore_comments=False)
+    indexed = Fortran2003.Program(reader)
+    rules = utils.Base.rules
+    monkeypatch.setattr(
+        utils.Base,
+        "rules",
+        utils.RuleTable(rules.subclasses, None, rules.parse_memo, rules.expr_parser),
+    )
+    reader = get_reader(code, isfree=True, ignore_comments=False)
+    unindexed = Fortran2003.Program(reader)
+    assert str(indexed) == str(unindexed)
+    assert repr(indexed) == repr(unindexed)
+
+
+# test ParseMemo
+
+
+def test_parse_memo_scope():
+    """Test that the ParseMemo cache is cleared when matching starts on a
+    new line and when it is full.
+
+    """
+    memo = utils.ParseMemo(max_entries=2)
+    key = (Fortran2003.Name, "a")
+    memo.enter("a = b")
+    memo.store(key, None, "Name: 'a'")
+    assert memo.lookup(key) == (None, "Name: 'a'")
+    assert memo.hits == 1
+    # Starting on the same line again retains the cache.
+    memo.enter("a = b")
+    assert memo.lookup(key) == (None, "Name: 'a'")
+    # Starting on a new line clears it.
+    memo.enter("c = d")
+    assert memo.lookup(key) is None
+    assert memo.misses == 1
+    assert memo.hits == 2
+    memo.store(key, None, "Name: 'a'")
+    memo.clear()
+    assert memo.lookup(key) is None
+    # The cache is cleared rather than exceed its maximum size.
+    memo.store(key, None, "Name: 'a'")
+    memo.store((Fortran2003.Name, "b"), None, "Name: 'b'")
+    memo.store((Fortran2003.Name, "c"), None, "Name: 'c'")
+    assert memo.lookup(key) is None
+    assert memo.lookup((Fortran2003.Name, "c")) == (None, "Name: 'c'")
+
+
+def test_parse_memo_lookup():
+    """Test that ParseMemo.lookup() returns a copy of a cached node."""
+    ParserFactory().create(std="f2003", memoize=False)
+    memo = utils.ParseMemo()
+    node = Fortran2003.Add_Operand("a * b")
+    key = (Fortran2003.Add_Operand, "a * b")
+    memo.store(key, node, None)
+    new_node, errmsg = memo.lookup(key)
+    assert errmsg is None
+    assert new_node is not node
+    assert new_node == node
+    assert new_node.children[0] is not node.children[0]
+    assert new_node.children[0].parent is new_node
+
+
+def test_parse_memo_hit_rate():
+    """Test that a significant fraction of the matches of a long expression
+    in which the same arguments are matched by alternative rules are
+    found in the ParseMemo.
+
+    """
+    expr = " + ".join(f"f{idx}(x(i, j), y(j) - 1, g(z(k)))" for idx in range(30))
+    code = f"program p\n  x = {expr}\nend program p\n"
+    parser = ParserFactory().create(std="f2003")
+    expected = parser(get_reader(code))
+    parser = ParserFactory().create(std="f2003", memoize=True)
+    memo = utils.Base.parse_memo
+    tree = parser(get_reader(code))
+    assert str(tree) == str(expected)
+    assert memo.hits >= 0.25 * (memo.hits + memo.misses)
+
+
+@pytest.mark.parametrize("std", ["f2003", "f2008"])
+def test_parse_memo_parse(std):
+    """Test that parsing with the ParseMemo enabled gives the same result as
+    parsing without it, that cached nodes are not shared within the tree
+    and that hits are recorded.
+
+    """
+    code = (
+        "subroutine test(a, b)\n"
+        "  real :: a(10), b(10), x\n"
+        "  x = a(1)*b(2) + a(1)*b(2) - sqrt(a(1)*b(2))/(x + 1.0)\n"
+        "  if (x > a(1)*b(2)) call sub(a(1)*b(2), x)\n"
+        "end subroutine test\n"
+    )
+    parser = ParserFactory().create(std=std)
+    expected = parser(get_reader(code))
+    parser = ParserFactory().create(std=std, memoize=True)
+    memo = utils.Base.parse_memo
+    assert isinstance(memo, utils.ParseMemo)
+    tree = parser(get_reader(code))
+    assert str(tree) == str(expected)
+    assert repr(tree) == repr(expected)
+    assert memo.hits > 0
+    assert memo.misses > 0
+    # Every node must be distinct and have the correct parent.
+    seen = set()
+    for node in walk(tree):
+        if isinstance(node, utils.Base):
+            assert id(node) not in seen
+            seen.add(id(node))
+            for child in node.children:
+                if isinstance(child, utils.Base):
+                    assert child.parent is node
+
+
+# test the exception-free no-match protocol
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_match_or_none():
+    """Test that _match_or_none() returns None rather than raising
+    NoMatchError while calling the class directly still raises it.
+
+    """
+    result = utils._match_or_none(Fortran2003.Expr, "a + b")
+    assert isinstance(result, Fortran2003.Level_2_Expr)
+    assert utils._match_or_none(Fortran2003.Expr, "a +") is None
+    with pytest.raises(utils.NoMatchError) as err:
+        Fortran2003.Expr("a +")
+    assert "Expr: 'a +'" in str(err.value)
+    assert Fortran2003.Expr("a +", _raise_no_match=False) is None
+    reader = get_reader("a +", isfree=True)
+    assert utils._match_or_none(Fortran2003.Assignment_Stmt, reader) is None
+    # The line must have been returned to the reader.
+    assert reader.get_item().line == "a +"
+
+
+@pytest.mark.usefixtures("f2003_create")
+def test_match_or_none_compatibility():
+    """Test that _match_or_none() supports classes that override __new__ and
+    match methods that raise NoMatchError.
+
+    """
+
+    class RaisingNew(utils.Base):
+        """A class that signals no match by raising NoMatchError from
+        __new__."""
+
+        subclass_names = []
+
+        def __new__(cls, string, parent_cls=None):
+            if string != "yes":
+                raise utils.NoMatchError(f"RaisingNew: '{string}'")
+            return Fortran2003.Name("yes")
+
+    class RaisingMatch(utils.Base):
+        """A class whose match method raises NoMatchError."""
+
+        subclass_names = []
+
+        @staticmethod
+        def match(string):
+            if string != "yes":
+                raise utils.NoMatchError("no")
+            return (string,)
+
+    assert utils._match_or_none(RaisingNew, "no") is None
+    assert utils._match_or_none(RaisingNew, "yes") == Fortran2003.Name("yes")
+    assert utils._match_or_none(RaisingMatch, "no") is None
+    assert utils._match_or_none(RaisingMatch, "yes").items == ("yes",)
+    with pytest.raises(utils.NoMatchError) as err:
+        RaisingMatch("no")
+    assert "RaisingMatch: 'no'" in str(err.value)
+
+
+def test_node_slots():
+    """Test that no class of node has an instance dictionary (so that each
+    node occupies as little memory as possible) but that the attributes
+    of nodes are still available."""
+    # pylint: disable=import-outside-toplevel
+    import fparser.two.C99Preprocessor  # noqa: F401
+    import fparser.two.Fortran2008  # noqa: F401
+
+    classes = []
+    pending = [utils.Base]
+    while pending:
+        cls = pending.pop()
+        classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    assert len(classes) > 600
+    assert [cls for cls in classes if cls.__dictoffset__] == []
+
+    parser = ParserFactory().create(std="f2008")
+    tree = parser(get_reader("program p\n  integer :: a\n  a = 1\nend program p"))
+    assert not hasattr(tree, "__dict__")
+    assert tree.content[0].parent is tree
+    stmt = walk(tree, Fortran2003.Assignment_Stmt)[0]
+    assert stmt.string == "a = 1"
+    assert stmt.items[0].string == "a"
+    with pytest.raises(AttributeError):
+        stmt.not_an_attribute = 1
+
+
+def test_class_reference():
+    """Test that class_reference refers to a class (including a nested
+    one) by its module and qualified name and that resolve_class_reference
+    finds it again."""
+    from fparser.two.symbol_table import SymbolTable
+
+    ref = utils.class_reference(Fortran2003.Name)
+    assert ref == "fparser.two.Fortran2003:Name"
+    assert utils.resolve_class_reference(ref) is Fortran2003.Name
+    ref = utils.class_reference(SymbolTable.Symbol)
+    assert ref == "fparser.two.symbol_table:SymbolTable.Symbol"
+    assert utils.resolve_class_reference(ref) is SymbolTable.Symbol
+    with pytest.raises(KeyError):
+        utils.resolve_class_reference("fparser.two.Fortran2003:Not_A_Class")
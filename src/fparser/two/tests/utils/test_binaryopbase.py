@@ -47,7 +47,7 @@ from fparser.two.Fortran2003 import (
     Level_4_Expr,
 )
 import fparser.two.pattern_tools as fparser_patterns
-from fparser.two.parser import ParserFactory
+from fparser.two.parser import Parser, ParserFactory
 
 # This is required to setup the fortran2003 classes (when matching
 # with Complex_Literal_Constant)
@@ -154,6 +154,10 @@ def test_binaryopbase_addition():
     assert isinstance(result[1], str)
     assert result[1] == "+"
     assert isinstance(result[2], Real_Literal_Constant)
+    # The source text is only kept if the parser is asked to keep it.
+    assert result[2].string == "3.0E+10"
+    with Parser(keep_source=True):
+        result = BinaryOpBase.match(lhs, pattern, rhs, string)
     assert result[2].string == "3.0e+10"
 
 
@@ -0,0 +1,172 @@
+# Copyright (c) 2026 Science and Technology Facilities Council.
+
+# All rights reserved.
+
+# Modifications made as part of the fparser project are distributed
+# under the following license:
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# 3. Neither the name of the copyright holder nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Test the TypeIndex class and the tree-editing functions provided by
+utils.py."""
+
+import pytest
+from fparser.api import get_reader
+from fparser.two import Fortran2003
+from fparser.two.utils import (
+    TypeIndex,
+    insert_node,
+    remove_node,
+    replace_node,
+    walk,
+)
+
+SOURCE = (
+    "program test\n"
+    "integer :: a, b\n"
+    "a = 1\n"
+    "call first(a)\n"
+    "if (a > 0) then\n"
+    "  call second(a, b)\n"
+    "end if\n"
+    "end program test\n"
+)
+
+
+def test_type_index_find(f2003_parser):
+    """Check that the nodes found by the index are those (and in the same
+    order) that are found by walk()."""
+    tree = f2003_parser(get_reader(SOURCE))
+    index = TypeIndex(tree)
+    assert len(index) == len(walk(tree, Fortran2003.Base))
+    assert tree in index
+    for types in [
+        Fortran2003.Call_Stmt,
+        Fortran2003.Name,
+        (Fortran2003.Call_Stmt, Fortran2003.Assignment_Stmt),
+        Fortran2003.StmtBase,
+    ]:
+        assert index.find(types) == walk(tree, types)
+    assert index.find(Fortran2003.Do_Stmt) == []
+    # The index may also be built incrementally.
+    index = TypeIndex()
+    index.add(tree.children)
+    assert index.find(Fortran2003.Call_Stmt) == walk(tree, Fortran2003.Call_Stmt)
+    index.discard(tree.children)
+    assert not index
+    index.discard(tree)
+
+
+def test_insert_node(f2003_parser):
+    """Check that insert_node() adds a node to a block and to the index."""
+    tree = f2003_parser(get_reader(SOURCE))
+    index = TypeIndex(tree)
+    exec_part = walk(tree, Fortran2003.Execution_Part)[0]
+    call = Fortran2003.Call_Stmt("call third()")
+    insert_node(exec_part, 0, call, index)
+    assert exec_part.content[0] is call
+    assert call.parent is exec_part
+    assert index.find(Fortran2003.Call_Stmt)[-1] is call
+    assert index.find(Fortran2003.Procedure_Designator) == walk(
+        call, Fortran2003.Procedure_Designator
+    )
+    assert "CALL third\n  a = 1" in str(tree)
+    with pytest.raises(TypeError) as err:
+        insert_node(call, 0, Fortran2003.Name("b"))
+    assert "only be inserted into a block but got 'Call_Stmt'" in str(err.value)
+
+
+def test_remove_node(f2003_parser):
+    """Check that remove_node() removes a node from the content of a block
+    and from the items of a node."""
+    tree = f2003_parser(get_reader(SOURCE))
+    index = TypeIndex(tree)
+    call = index.find(Fortran2003.Call_Stmt)[1]
+    remove_node(call, index)
+    assert call.parent is None
+    assert "second" not in str(tree)
+    assert index.find(Fortran2003.Call_Stmt) == walk(tree, Fortran2003.Call_Stmt)
+    assert index.find(Fortran2003.Name) == walk(tree, Fortran2003.Name)
+    # The entities of a declaration are in a tuple within a tuple.
+    decl = index.find(Fortran2003.Entity_Decl_List)[0]
+    remove_node(index.find(Fortran2003.Entity_Decl)[0], index)
+    assert str(decl) == "b"
+    assert index.find(Fortran2003.Entity_Decl) == walk(tree, Fortran2003.Entity_Decl)
+    with pytest.raises(ValueError) as err:
+        remove_node(call)
+    assert "Node 'CALL second(a, b)' has no parent" in str(err.value)
+    name = Fortran2003.Name("c")
+    name.parent = decl
+    with pytest.raises(ValueError) as err:
+        remove_node(name)
+    assert "Node 'c' is not one of the children of its parent 'b'" in str(err.value)
+
+
+def test_type_index_order(f2003_parser):
+    """Check that the nodes found by the index are in the order in which
+    they were added, with a node that is added after others have been
+    removed coming last, rather than in their order in the tree."""
+    tree = f2003_parser(get_reader(SOURCE))
+    index = TypeIndex(tree)
+    exec_part = walk(tree, Fortran2003.Execution_Part)[0]
+    types = (Fortran2003.Call_Stmt, Fortran2003.Assignment_Stmt)
+    assign, first, second = index.find(types)
+    remove_node(first, index)
+    call = Fortran2003.Call_Stmt("call third()")
+    insert_node(exec_part, 0, call, index)
+    assert index.find(types) == [assign, second, call]
+    assert walk(tree, types) == [call, assign, second]
+    # A node that is added again also comes last.
+    index.discard(assign)
+    index.add(assign)
+    assert index.find(types) == [second, call, assign]
+    assert index.find(Fortran2003.Assignment_Stmt) == [assign]
+
+
+def test_replace_node(f2003_parser):
+    """Check that replace_node() replaces a node in the content of a block
+    and in the items of a node."""
+    tree = f2003_parser(get_reader(SOURCE))
+    index = TypeIndex(tree)
+    assign = index.find(Fortran2003.Assignment_Stmt)[0]
+    call = Fortran2003.Call_Stmt("call third(b)")
+    replace_node(assign, call, index)
+    assert assign.parent is None
+    assert call.parent.content[0] is call
+    assert index.find(Fortran2003.Assignment_Stmt) == []
+    # Nodes that are added to the index come after those already in it.
+    assert index.find(Fortran2003.Call_Stmt) == (
+        walk(tree, Fortran2003.Call_Stmt)[1:] + [call]
+    )
+    # Replace the condition of the IF statement.
+    expr = index.find(Fortran2003.Level_4_Expr)[0]
+    new_expr = Fortran2003.Level_4_Expr("b < 0")
+    replace_node(expr, new_expr, index)
+    assert "IF (b < 0) THEN" in str(tree)
+    assert new_expr.parent.items[0] is new_expr
+    assert index.find(Fortran2003.Level_4_Expr) == [new_expr]
@@ -36,7 +36,7 @@
 
 import pytest
 from fparser.api import get_reader
-from fparser.two.utils import walk
+from fparser.two.utils import iter_walk, walk
 from fparser.two import Fortran2003
 from fparser.common.readfortran import FortranStringReader
 from fparser.two.parser import ParserFactory
@@ -124,3 +124,34 @@ end program test
     assert len(allNames) == 8
     identifierSet = set(map(lambda x: x.tostr(), allNames))
     assert identifierSet == expected
+
+
+def test_iter_walk(f2003_parser):
+    """Check that iter_walk() generates the same nodes, in the same order,
+    as walk() and that it can be stopped part way through a tree."""
+    tree = f2003_parser(
+        get_reader(
+            "program hello\n"
+            "integer :: a(10)\n"
+            "a = (/ 1, 2, 3 /)\n"
+            "write(*,*) 'hello', a(1:2)\n"
+            "end program hello\n"
+        )
+    )
+    assert list(iter_walk(tree)) == walk(tree)
+    assert list(iter_walk(tree, Name)) == walk(tree, Name)
+    nodes = iter_walk(tree, Fortran2003.Write_Stmt)
+    assert "hello" in str(next(nodes))
+    assert next(nodes, None) is None
+
+
+def test_walk_deep_tree():
+    """Check that the depth of the tree that can be walked is not limited
+    by the recursion limit."""
+    node = Fortran2003.Parenthesis("(a)")
+    for _ in range(2000):
+        outer = Fortran2003.Parenthesis("(a)")
+        outer.items = ("(", node, ")")
+        node = outer
+    assert len(walk(node, Fortran2003.Parenthesis)) == 2001
+    assert len(list(iter_walk(node, Name))) == 1
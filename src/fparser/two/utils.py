@@ -69,11 +69,17 @@
 # Original author: Pearu Peterson <pearu@cens.ioc.ee>
 # First version created: Oct 2006
 
+import contextvars
+import copy
+import functools
+import importlib
+import itertools
 import re
+import sys
 from fparser.common import readfortran
 from fparser.common.splitline import string_replace_map
 from fparser.common.readfortran import FortranReaderBase
-from fparser.two.symbol_table import SYMBOL_TABLES
+from fparser.two.symbol_table import active_symbol_tables
 
 # A list of supported extensions to the standard(s)
 
@@ -260,6 +266,8 @@ class ComparableMixin:
 
     # pylint: disable=too-few-public-methods
 
+    __slots__ = ()
+
     def _compare(self, other, method):
         """Call the method, if other is able to be used within it.
 
@@ -381,39 +389,353 @@ def _set_parent(parent_node, items):
                 _set_parent(parent_node, item)
 
 
-class Base(ComparableMixin):
+def _match_or_none(cls, string, parent_cls=None):
+    """
+    Attempt to construct a new instance of the supplied class from the
+    supplied string or reader. This is the internal, exception-free,
+    equivalent of calling `cls(string, parent_cls=parent_cls)`.
+
+    :param type cls: the class of object to create.
+    :param string: (source of) Fortran string to parse.
+    :type string: str | :py:class:`fparser.common.readfortran.FortranReaderBase`
+    :param parent_cls: the classes that are not to be tried as subclasses \
+        (to avoid infinite recursion).
+    :type parent_cls: Optional[Set[type]]
+
+    :returns: the new node or None if there is no match.
+    :rtype: Optional[:py:class:`fparser.two.utils.Base`]
+
+    """
+    if cls.__new__ is Base.__new__:
+        return Base.__new__(cls, string, parent_cls=parent_cls, _raise_no_match=False)
+    # This class has its own __new__ method which may raise NoMatchError.
+    try:
+        if parent_cls is None:
+            return cls(string)
+        return cls(string, parent_cls=parent_cls)
+    except NoMatchError:
+        return None
+
+
+class ParseMemo:
+    """
+    Packrat cache of the outcome of matching a string with a given class.
+
+    Most of the matches performed while parsing a statement are unique
+    but some are repeated, and can be expensive, where alternative rules
+    match the same text (e.g. the arguments of a reference that may be an
+    array element, a function reference or a structure constructor).
+    Only new matches (those made by a match method, or of a line) are
+    cached, not those of the subclasses that are tried when a class does
+    not match. The outcome of a new match depends only upon the class
+    and the string, whereas that of a subclass also depends upon the
+    classes in the `parent_cls` recursion guard (which grows throughout
+    the match so that the same guard is rarely seen twice). Each outcome
+    (a new node or a NoMatchError) is cached against the class and the
+    string. The cache is cleared whenever matching starts on a new line
+    from a reader and once it holds `max_entries` outcomes. Since nodes
+    hold a reference to their parent, a cached node is copied when it is
+    reused.
+
+    A ParseMemo is enabled by passing `memoize=True` to
+    :py:meth:`fparser.two.parser.ParserFactory.create`.
+
+    :param int max_entries: the number of outcomes after which the cache \
+        is cleared (which bounds its size when strings are matched \
+        without a reader).
+
+    """
+
+    def __init__(self, max_entries=100000):
+        # Number of lookups that were satisfied from the cache.
+        self.hits = 0
+        # Number of lookups that required a match to be performed.
+        self.misses = 0
+        self.max_entries = max_entries
+        self._cache = {}
+        # The line that the cache contents belong to.
+        self._scope = None
+
+    def clear(self):
+        """
+        Remove all cached results (but leave the hit/miss counts intact).
+
+        """
+        self._cache.clear()
+        self._scope = None
+
+    def enter(self, scope):
+        """
+        Note the start of a match of a line from a reader. If this is a
+        different line to the one for which results are cached then the
+        cache is cleared.
+
+        :param scope: the line being matched.
+        :type scope: :py:class:`fparser.common.readfortran.Line`
+
+        """
+        if scope is not self._scope:
+            self._cache.clear()
+            self._scope = scope
+
+    def lookup(self, key):
+        """
+        Look up the outcome of a previous match.
+
+        :param key: the class and the string of the match.
+        :type key: Tuple[type, str]
+
+        :returns: None if there is no cached outcome. Otherwise, a copy \
+            of the previously-matched node (or None if the match failed) \
+            and the message describing the failure (or None).
+        :rtype: Optional[Tuple[Optional[:py:class:`fparser.two.utils.Base`], \
+                               Optional[str]]]
+
+        """
+        try:
+            node, errmsg = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if node is not None:
+            # Avoid copying the (ancestors of the) parent of the node.
+            node = copy.deepcopy(node, {id(node.parent): node.parent})
+        return node, errmsg
+
+    def store(self, key, node, errmsg):
+        """
+        Store the outcome of a match.
+
+        :param key: the class and the string of the match.
+        :type key: Tuple[type, str]
+        :param node: the matched node or None if the match failed.
+        :type node: Optional[:py:class:`fparser.two.utils.Base`]
+        :param errmsg: the message of the NoMatchError if the match failed.
+        :type errmsg: Optional[str]
+
+        """
+        cache = self._cache
+        if len(cache) >= self.max_entries:
+            cache.clear()
+        cache[key] = (node, errmsg)
+
+
+class RuleTable:
+    """
+    The rules used to parse a particular standard of Fortran, i.e. the
+    optimised class hierarchy constructed by fparser.two.parser, together
+    with the parsing options. Each :py:class:`fparser.two.parser.Parser`
+    owns a RuleTable and makes it the active one (see `active_rules`)
+    while it parses so that parsers for different standards (or with different
+    options) can be used in the same process.
+
+    :param subclasses: the optimised mapping from class name to the list \
+        of subclasses that are tried (in order) when a class does not \
+        match.
+    :type subclasses: Dict[str, List[type]]
+    :param keyword_index: index from the leading keyword of a statement \
+        to the classes that could match it (or None to try all classes).
+    :type keyword_index: Optional[:py:class:`LeadingKeywordIndex`]
+    :param parse_memo: packrat cache of match results or None if disabled.
+    :type parse_memo: Optional[:py:class:`ParseMemo`]
+    :param expr_parser: precedence-climbing parser used by the expression \
+        classes or None if disabled.
+    :type expr_parser: Optional[:py:class:`fparser.two.expr_parser.ExprParser`]
+    :param dispatch: the tuples of subclasses to try that have been \
+        compiled for each class. This may be shared by tables with the \
+        same `subclasses`.
+    :type dispatch: Optional[Dict[type, Tuple[type, ...]]]
+    :param bool keep_source: whether or not each node keeps the text that \
+        it was matched from (see :py:attr:`Base.string`).
+
+    """
+
+    def __init__(
+        self,
+        subclasses,
+        keyword_index=None,
+        parse_memo=None,
+        expr_parser=None,
+        dispatch=None,
+        keep_source=False,
+    ):
+        self.subclasses = subclasses
+        self.keyword_index = keyword_index
+        self.parse_memo = parse_memo
+        self.expr_parser = expr_parser
+        self.dispatch = {} if dispatch is None else dispatch
+        self.keep_source = keep_source
+
+    def subclass_dispatch(self, cls):
+        """
+        :param type cls: the class that has not matched.
+
+        :returns: the subclasses to try (in order) when the supplied class \
+            does not match. These are compiled on first use.
+        :rtype: Tuple[type, ...]
+
+        """
+        try:
+            return self.dispatch[cls]
+        except KeyError:
+            dispatch = tuple(self.subclasses.get(cls.__name__, ()))
+            self.dispatch[cls] = dispatch
+            return dispatch
+
+
+# The rule table of the parser that is active in the current context (set by
+# fparser.two.parser.Parser and ParseContext). Each thread (and asyncio task)
+# has its own context. If this is None then the rules of the default parser
+# (Base.rules) are used.
+_ACTIVE_RULES = contextvars.ContextVar("fparser_active_rules", default=None)
+
+
+def active_rules():
+    """
+    :returns: the rules of the parser that is active in the current \
+        context or, if there is none, those of the default parser.
+    :rtype: :py:class:`fparser.two.utils.RuleTable`
+
+    """
+    rules = _ACTIVE_RULES.get()
+    if rules is None:
+        return Base.rules
+    return rules
+
+
+def expr_parser_match(match):
+    """
+    Decorator for the (static) `match` method of an expression class. If
+    the active rules have an expression parser (see
+    :py:class:`fparser.two.expr_parser.ExprParser`) then the string is
+    first parsed by that as an instance of the class that defines the
+    method. If this succeeds then the resulting node is returned by the
+    decorated method instead of the tuple returned by `match`.
+
+    :param match: the match method of the class.
+    :type match: Callable[[str], Optional[tuple]]
+
+    :returns: the decorated match method.
+    :rtype: Callable[[str], Optional[tuple | :py:class:`Base`]]
+
+    """
+    # The class is looked up when the method is first called since it has
+    # not been created when the decorator is applied.
+    cls_name = match.__qualname__.rsplit(".", 1)[0]
+    cls_cache = []
+
+    @functools.wraps(match)
+    def wrapper(string):
+        expr_parser = active_rules().expr_parser
+        if expr_parser is not None:
+            if not cls_cache:
+                cls_cache.append(match.__globals__[cls_name])
+            obj = expr_parser.parse(cls_cache[0], string)
+            if obj is not None:
+                return obj
+        return match(string)
+
+    return wrapper
+
+
+class _SlotsMeta(type):
+    """
+    Metaclass of :py:class:`Base`. Gives each subclass an empty
+    `__slots__` (unless it defines its own) so that the attributes of a
+    node are stored in the slots defined by `Base` (and a few of its
+    subclasses) rather than in an instance dictionary. There are many
+    thousands of nodes in the parse tree of a large code and this roughly
+    halves the memory that each one occupies.
+
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        namespace.setdefault("__slots__", ())
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+class Base(ComparableMixin, metaclass=_SlotsMeta):
     """Base class for Fortran 2003 syntax rules.
 
     All Base classes have the following attributes::
 
         self.string - original argument to construct a class instance, its
-                      type is either str or FortranReaderBase.
+                      type is either str or FortranReaderBase (see below).
         self.item   - Line instance (holds label) or None.
 
+    Unless the parser was created with `keep_source=True`, a node that
+    was matched from a str does not keep a copy of it (the text of the
+    nodes of a statement would otherwise be stored many times over) and
+    `string` then gives the text of the node as produced by `tostr`.
+
     :param type cls: the class of object to create.
     :param string: (source of) Fortran string to parse.
     :type string: str | :py:class:`fparser.common.readfortran.FortranReaderBase`
-    :param parent_cls: the parent class of this object.
-    :type parent_cls: `type`
+    :param parent_cls: the classes that are not to be tried as subclasses \
+        (to avoid infinite recursion).
+    :type parent_cls: Optional[Set[type]]
+
+    :raises NoMatchError: if the string does not match this class (unless \
+        `_raise_no_match` is False, in which case None is returned).
+
+    Within fparser, a failure to match is signalled by returning None
+    rather than by raising NoMatchError since exceptions are expensive
+    and failure is the common case. `match` methods return None and
+    nodes are constructed with :py:func:`_match_or_none`. NoMatchError is
+    only raised when a class is called directly. `match` methods may
+    still raise NoMatchError (e.g. by calling another class) and this is
+    treated in the same way as returning None.
 
     """
 
-    # This dict of subclasses is populated dynamically by code at the end
-    # of the fparser.two.parser module. That code uses the entries in the
+    # The attributes of every node. Nodes have no instance dictionary (see
+    # _SlotsMeta) so no other attributes may be set. `_string` holds the
+    # value of the `string` property.
+    __slots__ = ("_string", "item", "parent", "items")
+
+    # The rules (a RuleTable) of the default parser. This is set by
+    # fparser.two.parser and all parsing state is obtained from here unless
+    # another parser is active (see `active_rules`). See Issue #191 for a
+    # discussion of a way of getting rid of this state.
+    rules = RuleTable({})
+
+    # This dict of subclasses is populated dynamically by code in the
+    # fparser.two.parser module. That code uses the entries in the
     # 'subclass_names' list belonging to each class defined in this module.
-    # See Issue #191 for a discussion of a way of getting rid of this state.
+    # This and the `keyword_index`, `parse_memo` and `expr_parser` below are
+    # those of the default parser (the one created by ParserFactory.create)
+    # and are not used when parsing.
     subclasses = {}
 
+    # The (upper-case) keywords with which any statement matched by this
+    # class must begin. None means that the class places no restriction on
+    # the start of the statement (e.g. an assignment). These are used by
+    # the fparser.two.parser module to construct the `keyword_index` below.
+    leading_keywords = None
+
+    # Index from the leading keyword of a statement to the classes that
+    # could match it. This is used in BlockBase.match to avoid trying
+    # classes that cannot possibly match.
+    keyword_index = None
+
+    # Packrat cache of match results (a ParseMemo) or None if disabled.
+    parse_memo = None
+
+    # Precedence-climbing parser used by the expression classes (an
+    # fparser.two.expr_parser.ExprParser) or None if disabled.
+    expr_parser = None
+
     def __init__(self, string, parent_cls=None):
         # pylint:disable=unused-argument
         self.parent = None
 
     @show_result
-    def __new__(cls, string, parent_cls=None, _deepcopy=False):
+    def __new__(cls, string, parent_cls=None, _deepcopy=False, _raise_no_match=True):
         if parent_cls is None:
-            parent_cls = [cls]
-        elif cls not in parent_cls:
-            parent_cls.append(cls)
+            parent_cls = {cls}
+        else:
+            parent_cls.add(cls)
 
         # Get the class' match method if it has one
         match = getattr(cls, "match", None)
@@ -437,78 +759,133 @@ class Base(ComparableMixin):
                 # those in Comment.__new__)
                 obj = None
             else:
+                memo = (_ACTIVE_RULES.get() or Base.rules).parse_memo
+                if memo is not None:
+                    memo.enter(item)
+                # This is equivalent to item.parse_line(cls, parent_cls)
+                # but without raising NoMatchError if there's no match.
                 try:
-                    obj = item.parse_line(cls, parent_cls)
-                except NoMatchError:
-                    obj = None
+                    obj = item.parse_cache[cls]
+                except KeyError:
+                    item.parse_cache[cls] = None
+                    obj = _match_or_none(cls, item.line, parent_cls)
+                    item.parse_cache[cls] = obj
             if obj is None:
                 # No match so give the item back to the reader
                 reader.put_item(item)
                 return None
             obj.item = item
+            reader.commit(item)
             return obj
 
-        result = None
-        if match:
-            # IMPORTANT: if string is FortranReaderBase then cls must
-            # restore readers content when no match is found.
-            try:
-                result = cls.match(string)
-            except NoMatchError as msg:
-                if str(msg) == "%s: %r" % (cls.__name__, string):
-                    # avoid recursion 1.
-                    raise
-
-        if isinstance(result, tuple):
-            obj = object.__new__(cls)
-            obj.string = string
-            obj.item = None
-            # Set-up parent information for the results of the match
-            _set_parent(obj, result)
-            if hasattr(cls, "init"):
-                obj.init(*result)
-            return obj
-        if isinstance(result, Base):
-            return result
-        if result is None:
-            # Loop over the possible sub-classes of this class and
-            # check for matches. This uses the list of subclasses calculated
-            # at runtime in fparser.two.parser.
-            for subcls in Base.subclasses.get(cls.__name__, []):
-                if subcls in parent_cls:  # avoid recursion 2.
-                    continue
-                try:
-                    obj = subcls(string, parent_cls=parent_cls)
-                except NoMatchError:
-                    obj = None
-                if obj is not None:
-                    return obj
+        rules = _ACTIVE_RULES.get() or Base.rules
+        memo = rules.parse_memo
+        if memo is not None and len(parent_cls) == 1 and type(string) is str:
+            # A new match rather than that of a subclass (see ParseMemo).
+            key = (cls, string)
+            entry = memo.lookup(key)
+            if entry is not None:
+                obj, errmsg = entry
+                if obj is None and _raise_no_match:
+                    raise NoMatchError(errmsg)
+                return obj
         else:
-            raise AssertionError(repr(result))
-        # If we get to here then we've failed to match the current line
-        if isinstance(string, FortranReaderBase):
-            content = False
-            for index in range(string.linecount):
-                # Check all lines up to this one for content. We
-                # should be able to only check the current line but
-                # but as the line number returned is not always
-                # correct (due to coding errors) we cannot assume the
-                # line pointed to is the line where the error actually
-                # happened.
-                if string.source_lines[index].strip():
-                    content = True
-                    break
-            if not content:
-                # There are no lines in the input or all lines up to
-                # this one are empty or contain only white space. This
-                # is typically accepted by fortran compilers so we
-                # follow their lead and do not raise an exception.
-                return
-            line = string.source_lines[string.linecount - 1]
-            errmsg = f"at line {string.linecount}\n>>>{line}\n"
-        else:
-            errmsg = f"{cls.__name__}: '{string}'"
-        raise NoMatchError(errmsg)
+            memo = None
+
+        obj = None
+        errmsg = None
+        try:
+            result = None
+            if match:
+                # IMPORTANT: if string is FortranReaderBase then cls must
+                # restore readers content when no match is found.
+                try:
+                    result = cls.match(string)
+                except NoMatchError as msg:
+                    if str(msg) == "%s: %r" % (cls.__name__, string):
+                        # avoid recursion 1.
+                        raise
+
+            if isinstance(result, tuple):
+                obj = object.__new__(cls)
+                obj._string = (
+                    string if rules.keep_source or type(string) is not str else None
+                )
+                obj.item = None
+                obj.parent = None
+                # Set-up parent information for the results of the match
+                _set_parent(obj, result)
+                if hasattr(cls, "init"):
+                    obj.init(*result)
+            elif isinstance(result, Base):
+                obj = result
+            elif result is None:
+                # Loop over the possible sub-classes of this class and
+                # check for matches. This uses the list of subclasses
+                # calculated at runtime in fparser.two.parser.
+                try:
+                    dispatch = rules.dispatch[cls]
+                except KeyError:
+                    dispatch = rules.subclass_dispatch(cls)
+                base_new = Base.__new__
+                for subcls in dispatch:
+                    if subcls in parent_cls:  # avoid recursion 2.
+                        continue
+                    if subcls.__new__ is base_new:
+                        # Equivalent to _match_or_none() but avoids the
+                        # extra function call (and stack frame).
+                        obj = base_new(
+                            subcls,
+                            string,
+                            parent_cls=parent_cls,
+                            _raise_no_match=False,
+                        )
+                    else:
+                        obj = _match_or_none(subcls, string, parent_cls)
+                    if obj is not None:
+                        break
+            else:
+                raise AssertionError(repr(result))
+
+            if obj is None:
+                # If we get to here then we've failed to match the current
+                # line
+                if isinstance(string, FortranReaderBase):
+                    # Lines are only discarded once they have been parsed
+                    # so there was content if any have been.
+                    content = string.source_lines.discarded > 0
+                    for index in range(0 if content else string.linecount):
+                        # Check all lines up to this one for content. We
+                        # should be able to only check the current line but
+                        # but as the line number returned is not always
+                        # correct (due to coding errors) we cannot assume
+                        # the line pointed to is the line where the error
+                        # actually happened.
+                        if string.source_lines[index].strip():
+                            content = True
+                            break
+                    if not content:
+                        # There are no lines in the input or all lines up
+                        # to this one are empty or contain only white
+                        # space. This is typically accepted by fortran
+                        # compilers so we follow their lead and do not
+                        # raise an exception.
+                        return None
+                    line = string.source_lines[string.linecount - 1]
+                    errmsg = f"at line {string.linecount}\n>>>{line}\n"
+                else:
+                    errmsg = f"{cls.__name__}: '{string}'"
+        except NoMatchError as err:
+            # The match method raised NoMatchError with the same message that
+            # this method would produce (avoid recursion 1).
+            obj = None
+            errmsg = str(err)
+
+        if memo is not None:
+            memo.store(key, obj, errmsg)
+        if obj is None and _raise_no_match:
+            raise NoMatchError(errmsg)
+        return obj
 
     def __getnewargs__(self):
         """Method to dictate the values passed to the __new__() method upon
@@ -520,7 +897,31 @@ class Base(ComparableMixin):
         :return: set of arguments for __new__
         :rtype: tuple[str, NoneType, bool]
         """
-        return (self.string, None, True)
+        return (self._string, None, True)
+
+    @property
+    def string(self):
+        """
+        :returns: the text (or reader) that this node was matched from. If \
+            this was not kept (see `RuleTable.keep_source`) then the text \
+            of the node is recreated from its children.
+        :rtype: str | :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        """
+        string = self._string
+        if string is None:
+            return self.tostr()
+        return string
+
+    @string.setter
+    def string(self, value):
+        """
+        :param value: the text (or reader) that this node was matched from.
+        :type value: str | \
+            :py:class:`fparser.common.readfortran.FortranReaderBase`
+
+        """
+        self._string = value
 
     def get_root(self):
         """
@@ -607,6 +1008,8 @@ class ScopingRegionMixin:
 
     """
 
+    __slots__ = ()
+
     def get_scope_name(self):
         """
         :returns: the name of this scoping region.
@@ -615,6 +1018,182 @@ class ScopingRegionMixin:
         return self.get_name().string
 
 
+# Matches the first word of a statement.
+_LEADING_WORD = re.compile(r"\w+").match
+
+
+class LeadingKeywordIndex:
+    """
+    First-token dispatch index for the classes tried by `BlockBase.match`.
+
+    Each class that is tried for a statement is expanded into the
+    classes (in the same order that `Base.__new__` would visit them) that
+    have a `match` method. These are then filtered according to the
+    `leading_keywords` of each class so that only those that could
+    possibly match a statement beginning with a given word are
+    retained. The first-match-wins order of the original classes is
+    preserved.
+
+    :param subclasses: the optimised mapping from class name to the list \
+        of subclasses that is constructed by the ParserFactory.
+    :type subclasses: Dict[str, List[type]]
+
+    """
+
+    def __init__(self, subclasses):
+        self._subclasses = subclasses
+        # Effective leading keywords for each class that has been examined.
+        self._keywords = {}
+        # Expansion of each tuple of classes supplied to `groups`.
+        self._expansions = {}
+        # Cache of the filtered expansions, keyed on the tuple of classes
+        # and the keywords that prefix the statement.
+        self._cache = {}
+
+    @staticmethod
+    def _is_expandable(cls):
+        """
+        :param type cls: the class to check.
+
+        :returns: whether the class just delegates to its subclasses \
+            (i.e. it has no `match` method and does not override \
+            `Base.__new__`).
+        :rtype: bool
+
+        """
+        return not hasattr(cls, "match") and cls.__new__ is Base.__new__
+
+    def keywords(self, cls, _visiting=None):
+        """
+        Computes the keywords with which any statement matched by the
+        supplied class (including any of its subclasses) must begin.
+
+        :param type cls: the class to examine.
+
+        :returns: the set of leading keywords or None if the class \
+            places no restriction on the start of the statement.
+        :rtype: Optional[FrozenSet[str]]
+
+        """
+        try:
+            return self._keywords[cls]
+        except KeyError:
+            pass
+        if _visiting is None:
+            _visiting = set()
+        _visiting.add(cls)
+        if self._is_expandable(cls):
+            result = frozenset()
+        elif cls.leading_keywords is None:
+            result = None
+        else:
+            result = frozenset(cls.leading_keywords)
+        if cls.__new__ is Base.__new__:
+            # Base.__new__ tries any subclasses if cls fails to match.
+            for subcls in self._subclasses.get(cls.__name__, []):
+                if result is None:
+                    break
+                if subcls in _visiting:
+                    continue
+                sub_keywords = self.keywords(subcls, _visiting)
+                if sub_keywords is None:
+                    result = None
+                else:
+                    result = result | sub_keywords
+        _visiting.discard(cls)
+        if result is None or not _visiting:
+            # Only cache results once the complete tree has been examined
+            # as the result for a class in a cycle may be incomplete.
+            self._keywords[cls] = result
+        return result
+
+    def _expand(self, cls, seen):
+        """
+        :param type cls: the class to expand.
+        :param seen: the classes that have already been visited.
+        :type seen: Set[type]
+
+        :returns: the classes that `Base.__new__` would try (in order) \
+            when given `cls`, paired with their leading keywords.
+        :rtype: List[Tuple[type, Optional[FrozenSet[str]]]]
+
+        """
+        if not self._is_expandable(cls):
+            return [(cls, self.keywords(cls))]
+        result = []
+        for subcls in self._subclasses.get(cls.__name__, []):
+            if subcls in seen:
+                continue
+            seen.add(subcls)
+            result.extend(self._expand(subcls, seen))
+        return result
+
+    def groups(self, classes, item):
+        """
+        Constructs the classes to try for each of the supplied `classes`
+        given the next item from the reader.
+
+        :param classes: the classes that are to be tried in turn.
+        :type classes: Tuple[type, ...]
+        :param item: the next item from the reader (or None).
+        :type item: Optional[:py:class:`fparser.common.readfortran.Line`]
+
+        :returns: a tuple of classes to try for each of the entries in \
+            `classes`. If the item cannot be dispatched on then each \
+            class is returned unchanged.
+        :rtype: Tuple[Tuple[type, ...], ...]
+
+        """
+        try:
+            expansion, all_keywords, max_len = self._expansions[classes]
+        except KeyError:
+            expansion = tuple(self._expand(cls, {cls}) for cls in classes)
+            all_keywords = set()
+            for group in expansion:
+                for _, keywords in group:
+                    if keywords:
+                        all_keywords.update(keywords)
+            max_len = max((len(key) for key in all_keywords), default=0)
+            self._expansions[classes] = (expansion, all_keywords, max_len)
+
+        # Only plain lines of Fortran can be dispatched on. Anything else
+        # (comments, directives, include lines etc.) may be absorbed by
+        # the start of a block so all classes must be tried.
+        if (
+            not isinstance(item, readfortran.Line)
+            or isinstance(item, readfortran.CppDirective)
+            or not item.line
+        ):
+            return tuple((cls,) for cls in classes)
+        line = item.line
+        if line[0].isalpha():
+            word = _LEADING_WORD(line).group().upper()
+            if word.startswith("INCLUDE"):
+                return tuple((cls,) for cls in classes)
+        else:
+            word = line[0]
+        prefixes = tuple(
+            word[:idx]
+            for idx in range(1, min(len(word), max_len) + 1)
+            if word[:idx] in all_keywords
+        )
+        key = (classes, prefixes)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        result = tuple(
+            tuple(
+                cls
+                for cls, keywords in group
+                if keywords is None or keywords.intersection(prefixes)
+            )
+            for group in expansion
+        )
+        self._cache[key] = result
+        return result
+
+
 class BlockBase(Base):
     """
     Base class for matching all block constructs::
@@ -627,6 +1206,8 @@ class BlockBase(Base):
 
     """
 
+    __slots__ = ("content",)
+
     @staticmethod
     def match(
         startcls,
@@ -668,13 +1249,57 @@ class BlockBase(Base):
         :return: instance of startcls or None if no match is found
         :rtype: startcls
 
+        """
+        assert isinstance(reader, FortranReaderBase), repr(reader)
+        # If there is no match then the reader is returned to this point
+        # (rather than putting back each of the items that were read).
+        mark = reader.checkpoint()
+        try:
+            result = BlockBase._match(
+                startcls,
+                subclasses,
+                endcls,
+                reader,
+                match_labels,
+                match_names,
+                match_name_classes,
+                enable_do_label_construct_hook,
+                enable_if_construct_hook,
+                enable_where_construct_hook,
+                strict_order,
+                strict_match_names,
+            )
+            if result is None:
+                reader.rollback(mark)
+            return result
+        finally:
+            reader.release(mark)
+
+    @staticmethod
+    def _match(
+        startcls,
+        subclasses,
+        endcls,
+        reader,
+        match_labels,
+        match_names,
+        match_name_classes,
+        enable_do_label_construct_hook,
+        enable_if_construct_hook,
+        enable_where_construct_hook,
+        strict_order,
+        strict_match_names,
+    ):
+        """
+        Does the work of `match` (which has the same arguments) except that
+        the reader is not restored if there is no match.
+
         """
         # This implementation uses the DynamicImport class and its instance di
         # to access the Fortran2003 and C99Preprocessor classes, this is a
         # performance optimization to avoid importing the classes inside this
         # method since it is in the hotpath (and it can't be done in the
         # top-level due to circular dependencies).
-        assert isinstance(reader, FortranReaderBase), repr(reader)
         content = []
         # This will store the name of the new SymbolTable if we match a
         # scoping region.
@@ -684,24 +1309,19 @@ class BlockBase(Base):
             # Deal with any preceding comments, includes, and/or directives
             DynamicImport.add_comments_includes_directives(content, reader)
             # Now attempt to match the start of the block
-            try:
-                obj = startcls(reader)
-            except NoMatchError:
-                obj = None
+            obj = _match_or_none(startcls, reader)
             if obj is None:
                 # Ultimately we failed to find a match for the
-                # start of the block so put back any comments that
-                # we processed along the way
-                for obj in reversed(content):
-                    obj.restore_reader(reader)
-                return
+                # start of the block
+                return None
             if isinstance(obj, ScopingRegionMixin):
                 # We are entering a new scoping unit so create a new
                 # symbol table.
                 # NOTE: if the match subsequently fails then we must
                 #       delete this symbol table.
                 table_name = obj.get_scope_name()
-                SYMBOL_TABLES.enter_scope(table_name, obj)
+                symbol_tables = active_symbol_tables()
+                symbol_tables.enter_scope(table_name, obj)
             # Store the index of the start of this block proper (i.e.
             # excluding any comments)
             start_idx = len(content)
@@ -722,7 +1342,16 @@ class BlockBase(Base):
         classes += cpp_classes
         if endcls is not None:
             classes += [endcls]
-            endcls_all = tuple([endcls] + endcls.subclasses[endcls.__name__])
+            endcls_all = tuple([endcls] + active_rules().subclasses[endcls.__name__])
+
+        keyword_index = active_rules().keyword_index
+        if keyword_index is None:
+            all_groups = [(cls,) for cls in classes]
+        else:
+            classes_key = tuple(classes)
+        # The classes to try for each entry in `classes`. This depends upon
+        # the next item in the reader and so is reset after every match.
+        groups = None
 
         try:
             # Start trying to match the various subclasses, starting from
@@ -738,14 +1367,25 @@ class BlockBase(Base):
                     if obj is not None and hasattr(obj, "get_start_label"):
                         if start_label == obj.get_start_label():
                             content.append(obj)
+                            groups = None
                             continue
                         obj.restore_reader(reader)
+                if groups is None:
+                    if keyword_index is None:
+                        groups = all_groups
+                    else:
+                        # Peek at the next item so that we only try those
+                        # classes that could possibly match it.
+                        item = reader.get_item()
+                        if item is not None:
+                            reader.put_item(item)
+                        groups = keyword_index.groups(classes_key, item)
                 # Attempt to match the i'th subclass
-                cls = classes[i]
-                try:
-                    obj = cls(reader)
-                except NoMatchError:
-                    obj = None
+                obj = None
+                for cls in groups[i]:
+                    obj = _match_or_none(cls, reader)
+                    if obj is not None:
+                        break
                 if obj is None:
                     # No match for this class, continue checking the list
                     # starting from the i+1'th...
@@ -755,6 +1395,7 @@ class BlockBase(Base):
                 # We got a match for this class
                 had_match = True
                 content.append(obj)
+                groups = None
 
                 if match_names and isinstance(obj, match_name_classes):
                     end_name = obj.get_end_name()
@@ -828,13 +1469,13 @@ class BlockBase(Base):
         except FortranSyntaxError as err:
             # We hit trouble so clean up the symbol table
             if table_name:
-                SYMBOL_TABLES.exit_scope()
+                symbol_tables.exit_scope()
                 # Remove any symbol table that we created
-                SYMBOL_TABLES.remove(table_name)
+                symbol_tables.remove(table_name)
             raise err
 
         if table_name:
-            SYMBOL_TABLES.exit_scope()
+            symbol_tables.exit_scope()
 
         if not had_match or endcls and not found_end:
             # We did not get a match from any of the subclasses or
@@ -842,9 +1483,7 @@ class BlockBase(Base):
             if endcls is not None:
                 if table_name:
                     # Remove any symbol table that we created
-                    SYMBOL_TABLES.remove(table_name)
-                for obj in reversed(content):
-                    obj.restore_reader(reader)
+                    symbol_tables.remove(table_name)
                 return None
 
         if not content:
@@ -936,6 +1575,8 @@ class SequenceBase(Base):
 
     """
 
+    __slots__ = ("separator",)
+
     @staticmethod
     def match(separator, subcls, string):
         """Match one or more 'subcls' fparser2 rules in the string 'string'
@@ -1163,6 +1804,30 @@ class BinaryOpBase(Base):
 
         return (lhs_obj, oper.replace(" ", ""), rhs_obj)
 
+    def _left_spine(self, method):
+        """Return the chain of nodes obtained by repeatedly following the
+        left-hand operand for as long as it is a BinaryOpBase that uses
+        the same (string or repr) method. Long left-associative
+        expressions can then be output without exceeding the recursion
+        limit.
+
+        :param method: the method that the nodes in the chain must use.
+        :type method: function
+
+        :returns: the nodes in the chain, starting with this one.
+        :rtype: list of :py:class:`fparser.two.utils.BinaryOpBase`
+
+        """
+        spine = [self]
+        lhs = self.items[0]
+        while (
+            isinstance(lhs, BinaryOpBase)
+            and getattr(type(lhs), method.__name__) is method
+        ):
+            spine.append(lhs)
+            lhs = lhs.items[0]
+        return spine
+
     def tostr(self):
         """Return the string representation of this object. Uses join() which
         is efficient and can make a big performance difference for
@@ -1172,7 +1837,25 @@ class BinaryOpBase(Base):
         :rtype: str
 
         """
-        return " ".join([str(self.items[0]), str(self.items[1]), str(self.items[2])])
+        spine = self._left_spine(BinaryOpBase.tostr)
+        parts = [str(spine[-1].items[0])]
+        for node in reversed(spine):
+            parts.append(str(node.items[1]))
+            parts.append(str(node.items[2]))
+        return " ".join(parts)
+
+    def torepr(self):
+        """
+        :returns: The Python representation of this object as a string.
+        :rtype: str
+
+        """
+        spine = self._left_spine(BinaryOpBase.torepr)
+        parts = [node.__class__.__name__ + "(" for node in spine]
+        parts.append(repr(spine[-1].items[0]))
+        for node in reversed(spine):
+            parts.append(", {0!r}, {1!r})".format(node.items[1], node.items[2]))
+        return "".join(parts)
 
 
 class SeparatorBase(Base):
@@ -1527,17 +2210,18 @@ class StringBase(Base):
         return None
 
     def init(self, string):
-        self.string = string
+        # The matched text is the value of this node so it is always kept.
+        self._string = string
 
     def tostr(self):
-        return str(self.string)
+        return str(self._string)
 
     def torepr(self):
-        return "%s(%r)" % (self.__class__.__name__, self.string)
+        return "%s(%r)" % (self.__class__.__name__, self._string)
 
     def _cmpkey(self):
         """Provides a key of objects to be used for comparing."""
-        return self.string
+        return self._string
 
 
 class STRINGBase(StringBase):
@@ -1654,6 +2338,8 @@ class EndStmtBase(StmtBase):
 
     """
 
+    leading_keywords = ("END",)
+
     @staticmethod
     def match(stmt_type, stmt_name, string, require_stmt_type=False):
         """
@@ -1932,6 +2618,81 @@ class Type_Declaration_StmtBase(StmtBase):
         return f"{self.items[0]}, {self.items[1]} :: {self.items[2]}"
 
 
+def _iter_walk(node_list, indent=0):
+    """
+    Generator that walks down the parse tree produced by fparser2 (see
+    :py:func:`walk`). This is iterative rather than recursive so it is not
+    limited by the depth of the tree.
+
+    :param node_list: node or list of nodes from which to walk.
+    :type node_list: (list of) :py:class:fparser.two.utils.Base
+    :param int indent: the depth of the nodes in `node_list`.
+
+    :returns: each node in turn, together with its depth.
+    :rtype: Iterator[Tuple[:py:class:`fparser.two.utils.Base`, int]]
+
+    """
+    if not isinstance(node_list, (list, tuple)):
+        node_list = [node_list]
+    # Stack of iterators over the children still to be visited at each
+    # level of the tree.
+    stack = [(iter(node_list), indent)]
+    while stack:
+        children, depth = stack[-1]
+        for child in children:
+            yield child, depth
+            if isinstance(child, Base):
+                stack.append((iter(child.children), depth + 1))
+                break
+            if isinstance(child, tuple):
+                # The components of a tuple are visited as if each were
+                # a node list in its own right.
+                stack.append(
+                    (
+                        (
+                            item
+                            for component in child
+                            for item in (
+                                component
+                                if isinstance(component, (list, tuple))
+                                else (component,)
+                            )
+                        ),
+                        depth + 1,
+                    )
+                )
+                break
+        else:
+            stack.pop()
+
+
+def iter_walk(node_list, types=None):
+    """
+    Walk down the parse tree produced by fparser2, yielding each node
+    with the specified type(s). The nodes are generated in the same order
+    as they are returned by :py:func:`walk` but without constructing a
+    list, so that a search can be stopped as soon as the node of interest
+    is found.
+
+    :param node_list: node or list of nodes from which to walk.
+    :type node_list: (list of) :py:class:fparser.two.utils.Base
+    :param types: type or tuple of types of Node to return. (Default is to \
+                  return all nodes.)
+    :type types: type or tuple of types
+
+    :returns: the nodes with the specified type(s).
+    :rtype: Iterator[:py:class:`fparser.two.utils.Base`]
+
+    """
+    if types is None:
+        for child, _ in _iter_walk(node_list):
+            yield child
+    else:
+        for child, _ in _iter_walk(node_list):
+            if isinstance(child, types):
+                yield child
+
+
 def walk(node_list, types=None, indent=0, debug=False):
     """
     Walk down the parse tree produced by fparser2.  Returns a list of all
@@ -1948,29 +2709,259 @@ def walk(node_list, types=None, indent=0, debug=False):
     :returns: a list of nodes
     :rtype: `list` of :py:class:`fparser.two.utils.Base`
     """
-    local_list = []
-
-    if not isinstance(node_list, (list, tuple)):
-        node_list = [node_list]
+    if not debug:
+        return list(iter_walk(node_list, types))
 
-    for child in node_list:
-        if debug:
-            if isinstance(child, str):
-                print(indent * "  " + "child type = ", type(child), repr(child))
-            else:
-                print(indent * "  " + "child type = ", type(child))
+    local_list = []
+    for child, depth in _iter_walk(node_list, indent):
+        if isinstance(child, str):
+            print(depth * "  " + "child type = ", type(child), repr(child))
+        else:
+            print(depth * "  " + "child type = ", type(child))
         if types is None or isinstance(child, types):
             local_list.append(child)
-        # Recurse down
-        if isinstance(child, Base):
-            local_list += walk(child.children, types, indent + 1, debug)
-        elif isinstance(child, tuple):
-            for component in child:
-                local_list += walk(component, types, indent + 1, debug)
-
     return local_list
 
 
+class TypeIndex:
+    """
+    Index of the nodes of one or more parse trees by type. Once built (in
+    a single walk of the tree), finding all of the nodes of a given type
+    does not require the tree to be walked again::
+
+        index = TypeIndex(parse_tree)
+        for call in index.find(Call_Stmt):
+            ...
+
+    The index is not updated automatically when the tree is modified.
+    Nodes must be added to and removed from the tree with
+    :py:func:`insert_node`, :py:func:`remove_node` and
+    :py:func:`replace_node` (supplying the index) or else the index must
+    be updated with `add` and `discard`. The index does not record where
+    the nodes are in the tree: `find` returns them in the order in which
+    they were added, so once the tree has been modified this is no longer
+    their order in the tree.
+
+    :param node_list: node or list of nodes to add to the index.
+    :type node_list: Optional[(list of) :py:class:`fparser.two.utils.Base`]
+
+    """
+
+    def __init__(self, node_list=None):
+        # Map from the type of a node to a dict (keyed by the id of the
+        # node) of all of the nodes of that type.
+        self._nodes = {}
+        # The position of each node (keyed by its id) in the order in
+        # which they were added. Positions are never reused, so a node
+        # that is added after others have been discarded comes last.
+        self._order = {}
+        self._counter = itertools.count()
+        # Cache of the indexed types that are a subclass of the types
+        # supplied to `find`.
+        self._lookups = {}
+        if node_list is not None:
+            self.add(node_list)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, node):
+        return id(node) in self._order
+
+    def add(self, node_list):
+        """
+        Add the supplied node(s) and all of their descendants to the index.
+
+        :param node_list: node or list of nodes to add.
+        :type node_list: (list of) :py:class:`fparser.two.utils.Base`
+
+        """
+        nodes = self._nodes
+        order = self._order
+        counter = self._counter
+        for node in iter_walk(node_list, Base):
+            cls = type(node)
+            if cls not in nodes:
+                nodes[cls] = {}
+                self._lookups.clear()
+            nodes[cls][id(node)] = node
+            # The index holds a reference to each node so its id is not
+            # reused while it is indexed.
+            if id(node) not in order:
+                order[id(node)] = next(counter)
+
+    def discard(self, node_list):
+        """
+        Remove the supplied node(s) and all of their descendants from the
+        index. Nodes that are not in the index are ignored.
+
+        :param node_list: node or list of nodes to remove.
+        :type node_list: (list of) :py:class:`fparser.two.utils.Base`
+
+        """
+        for node in iter_walk(node_list, Base):
+            nodes = self._nodes.get(type(node))
+            if nodes and nodes.pop(id(node), None) is not None:
+                del self._order[id(node)]
+
+    def find(self, types):
+        """
+        Find all of the indexed nodes of the specified type(s). The nodes
+        are returned in the order in which they were added to the index.
+        This is the order returned by :py:func:`walk` for an unmodified
+        tree but, once nodes have been inserted, removed or replaced, it
+        is not their order in the tree.
+
+        :param types: type or tuple of types of node to return.
+        :type types: type or tuple of types
+
+        :returns: the nodes of the specified type(s).
+        :rtype: List[:py:class:`fparser.two.utils.Base`]
+
+        """
+        classes = self._lookups.get(types)
+        if classes is None:
+            classes = [cls for cls in self._nodes if issubclass(cls, types)]
+            self._lookups[types] = classes
+        if len(classes) == 1:
+            return list(self._nodes[classes[0]].values())
+        result = [node for cls in classes for node in self._nodes[cls].values()]
+        if len(classes) > 1:
+            order = self._order
+            result.sort(key=lambda node: order[id(node)])
+        return result
+
+
+def _replace_item(items, node, replacement):
+    """
+    Replaces the supplied node in a list or tuple of items (searching any
+    lists or tuples that it contains). A list is modified in place while a
+    tuple is copied.
+
+    :param items: the items to search.
+    :type items: list | tuple
+    :param node: the node to replace.
+    :type node: :py:class:`fparser.two.utils.Base`
+    :param tuple replacement: the items with which to replace it.
+
+    :returns: the modified items or None if `node` is not found.
+    :rtype: Optional[list | tuple]
+
+    """
+    for position, item in enumerate(items):
+        if item is node:
+            new_items = replacement
+        elif isinstance(item, (list, tuple)):
+            new_item = _replace_item(item, node, replacement)
+            if new_item is None:
+                continue
+            new_items = (new_item,)
+        else:
+            continue
+        if isinstance(items, list):
+            items[position : position + 1] = new_items
+            return items
+        return items[:position] + tuple(new_items) + items[position + 1 :]
+    return None
+
+
+def _replace_child(node, replacement):
+    """
+    Replaces the supplied node in the children of its parent.
+
+    :param node: the node to replace.
+    :type node: :py:class:`fparser.two.utils.Base`
+    :param tuple replacement: the nodes with which to replace it.
+
+    :raises ValueError: if the node has no parent or is not one of its \
+        children.
+
+    """
+    parent = node.parent
+    if parent is None:
+        raise ValueError(f"Node '{node}' has no parent.")
+    children = _replace_item(parent.children, node, replacement)
+    if children is None:
+        raise ValueError(
+            f"Node '{node}' is not one of the children of its parent '{parent}'."
+        )
+    if not isinstance(children, list):
+        parent.items = children
+
+
+def insert_node(parent, position, node, index=None):
+    """
+    Inserts a node into the content of a block (e.g. a statement into
+    an Execution_Part) and sets its parent.
+
+    :param parent: the block into which to insert the node.
+    :type parent: :py:class:`fparser.two.utils.BlockBase`
+    :param int position: the position in the content of `parent` at \
+        which to insert the node.
+    :param node: the node to insert.
+    :type node: :py:class:`fparser.two.utils.Base`
+    :param index: an index of the tree to update.
+    :type index: Optional[:py:class:`fparser.two.utils.TypeIndex`]
+
+    :raises TypeError: if `parent` is not a block.
+
+    """
+    if not isinstance(parent, BlockBase):
+        raise TypeError(
+            f"Nodes can only be inserted into a block but got "
+            f"'{type(parent).__name__}'."
+        )
+    parent.content.insert(position, node)
+    node.parent = parent
+    if index is not None:
+        index.add(node)
+
+
+def remove_node(node, index=None):
+    """
+    Removes a node from the children of its parent. Removing a node that
+    is a required part of its parent (e.g. an operand of an expression)
+    results in an invalid tree.
+
+    :param node: the node to remove.
+    :type node: :py:class:`fparser.two.utils.Base`
+    :param index: an index of the tree to update.
+    :type index: Optional[:py:class:`fparser.two.utils.TypeIndex`]
+
+    :raises ValueError: if the node has no parent or is not one of its \
+        children.
+
+    """
+    _replace_child(node, ())
+    node.parent = None
+    if index is not None:
+        index.discard(node)
+
+
+def replace_node(node, new_node, index=None):
+    """
+    Replaces a node in the children of its parent with another node.
+
+    :param node: the node to replace.
+    :type node: :py:class:`fparser.two.utils.Base`
+    :param new_node: the node with which to replace it.
+    :type new_node: :py:class:`fparser.two.utils.Base`
+    :param index: an index of the tree to update.
+    :type index: Optional[:py:class:`fparser.two.utils.TypeIndex`]
+
+    :raises ValueError: if the node has no parent or is not one of its \
+        children.
+
+    """
+    parent = node.parent
+    _replace_child(node, (new_node,))
+    node.parent = None
+    new_node.parent = parent
+    if index is not None:
+        index.discard(node)
+        index.add(new_node)
+
+
 def get_child(node, node_type):
     """
     Searches for the first, immediate child of the supplied node that is of
@@ -1989,3 +2980,34 @@ def get_child(node, node_type):
         if isinstance(child, node_type):
             return child
     return None
+
+
+def class_reference(cls):
+    """
+    :param type cls: the class to refer to.
+
+    :returns: a reference to the class (its module and qualified name) \
+        that can be stored, e.g. in a serialised parse tree, and later \
+        resolved by :py:func:`resolve_class_reference`.
+    :rtype: str
+
+    """
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def resolve_class_reference(ref):
+    """
+    :param str ref: a reference created by :py:func:`class_reference`.
+
+    :returns: the class that is referred to, importing its module if \
+        necessary.
+    :rtype: type
+
+    :raises KeyError: if the class does not exist.
+
+    """
+    module_name, name = ref.split(":")
+    result = sys.modules.get(module_name) or importlib.import_module(module_name)
+    for part in name.split("."):
+        result = vars(result)[part]
+    return result